@@ -0,0 +1,11 @@
+"""Environment of the benchmarks, imported before the spoteezer modules: the
+configuration requires Spotify credentials, and the benchmarks make no API
+calls nor run background threads.
+"""
+
+import os
+
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "benchmark")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "benchmark")
+os.environ.setdefault("SPOTIFY_TOKEN_REFRESH", "0")
+os.environ.setdefault("SPOTEEZER_JOB_WORKERS", "0")
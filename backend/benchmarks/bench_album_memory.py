@@ -0,0 +1,165 @@
+"""Memory benchmark of the album handling, on a 500-track compilation fixture.
+
+Compares the memory an album item held when it kept its whole payload and the
+list of its track titles, as the items did, with the memory held once its
+tracks are paged through into the compact album tracks. Spotify pages are
+served from the fixture, 50 tracks at a time as the API does.
+
+Usage: uv run python benchmarks/bench_album_memory.py [--tracks 500]
+"""
+
+import argparse
+import json
+import tracemalloc
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+from unittest.mock import patch
+
+import _env  # noqa: F401
+
+from spoteezer.helper import preprocess_string
+from spoteezer.items.deezer_item import DeezerItem
+from spoteezer.items.spotify_item import ALBUM_TRACKS_PAGE_SIZE, SpotifyItem
+
+
+def deezer_payload(tracks: int) -> str:
+    """Builds the JSON payload of a Deezer album, with all its tracks embedded."""
+    artist = {"id": 5080, "name": "Various Artists", "picture_big": "https://e-cdns-images.dzcdn.net/artist.jpg"}
+    return json.dumps(
+        {
+            "id": 302127,
+            "title": "The Biggest Compilation Ever",
+            "artist": artist,
+            "nb_tracks": tracks,
+            "cover_big": "https://e-cdns-images.dzcdn.net/album.jpg",
+            "tracks": [
+                {
+                    "id": 3135556 + i,
+                    "title": f"Track number {i} (Radio Edit)",
+                    "title_short": f"Track number {i}",
+                    "link": f"https://www.deezer.com/track/{3135556 + i}",
+                    "duration": 180 + i % 120,
+                    "rank": 500000 + i,
+                    "preview": f"https://cdns-preview-d.dzcdn.net/stream/c-{i:032x}-5.mp3",
+                    "artist": artist,
+                }
+                for i in range(tracks)
+            ],
+        }
+    )
+
+
+def spotify_payload(tracks: int) -> str:
+    """Builds the JSON payload of a Spotify album, with all its track pages."""
+    artists = [{"id": "0LyfQWJT6nXafLPZqxe9Of", "name": "Various Artists", "type": "artist"}]
+    return json.dumps(
+        {
+            "id": "2noRn2Aes5aoNVsU6iWThc",
+            "name": "The Biggest Compilation Ever",
+            "artists": artists,
+            "images": [{"url": "https://i.scdn.co/album.jpg", "height": 640, "width": 640}],
+            "tracks": {
+                "items": [
+                    {
+                        "id": f"{i:022d}",
+                        "name": f"Track number {i} - Radio Edit",
+                        "artists": artists,
+                        "available_markets": ["FR", "DE", "GB", "US", "CA", "JP", "BR", "AU"],
+                        "duration_ms": (180 + i % 120) * 1000,
+                        "preview_url": f"https://p.scdn.co/mp3-preview/{i:040x}",
+                        "external_urls": {"spotify": f"https://open.spotify.com/track/{i:022d}"},
+                    }
+                    for i in range(tracks)
+                ],
+                "total": tracks,
+            },
+        }
+    )
+
+
+def held_bytes(build: Callable[[], Any]) -> tuple[int, int]:
+    """Measures the memory held by the result of build, and its peak while building."""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    result = build()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return after - before, peak - before
+
+
+def whole_deezer(payload: str) -> Any:
+    """Keeps the whole Deezer payload and the list of the track titles, as DeezerItem did."""
+    raw_info = json.loads(payload)
+    return raw_info, [preprocess_string(track["title"]) for track in raw_info["tracks"]]
+
+
+def paged_deezer(payload: str) -> DeezerItem:
+    """Pages through the tracks embedded in the Deezer payload into the album tracks."""
+    item = DeezerItem.__new__(DeezerItem)
+    item.type, item.id, item.raw_info = "album", 302127, json.loads(payload)
+    item.album_tracks = item.get_album_tracks()
+    return item
+
+
+def whole_spotify(payload: str) -> Any:
+    """Keeps the whole Spotify payload and the list of the track titles, as SpotifyItem did."""
+    raw_info = json.loads(payload)
+    return raw_info, [preprocess_string(track["name"]) for track in raw_info["tracks"]["items"]]
+
+
+class FixtureSpotify:
+    """Serves the Spotify fixture as the API does: the album with its first
+    page of tracks, then the next pages, each decoded from its JSON.
+    """
+
+    def __init__(self, payload: str):
+        album = json.loads(payload)
+        items = album.pop("tracks")["items"]
+        self.album_payload = json.dumps(album)
+        self.total = len(items)
+        self.pages = {
+            offset: json.dumps(items[offset : offset + ALBUM_TRACKS_PAGE_SIZE])
+            for offset in range(0, self.total, ALBUM_TRACKS_PAGE_SIZE)
+        }
+
+    def album(self, album_id: str) -> dict[str, Any]:
+        album = json.loads(self.album_payload)
+        album["tracks"] = self.album_tracks(album_id, ALBUM_TRACKS_PAGE_SIZE, 0)
+        return album
+
+    def album_tracks(self, album_id: str, limit: int, offset: int) -> dict[str, Any]:
+        _next = "next" if offset + limit < self.total else None
+        return {"items": json.loads(self.pages[offset]), "total": self.total, "next": _next}
+
+
+def paged_spotify(spotify: FixtureSpotify) -> SpotifyItem:
+    """Pages through the Spotify album tracks into the album tracks."""
+    item = SpotifyItem.__new__(SpotifyItem)
+    item.type, item.id = "album", "2noRn2Aes5aoNVsU6iWThc"
+    with patch("spoteezer.items.spotify_item.SPOTIFY", spotify):
+        item.raw_info = spotify.album(item.id)
+        item.album_tracks = item.get_album_tracks()
+    return item
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=500)
+    args = parser.parse_args()
+
+    cases: list[tuple[str, Callable[[], Any]]] = [
+        ("deezer  whole payload", partial(whole_deezer, deezer_payload(args.tracks))),
+        ("deezer  paged", partial(paged_deezer, deezer_payload(args.tracks))),
+        ("spotify whole payload", partial(whole_spotify, spotify_payload(args.tracks))),
+        ("spotify paged", partial(paged_spotify, FixtureSpotify(spotify_payload(args.tracks)))),
+    ]
+    for name, build in cases:
+        held, peak = held_bytes(build)
+        print(f"{name:<22} | {held / 1024:8.1f} KiB held | {peak / 1024:8.1f} KiB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Micro-benchmark of the search query building.
+
+Compares building the query of each trial as it is tried, as the items did
+(iterating over all the search parameters, then URL-quoting for Deezer, plus
+fingerprinting the search parameters), with compiling the query plan of all
+the trials at once.
+
+Usage: uv run python benchmarks/bench_query.py [--number 20000]
+"""
+
+import argparse
+import hashlib
+import json
+import timeit
+from urllib.parse import quote
+
+import _env  # noqa: F401
+
+from spoteezer.items.abstract_item import SEARCH_PARAM_TRIALS_DICT
+from spoteezer.items.query import build_query_plan
+
+SEARCH_PARAMS = {
+    "track": "harder, better, faster, stronger",
+    "artist": "daft punk",
+    "album": "discovery",
+    "duration_sec": 224,
+}
+TRIALS = SEARCH_PARAM_TRIALS_DICT["track"]
+
+
+def fingerprint() -> str:
+    """Fingerprints the search parameters, as run_search_trials did."""
+    return hashlib.sha256(json.dumps(SEARCH_PARAMS, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def per_trial_deezer_queries() -> list[str]:
+    """Builds the Deezer queries trial by trial, as DeezerItem.search did."""
+    fingerprint()
+    queries = []
+    for trial in TRIALS:
+        query = ""
+        for key, value in SEARCH_PARAMS.items():
+            if key in trial:
+                if key == "duration_sec":
+                    query += f"dur_min:{value} dur_max:{value} "
+                elif key != "tracks":
+                    query += f'{key}:"{value}" '
+        queries.append(quote(query))
+    return queries
+
+
+def per_trial_spotify_queries() -> list[str]:
+    """Builds the Spotify queries trial by trial, as SpotifyItem.search did."""
+    fingerprint()
+    queries = []
+    for trial in TRIALS:
+        query = ""
+        for key in trial:
+            value = SEARCH_PARAMS[key]
+            if key not in ("duration_sec", "tracks") and value is not None:
+                query += f"{key}:{value} "
+        queries.append(query)
+    return queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    cases = {
+        "deezer  per trial": per_trial_deezer_queries,
+        "deezer  plan": lambda: build_query_plan("deezer", "track", SEARCH_PARAMS, TRIALS),
+        "spotify per trial": per_trial_spotify_queries,
+        "spotify plan": lambda: build_query_plan("spotify", "track", SEARCH_PARAMS, TRIALS),
+    }
+    for name, func in cases.items():
+        seconds = min(timeit.repeat(func, number=args.number, repeat=3)) / args.number
+        print(f"{name:<18} | {seconds * 1e6:7.2f} us per search")
+
+    print(f"deezer  queries: {len(TRIALS)} per trial, {len(build_query_plan('deezer', 'track', SEARCH_PARAMS, TRIALS))} in plan")
+    print(f"spotify queries: {len(TRIALS)} per trial, {len(build_query_plan('spotify', 'track', SEARCH_PARAMS, TRIALS))} in plan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Micro-benchmark of the serialization of conversion responses.
+
+Compares encoding a cached conversion response on each request (the previous
+path) with assembling the pre-serialized fragments of its items, for single
+and batch responses, with the standard json module and with orjson if installed.
+
+Usage: uv run python benchmarks/bench_serialization.py [--number 20000]
+"""
+
+import argparse
+import timeit
+from unittest.mock import patch
+
+import _env  # noqa: F401
+from flask.json.provider import DefaultJSONProvider
+
+from spoteezer import serialization
+from spoteezer.flask_app import app, json_response, response_json, with_thumbnails
+from spoteezer.serialization import OrjsonProvider, web_info_fragment
+
+INIT = {
+    "url": "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh",
+    "type": "track",
+    "id": "4iV5W9uYEdYUVa79Axb7Rh",
+    "platform": "spotify",
+    "img_url": "https://i.scdn.co/image/ab67616d0000b2737359994525d219f64872d3b1",
+}
+RESULT = {
+    "url": "https://www.deezer.com/track/3135556",
+    "type": "track",
+    "id": 3135556,
+    "platform": "deezer",
+    "img_url": "https://e-cdns-images.dzcdn.net/images/cover/2e018122cb56986277102d2041a592c8/1000x1000.jpg",
+}
+BATCH_SIZE = 50
+
+
+def run(number: int, use_orjson: bool) -> None:
+    """Times the serialization paths with the given JSON encoder."""
+    app.json = OrjsonProvider(app) if use_orjson else DefaultJSONProvider(app)
+    response = {"result": {"init": INIT, "result": RESULT}, "log": "Conversion successful!"}
+    with patch.object(serialization, "orjson", serialization.orjson if use_orjson else None):
+        cached = {
+            "result": {
+                **response["result"],
+                "fragments": {"init": web_info_fragment(INIT), "result": web_info_fragment(RESULT)},
+            },
+            "log": "Conversion successful!",
+        }
+
+        with app.test_request_context(base_url="https://api.example.com/"):
+            cases = {
+                "single, encoded": lambda: app.json.response(with_thumbnails(response)),
+                "single, fragments": lambda: json_response(response_json(cached)),
+                "batch, encoded": lambda: app.json.response(
+                    {"results": [with_thumbnails(response) for _ in range(BATCH_SIZE)], "log": "Batch conversion done!"}
+                ),
+                "batch, fragments": lambda: json_response(
+                    f'{{"log":"Batch conversion done!","results":[{",".join(response_json(cached) for _ in range(BATCH_SIZE))}]}}'
+                ),
+            }
+            encoder = "orjson" if use_orjson else "json"
+            for name, case in cases.items():
+                seconds = min(timeit.repeat(case, number=number, repeat=3))
+                print(f"{encoder:>6} | {name:<18} | {seconds / number * 1e6:8.2f} us/response")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20_000, help="Responses serialized per measure.")
+    args = parser.parse_args()
+
+    run(args.number, use_orjson=False)
+    if serialization.orjson is not None:
+        run(args.number, use_orjson=True)
+
+
+if __name__ == "__main__":
+    main()
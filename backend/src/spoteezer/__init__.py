@@ -0,0 +1,23 @@
+import sys
+
+
+def main() -> None:
+    """Entry point of the `spoteezer` command: runs the production server,
+    the conversion job workers with `spoteezer worker`, or imports catalog
+    dumps with `spoteezer import-catalog`.
+    """
+    if sys.argv[1:2] == ["import-catalog"]:
+        from spoteezer.catalog import run_import
+
+        run_import(sys.argv[2:])
+        return
+
+    if sys.argv[1:2] == ["worker"]:
+        from spoteezer.jobs import run_workers
+
+        run_workers(sys.argv[2:])
+        return
+
+    from spoteezer.server import run
+
+    run()
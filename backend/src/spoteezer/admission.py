@@ -0,0 +1,79 @@
+import threading
+import time
+
+from spoteezer.metrics import METRICS
+
+# Maximum time (seconds) a conversion waits for a slot before being shed
+ADMISSION_MAX_WAIT_SEC = 1.0
+
+# Reasons of the shed conversions: too many conversions already waiting, or no slot freed in time
+QUEUE_FULL = "queue_full"
+WAIT_TIMEOUT = "wait_timeout"
+
+
+class AdmissionController:
+    """Bounds the number of conversions calling the upstream APIs at once, so that
+    slow platforms cannot tie up every worker thread: the requests which can be
+    served from the cache keep being served, and the others are shed quickly
+    instead of piling up until they time out.
+    """
+
+    def __init__(self, max_in_flight: int, max_waiting: int, max_wait: float = ADMISSION_MAX_WAIT_SEC):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        """Takes a conversion slot if one is free, without waiting.
+
+        Returns:
+            bool: Whether a slot was taken. It must then be released.
+        """
+        with self._condition:
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> str | None:
+        """Takes a conversion slot, waiting for one to be freed for at most max_wait.
+
+        Returns:
+            str: None if a slot was taken (it must then be released), or the reason
+            why the conversion is shed, i.e QUEUE_FULL or WAIT_TIMEOUT.
+        """
+        started_at = time.monotonic()
+        with self._condition:
+            if self.in_flight >= self.max_in_flight and self.waiting >= self.max_waiting:
+                return QUEUE_FULL
+
+            self.waiting += 1
+            try:
+                admitted = self._condition.wait_for(lambda: self.in_flight < self.max_in_flight, self.max_wait)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                return WAIT_TIMEOUT
+            self.in_flight += 1
+
+        METRICS.increment("admission_wait_ms", int((time.monotonic() - started_at) * 1000))
+        return None
+
+    def release(self) -> None:
+        """Releases a conversion slot."""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def retry_after(self) -> int:
+        """Gets the delay after which shed clients should retry.
+
+        Returns:
+            int: The delay (seconds), growing with the backlog.
+        """
+        with self._condition:
+            backlog = self.in_flight + self.waiting
+        return max(1, round(self.max_wait * backlog / max(self.max_in_flight, 1)))
@@ -0,0 +1,334 @@
+import json
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+if TYPE_CHECKING:
+    import redis
+else:
+    try:
+        import redis
+    except ImportError:  # Optional dependency, only needed for the shared cache
+        redis = None
+
+LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
+
+# Conversion results are served as-is for FRESH_TTL_SEC, then served stale
+# (and refreshed in the background) until STALE_TTL_SEC
+FRESH_TTL_SEC = 24 * 3600
+STALE_TTL_SEC = 30 * 24 * 3600
+
+# Lifetime of the resolved short links and of the ISRC lookups
+LINK_TTL_SEC = 30 * 24 * 3600
+ISRC_TTL_SEC = 7 * 24 * 3600
+
+# Lifetime of the items known to be unavailable on a platform, shorter
+# since they may be released (or made available in the region) later
+NOT_FOUND_TTL_SEC = 6 * 3600
+
+
+class CacheBackend(ABC):
+    """Key-value store with per-entry expiry. Values must be JSON-serializable,
+    so that backends can store them out of process.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Any | None:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    def get_many(self, keys: list[str]) -> list[Any | None]:
+        """Gets the values of several keys at once.
+
+        Args:
+            keys (list): The keys to get.
+
+        Returns:
+            list: The values, None for missing keys, in the order of the keys.
+        """
+        return [self.get(key) for key in keys]
+
+
+class LocalCache(CacheBackend):
+    """In-process cache, evicting the least recently used entries over its size cap."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by all the app nodes, stored in a Redis-compatible server.
+    While the server is unreachable, the local fallback cache is used instead,
+    and the server is retried after a short delay.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        fallback: CacheBackend,
+        prefix: str = "spoteezer:",
+        retry_after: float = 30.0,
+        socket_timeout: float = 0.25,
+    ):
+        if redis is None:
+            raise ImportError("The redis package is required for the shared cache")
+
+        self.client = redis.Redis.from_url(
+            url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout
+        )
+        self.fallback = fallback
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self._down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Whether the server is considered reachable."""
+        return time.monotonic() >= self._down_until
+
+    def _mark_down(self, error: Exception) -> None:
+        LOGGER.warning("shared_cache_unreachable", error=str(error), retry_after=self.retry_after)
+        self._down_until = time.monotonic() + self.retry_after
+
+    def get(self, key: str) -> Any | None:
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: list[str]) -> list[Any | None]:
+        """Gets the values of several keys in a single pipelined round trip.
+
+        Args:
+            keys (list): The keys to get.
+
+        Returns:
+            list: The values, None for missing keys, in the order of the keys.
+        """
+        if not keys:
+            return []
+        if not self.available:
+            return self.fallback.get_many(keys)
+
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipeline.get(self.prefix + key)
+            values = pipeline.execute()
+        except redis.RedisError as e:
+            self._mark_down(e)
+            return self.fallback.get_many(keys)
+
+        return [json.loads(value) if value is not None else None for value in values]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if not self.available:
+            self.fallback.set(key, value, ttl)
+            return
+
+        try:
+            self.client.set(self.prefix + key, json.dumps(value), px=max(int(ttl * 1000), 1))
+        except redis.RedisError as e:
+            self._mark_down(e)
+            self.fallback.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self.fallback.delete(key)
+        if not self.available:
+            return
+
+        try:
+            self.client.delete(self.prefix + key)
+        except redis.RedisError as e:
+            self._mark_down(e)
+
+    def clear(self) -> None:
+        self.fallback.clear()
+        try:
+            for key in self.client.scan_iter(match=f"{self.prefix}*"):
+                self.client.delete(key)
+        except redis.RedisError as e:
+            self._mark_down(e)
+
+
+class RefreshQueue:
+    """Bounded queue of background refreshes, deduplicated by key. Refreshes
+    are dropped when the queue is full, the stale entry being served meanwhile.
+    """
+
+    def __init__(self, maxsize: int = 256, workers: int = 2):
+        self.workers = workers
+        self._queue: queue.Queue[tuple[str, Callable[[], None]]] = queue.Queue(maxsize=maxsize)
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def schedule(self, key: str, refresh: Callable[[], None]) -> bool:
+        """Schedules a refresh, unless one is already pending for the same key.
+
+        Args:
+            key (str): The key of the entry to refresh.
+            refresh (Callable): The function refreshing the entry.
+
+        Returns:
+            bool: Whether the refresh was scheduled.
+        """
+        with self._lock:
+            if key in self._pending:
+                return False
+            try:
+                self._queue.put_nowait((key, refresh))
+            except queue.Full:
+                LOGGER.warning("refresh_queue_full", key=key)
+                return False
+            self._pending.add(key)
+            self._start_workers()
+        return True
+
+    def _start_workers(self) -> None:
+        # Started lazily, so that they run in the worker processes, not in a preloading master
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name="cache-refresher", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self) -> None:
+        while True:
+            key, refresh = self._queue.get()
+            try:
+                refresh()
+            # A failed refresh keeps the stale entry, and must not stop the refresher thread
+            except Exception as e:  # noqa: BLE001
+                LOGGER.warning("cache_refresh_failed", key=key, error=str(e))
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
+
+    def join(self) -> None:
+        """Waits for all the scheduled refreshes to be done."""
+        self._queue.join()
+
+
+class ResultCache:
+    """Conversion results cache with stale-while-revalidate semantics: expired
+    entries are still served, while a refresh is scheduled in the background.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        refresh_queue: RefreshQueue,
+        fresh_ttl: float = FRESH_TTL_SEC,
+        stale_ttl: float = STALE_TTL_SEC,
+    ):
+        self.backend = backend
+        self.refresh_queue = refresh_queue
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+
+    def get(self, key: str, refresh: Callable[[], None]) -> Any | None:
+        """Gets a cached result, scheduling its refresh if it is stale.
+
+        Args:
+            key (str): The key of the result.
+            refresh (Callable): The function refreshing the result if it is stale.
+
+        Returns:
+            The cached result, or None on a cache miss.
+        """
+        return self.get_many([key], [refresh])[0]
+
+    def get_many(self, keys: list[str], refreshes: list[Callable[[], None]]) -> list[Any | None]:
+        """Gets several cached results at once (e.g for batch conversions),
+        scheduling the refresh of the stale ones.
+
+        Args:
+            keys (list): The keys of the results.
+            refreshes (list): The functions refreshing each result if it is stale.
+
+        Returns:
+            list: The cached results, None for cache misses, in the order of the keys.
+        """
+        entries = self.backend.get_many([f"result:{key}" for key in keys])
+
+        results = []
+        for key, refresh, entry in zip(keys, refreshes, entries):
+            if entry is None:
+                results.append(None)
+                continue
+            if entry["fresh_until"] <= time.time():
+                LOGGER.info("stale_result_served", key=key)
+                self.refresh_queue.schedule(key, refresh)
+            results.append(entry["value"])
+
+        return results
+
+    def peek(self, key: str) -> Any | None:
+        """Gets a cached result, fresh or stale, without scheduling any refresh.
+
+        Args:
+            key (str): The key of the result.
+
+        Returns:
+            The cached result, or None on a cache miss.
+        """
+        entry = self.backend.get(f"result:{key}")
+        return entry["value"] if entry is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        """Stores a result, fresh for the configured time.
+
+        Args:
+            key (str): The key of the result.
+            value: The result, JSON-serializable.
+        """
+        entry = {"value": value, "fresh_until": time.time() + self.fresh_ttl}
+        self.backend.set(f"result:{key}", entry, self.stale_ttl)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(f"result:{key}")
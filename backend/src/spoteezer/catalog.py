@@ -0,0 +1,413 @@
+import argparse
+import json
+import re
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import closing
+from typing import Any
+from urllib.parse import unquote
+
+import structlog
+from deezer.exceptions import DeezerErrorResponse
+from spotipy.exceptions import SpotifyException
+
+from spoteezer.helper import preprocess_string
+
+LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
+
+# Size of the memory map of the catalog file: reads are served from the page cache
+CATALOG_MMAP_BYTES = 1024**3
+
+# Number of dump lines inserted per transaction when importing a catalog
+IMPORT_BATCH_SIZE = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    platform TEXT NOT NULL,
+    type TEXT NOT NULL,
+    id TEXT NOT NULL,
+    isrc TEXT,
+    upc TEXT,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    artist_id TEXT,
+    duration_sec INTEGER,
+    popularity REAL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (platform, type, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS items_isrc ON items (platform, isrc) WHERE isrc IS NOT NULL;
+CREATE INDEX IF NOT EXISTS items_upc ON items (platform, upc) WHERE upc IS NOT NULL;
+CREATE INDEX IF NOT EXISTS items_title_artist ON items (platform, type, title, artist);
+CREATE INDEX IF NOT EXISTS items_artist_id ON items (platform, type, artist_id, popularity);
+"""
+
+# Search parameter keys of the platform queries
+QUERY_KEYS = ("track", "artist", "album", "isrc", "upc")
+SPOTIFY_QUERY_PATTERN = re.compile(rf"({'|'.join(QUERY_KEYS)}):(.*?)\s*(?=(?:{'|'.join(QUERY_KEYS)}):|$)")
+DEEZER_QUERY_PATTERN = re.compile(r'(\w+):(?:"([^"]*)"|(\S+))')
+
+
+def normalize(string: str | None) -> str | None:
+    """Normalizes a title or a name the way the search parameters are, for exact lookups.
+
+    Args:
+        string (str): The title or name.
+
+    Returns:
+        str: The normalized string.
+    """
+    return " ".join(preprocess_string(string).split()) if string else None
+
+
+def _catalog_row(platform: str, _type: str, data: dict[str, Any]) -> tuple[Any, ...]:
+    """Extracts the indexed columns of a raw API object."""
+    if platform == "deezer":
+        # Relations are stored as lists, as in the dictionaries of the deezer-python resources
+        for relation in ("tracks", "contributors"):
+            if isinstance(data.get(relation), dict):
+                data[relation] = data[relation].get("data", [])
+        data.setdefault("link", f"https://www.deezer.com/{_type}/{data['id']}")
+        title = data.get("name") if _type == "artist" else data.get("title")
+        artist = data.get("artist", {})
+        album = data.get("album", {})
+        return (
+            platform,
+            _type,
+            str(data["id"]),
+            data.get("isrc"),
+            data.get("upc"),
+            normalize(title),
+            normalize(title if _type == "artist" else artist.get("name")),
+            normalize(album.get("title")),
+            str(artist["id"]) if "id" in artist else None,
+            data.get("duration"),
+            data.get("rank") or data.get("nb_fan"),
+            json.dumps(data, separators=(",", ":")),
+        )
+
+    if platform == "spotify":
+        data.setdefault("external_urls", {"spotify": f"https://open.spotify.com/{_type}/{data['id']}"})
+        artists = data.get("artists", [])
+        external_ids = data.get("external_ids", {})
+        return (
+            platform,
+            _type,
+            data["id"],
+            external_ids.get("isrc"),
+            external_ids.get("upc"),
+            normalize(data.get("name")),
+            normalize(data.get("name") if _type == "artist" else artists[0]["name"] if artists else None),
+            normalize(data.get("album", {}).get("name")),
+            artists[0]["id"] if artists else None,
+            int(data["duration_ms"] / 1000) if "duration_ms" in data else None,
+            data.get("popularity"),
+            json.dumps(data, separators=(",", ":")),
+        )
+
+    raise ValueError(f"Unknown catalog platform: {platform}")
+
+
+def import_catalog(lines: Iterable[str], path: str) -> int:
+    """Imports a catalog dump into a catalog store, replacing the items already stored.
+    The dump has one JSON object per line: {"platform": "deezer" or "spotify",
+    "type": "track", "album" or "artist", "data": <the raw API object>}.
+
+    Args:
+        lines (Iterable): The lines of the dump.
+        path (str): The path of the catalog store, created if needed.
+
+    Returns:
+        int: The number of imported items.
+    """
+    count = 0
+    with closing(sqlite3.connect(path)) as connection:
+        connection.executescript(SCHEMA)
+        batch: list[tuple[Any, ...]] = []
+        for line in lines:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            batch.append(_catalog_row(entry["platform"], entry["type"], entry["data"]))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                count += _insert(connection, batch)
+        count += _insert(connection, batch)
+        connection.execute("ANALYZE")
+        connection.commit()
+        connection.execute("VACUUM")
+
+    LOGGER.info("catalog_imported", path=path, items=count)
+    return count
+
+
+def _insert(connection: sqlite3.Connection, batch: list[tuple[Any, ...]]) -> int:
+    with connection:
+        connection.executemany(f"INSERT OR REPLACE INTO items VALUES ({', '.join('?' * 12)})", batch)
+    count = len(batch)
+    batch.clear()
+    return count
+
+
+class CatalogStore:
+    """Read-only, memory-mapped catalog slice of the platforms, indexed by
+    id, ISRC, UPC, and normalized title and artist.
+    """
+
+    def __init__(self, path: str, mmap_bytes: int = CATALOG_MMAP_BYTES):
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        # SQLite connections cannot be shared between threads
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            connection.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            self._local.connection = connection
+        return connection
+
+    def _select(self, where: str, params: tuple[Any, ...], limit: int | None = None, order: str = "") -> list[dict]:
+        query = f"SELECT data FROM items WHERE {where} {order}" + (f" LIMIT {int(limit)}" if limit else "")
+        return [json.loads(row[0]) for row in self._connect().execute(query, params)]
+
+    def get(self, platform: str, _type: str, _id: str | int) -> dict[str, Any] | None:
+        """Gets an item by id.
+
+        Args:
+            platform (str): The platform, i.e deezer or spotify.
+            _type (str): The item type, i.e track, album, or artist.
+            _id (str): The id of the item on the platform.
+
+        Returns:
+            dict: The raw API object of the item, or None if it is not in the catalog.
+        """
+        items = self._select("platform = ? AND type = ? AND id = ?", (platform, _type, str(_id)))
+        return items[0] if items else None
+
+    def find_by_isrc(self, platform: str, isrc: str) -> list[dict[str, Any]]:
+        """Gets the tracks with the given ISRC.
+
+        Args:
+            platform (str): The platform, i.e deezer or spotify.
+            isrc (str): The ISRC.
+
+        Returns:
+            list: The raw API objects of the tracks.
+        """
+        return self._select("platform = ? AND isrc = ?", (platform, isrc), order="ORDER BY popularity DESC")
+
+    def find_by_upc(self, platform: str, upc: str) -> list[dict[str, Any]]:
+        """Gets the albums with the given UPC.
+
+        Args:
+            platform (str): The platform, i.e deezer or spotify.
+            upc (str): The UPC.
+
+        Returns:
+            list: The raw API objects of the albums.
+        """
+        return self._select("platform = ? AND upc = ?", (platform, upc), order="ORDER BY popularity DESC")
+
+    def top_tracks(self, platform: str, artist_id: str | int, limit: int = 10) -> list[dict[str, Any]]:
+        """Gets the most popular tracks of an artist.
+
+        Args:
+            platform (str): The platform, i.e deezer or spotify.
+            artist_id (str): The id of the artist.
+            limit (int, optional): The maximum number of tracks. Defaults to 10.
+
+        Returns:
+            list: The raw API objects of the tracks.
+        """
+        return self._select(
+            "platform = ? AND type = 'track' AND artist_id = ?",
+            (platform, str(artist_id)),
+            limit=limit,
+            order="ORDER BY popularity DESC",
+        )
+
+    def search(self, platform: str, _type: str, params: dict[str, Any], limit: int = 10) -> list[dict[str, Any]]:
+        """Searches items by normalized title and artist, and optionally album, duration, ISRC or UPC.
+
+        Args:
+            platform (str): The platform, i.e deezer or spotify.
+            _type (str): The item type, i.e track, album, or artist.
+            params (dict): The search parameters, as parsed from a platform query.
+            limit (int, optional): The maximum number of results. Defaults to 10.
+
+        Returns:
+            list: The raw API objects of the found items, by decreasing popularity.
+        """
+        conditions: list[str] = ["platform = ?", "type = ?"]
+        values: list[Any] = [platform, _type]
+        title = params.get("artist") if _type == "artist" else params.get(_type)
+        filters = {
+            "title": normalize(title),
+            "artist": normalize(params.get("artist")),
+            "album": normalize(params.get("album")) if _type == "track" else None,
+            "isrc": params.get("isrc"),
+            "upc": params.get("upc"),
+        }
+        for column, value in filters.items():
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                values.append(value)
+        if params.get("dur_min") is not None:
+            conditions.append("duration_sec BETWEEN ? AND ?")
+            values += [int(params["dur_min"]), int(params.get("dur_max", params["dur_min"]))]
+
+        return self._select(" AND ".join(conditions), tuple(values), limit=limit, order="ORDER BY popularity DESC")
+
+
+def _no_data(message: str = "no data") -> DeezerErrorResponse:
+    """Builds the error the Deezer API responds with for missing items."""
+    # Annotated as dict[str, str] by deezer-python, the error is actually a nested object
+    json_data: Any = {"error": {"type": "DataException", "message": message, "code": 800}}
+    return DeezerErrorResponse(json_data)
+
+
+class CatalogResource:
+    """Deezer API resource served from the catalog, as returned by deezer-python."""
+
+    def __init__(self, data: dict[str, Any]):
+        self._data = data
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self.__dict__["_data"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def as_dict(self) -> dict[str, Any]:
+        return self._data
+
+
+class LocalDeezerClient:
+    """Drop-in replacement of the deezer-python client for the calls the Deezer
+    items make, served from a catalog store without any network call.
+    """
+
+    def __init__(self, store: CatalogStore):
+        self.store = store
+
+    def _get(self, _type: str, _id: str | int) -> CatalogResource:
+        data = self.store.get("deezer", _type, _id)
+        if data is None:
+            raise _no_data()
+        return CatalogResource(data)
+
+    def get_track(self, track_id: int) -> CatalogResource:
+        return self._get("track", track_id)
+
+    def get_album(self, album_id: int) -> CatalogResource:
+        return self._get("album", album_id)
+
+    def get_artist(self, artist_id: int) -> CatalogResource:
+        return self._get("artist", artist_id)
+
+    def _search(self, _type: str, query: str) -> list[CatalogResource]:
+        params = {}
+        for key, quoted_value, value in DEEZER_QUERY_PATTERN.findall(unquote(query)):
+            params[key] = quoted_value or value
+        return [CatalogResource(data) for data in self.store.search("deezer", _type, params)]
+
+    def search(self, query: str, **kwargs: Any) -> list[CatalogResource]:
+        return self._search("track", query)
+
+    def search_albums(self, query: str, **kwargs: Any) -> list[CatalogResource]:
+        return self._search("album", query)
+
+    def search_artists(self, query: str, **kwargs: Any) -> list[CatalogResource]:
+        return self._search("artist", query)
+
+    def request(self, method: str, path: str, params: dict[str, Any] | None = None, **kwargs: Any) -> Any:
+        """Serves the raw API paths the Deezer items request: tracks by ISRC, artists' top tracks, and album tracks."""
+        if path.startswith("track/isrc:"):
+            tracks = self.store.find_by_isrc("deezer", path.removeprefix("track/isrc:"))
+            if not tracks:
+                raise _no_data()
+            return CatalogResource(tracks[0])
+
+        match = re.fullmatch(r"artist/(\d+)/top", path)
+        if match is not None:
+            limit = int((params or {}).get("limit", 5))
+            return [CatalogResource(data) for data in self.store.top_tracks("deezer", match.group(1), limit)]
+
+        match = re.fullmatch(r"album/(\d+)/tracks", path)
+        if match is not None:
+            index, limit = int((params or {}).get("index", 0)), int((params or {}).get("limit", 25))
+            tracks = self._get("album", match.group(1)).as_dict().get("tracks", [])
+            return [CatalogResource(data) for data in tracks[index : index + limit]]
+
+        raise _no_data(f"path not served by the catalog: {path}")
+
+
+class LocalSpotifyClient:
+    """Drop-in replacement of the spotipy client for the calls the Spotify
+    items make, served from a catalog store without any network call.
+    """
+
+    def __init__(self, store: CatalogStore):
+        self.store = store
+
+    def _get(self, _type: str, _id: str) -> dict[str, Any]:
+        data = self.store.get("spotify", _type, _id)
+        if data is None:
+            raise SpotifyException(404, -1, f"{_type.capitalize()} not found in the catalog")
+        return data
+
+    def track(self, track_id: str, market: str | None = None) -> dict[str, Any]:
+        return self._get("track", track_id)
+
+    def album(self, album_id: str, market: str | None = None) -> dict[str, Any]:
+        return self._get("album", album_id)
+
+    def artist(self, artist_id: str) -> dict[str, Any]:
+        return self._get("artist", artist_id)
+
+    def tracks(self, tracks: list[str], market: str | None = None) -> dict[str, Any]:
+        return {"tracks": [self.store.get("spotify", "track", track_id) for track_id in tracks]}
+
+    def album_tracks(self, album_id: str, limit: int = 50, offset: int = 0, market: str | None = None) -> dict[str, Any]:
+        tracks = self._get("album", album_id).get("tracks", {})
+        items = tracks.get("items", [])[offset : offset + limit]
+        total = tracks.get("total", len(tracks.get("items", [])))
+        return {"items": items, "total": total, "next": None if offset + limit >= total else "catalog"}
+
+    def artist_top_tracks(self, artist_id: str, country: str = "US") -> dict[str, Any]:
+        return {"tracks": self.store.top_tracks("spotify", artist_id)}
+
+    def search(self, q: str, limit: int = 10, offset: int = 0, type: str = "track", **kwargs: Any) -> dict[str, Any]:
+        params = dict(SPOTIFY_QUERY_PATTERN.findall(q))
+        items = self.store.search("spotify", type, params, limit=limit)
+        return {f"{type}s": {"total": len(items), "items": items}}
+
+
+def iter_dump(paths: list[str]) -> Iterator[str]:
+    """Iterates over the lines of the given dump files."""
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            yield from file
+
+
+def run_import(argv: list[str] | None = None) -> None:
+    """Imports catalog dumps from the command line.
+
+    Args:
+        argv (list, optional): The command-line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        prog="spoteezer import-catalog",
+        description="Import Deezer and Spotify catalog dumps (JSON lines) into a catalog store, "
+        "used instead of the APIs when SPOTEEZER_CATALOG_PATH is set.",
+    )
+    parser.add_argument("dumps", nargs="+", help="The dump files.")
+    parser.add_argument("--output", "-o", required=True, help="The path of the catalog store.")
+    args = parser.parse_args(argv)
+
+    count = import_catalog(iter_dump(args.dumps), args.output)
+    print(f"Imported {count} items into {args.output}")
@@ -1,16 +1,89 @@
 import os
+import tempfile
 import spotipy
-import deezer
 
+from spoteezer.catalog import CatalogStore, LocalDeezerClient, LocalSpotifyClient
+from spoteezer.cache import CacheBackend, LocalCache, RedisCache, RefreshQueue, ResultCache
+from spoteezer.jobs import JobQueue
+from spoteezer.profiling import STAGE_TIMES
+from spoteezer.resilience import UPSTREAM_TIMEOUT_SEC, DeadlineDeezerClient, DeadlineSpotify
+from spoteezer.server import DEFAULT_THREADS
+from spoteezer.thumbnails import ThumbnailCache
+from spoteezer.token_cache import SharedTokenCacheHandler, TokenRefresher
 
-# Deezer API
-DEEZER = deezer.Client()
+
+# Deezer API, its calls bounded by the request deadlines
+DEEZER = DeadlineDeezerClient()
 
 # Spotify API credentials
 SpotifyClientCredentials = spotipy.oauth2.SpotifyClientCredentials
 SPOTIFY_CLIENT_ID = os.environ.get("SPOTIFY_CLIENT_ID")
 SPOTIFY_CLIENT_SECRET = os.environ.get("SPOTIFY_CLIENT_SECRET")
+
+# Spotify access token, shared by all the worker processes of the host
+SPOTIFY_TOKEN_CACHE_PATH = os.environ.get("SPOTIFY_TOKEN_CACHE_PATH") or os.path.join(
+    tempfile.gettempdir(), "spoteezer-spotify-token.json"
+)
+SPOTIFY_TOKEN_CACHE = SharedTokenCacheHandler(SPOTIFY_TOKEN_CACHE_PATH)
 SPOTIFY_CLIENT_CREDS = SpotifyClientCredentials(
-    client_id=SPOTIFY_CLIENT_ID, client_secret=SPOTIFY_CLIENT_SECRET
+    client_id=SPOTIFY_CLIENT_ID,
+    client_secret=SPOTIFY_CLIENT_SECRET,
+    cache_handler=SPOTIFY_TOKEN_CACHE,
+)
+SPOTIFY_TOKEN_REFRESHER = TokenRefresher(SPOTIFY_CLIENT_CREDS, SPOTIFY_TOKEN_CACHE)
+# Offline catalog snapshot, served instead of the platform APIs if set (see `spoteezer import-catalog`)
+CATALOG_PATH = os.environ.get("SPOTEEZER_CATALOG_PATH")
+CATALOG = CatalogStore(CATALOG_PATH) if CATALOG_PATH else None
+SPOTIFY_TOKEN_REFRESH = os.environ.get("SPOTIFY_TOKEN_REFRESH", "0" if CATALOG else "1") == "1"
+# Calls are bounded by the request deadlines and the upstream timeout, and rate-limited or
+# failing calls are not retried (and slept on): the circuit breakers handle degraded platforms
+SPOTIFY = DeadlineSpotify(
+    client_credentials_manager=SPOTIFY_CLIENT_CREDS,
+    requests_timeout=UPSTREAM_TIMEOUT_SEC,
+    retries=1,
+    status_retries=0,
 )
-SPOTIFY = spotipy.Spotify(client_credentials_manager=SPOTIFY_CLIENT_CREDS)
+
+# In catalog mode, the items look up and search the catalog without any API call
+if CATALOG is not None:
+    DEEZER = LocalDeezerClient(CATALOG)
+    SPOTIFY = LocalSpotifyClient(CATALOG)
+
+# Whether the slow idempotent upstream calls (e.g lookups by id or ISRC) are hedged, i.e duplicated
+HEDGE_UPSTREAM_CALLS = os.environ.get("SPOTEEZER_HEDGING", "0") == "1"
+
+# Downsized cover images, cached on local disk
+THUMBNAIL_DIR = os.environ.get("SPOTEEZER_THUMBNAIL_DIR") or os.path.join(
+    tempfile.gettempdir(), "spoteezer-thumbnails"
+)
+THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get("SPOTEEZER_THUMBNAIL_CACHE_MB") or 256) * 1024 * 1024
+THUMBNAIL_CACHE = ThumbnailCache(THUMBNAIL_DIR, THUMBNAIL_CACHE_MAX_BYTES)
+
+# Cache of the conversion results, ISRC lookups and resolved short links.
+# Shared by all the app nodes if a Redis URL is set, local to the process otherwise.
+CACHE_MAX_ENTRIES = int(os.environ.get("SPOTEEZER_CACHE_SIZE") or 10_000)
+REDIS_URL = os.environ.get("SPOTEEZER_REDIS_URL")
+CACHE: CacheBackend = LocalCache(CACHE_MAX_ENTRIES)
+if REDIS_URL:
+    CACHE = RedisCache(REDIS_URL, fallback=CACHE)
+
+# Conversion results, served stale while being refreshed in the background
+RESULT_CACHE = ResultCache(CACHE, RefreshQueue())
+
+# Conversions calling the upstream APIs at once in each process, and conversions waiting for a slot.
+# Kept below the server threads, so that cached results are still served when the platforms slow down.
+SERVER_THREADS = int(os.environ.get("SPOTEEZER_THREADS") or DEFAULT_THREADS)
+MAX_CONVERSIONS = int(os.environ.get("SPOTEEZER_MAX_CONVERSIONS") or max(SERVER_THREADS - 1, 1))
+MAX_WAITING_CONVERSIONS = int(os.environ.get("SPOTEEZER_MAX_WAITING_CONVERSIONS") or MAX_CONVERSIONS)
+
+# Background conversion jobs, persisted in a local SQLite database, and the number of job worker
+# threads run by each request-serving process. None by default: jobs are run by `spoteezer worker`,
+# apart from the request-serving processes.
+JOB_DB_PATH = os.environ.get("SPOTEEZER_JOB_DB") or os.path.join(tempfile.gettempdir(), "spoteezer-jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("SPOTEEZER_JOB_WORKERS") or 0)
+JOB_QUEUE = JobQueue(JOB_DB_PATH)
+
+# Token enabling the profiling of requests (X-Profile header) and the /admin/profile and
+# /admin/stages endpoints. The CPU time of the conversion stages is only recorded if set.
+PROFILING_TOKEN = os.environ.get("SPOTEEZER_PROFILING_TOKEN") or None
+STAGE_TIMES.enabled = PROFILING_TOKEN is not None
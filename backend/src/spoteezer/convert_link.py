@@ -1,53 +1,97 @@
 import structlog
 
-from typing import Union
+from functools import partial
+from typing import Any
+from concurrent.futures import ThreadPoolExecutor
 
+from spoteezer.cache import NOT_FOUND_TTL_SEC
+from spoteezer.config import CACHE, RESULT_CACHE
 from spoteezer.items.abstract_item import AbstractItem
-from spoteezer.items.deezer_item import DeezerItem
-from spoteezer.items.spotify_item import SpotifyItem
+from spoteezer.platforms import PLATFORMS, get_default_target, get_platform, get_platform_from_url
+from spoteezer.profiling import STAGE_TIMES
+from spoteezer.resilience import ConversionCancelled, Deadline
+from spoteezer.serialization import web_info_fragment
 
 LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
 
-def get_item(url: str) -> Union[DeezerItem, SpotifyItem]:
+
+@STAGE_TIMES.timed("get_item")
+def get_item(url: str, deadline: Deadline | None = None) -> AbstractItem:
     """Gets the item from the given URL.
 
     Args:
         URL (str): URL of the item.
+        deadline (Deadline, optional): The deadline of the request. Defaults to None.
 
     Raises:
-        ValueError: If the URL is not from Deezer or Spotify.
+        ValueError: If the URL is not from a registered platform.
 
     Returns:
         Item: The item from the given URL.
     """
-    if "deezer" in url:
-        item = DeezerItem(url=url)
-    elif "spotify" in url:
-        item = SpotifyItem(url=url)
-    else:
-        raise ValueError("Could not determine between Deezer and Spotify from URL.")
+    item = get_platform_from_url(url)(url=url, deadline=deadline)
 
     LOGGER.info("item_initialized", platform=item.PLATFORM, url=url)
 
     return item
 
 
-def convert_item(init_item: AbstractItem) -> Union[DeezerItem, SpotifyItem]:
-    """Converts the given initial item into another item,
-    i.e from a DeezerItem to a SpotifyItem and vice-versa.
+def canonicalize_url(url: str) -> str:
+    """Gets the canonical form of the given item URL, without any network call.
+    URLs that cannot be parsed (e.g short links) are only stripped and upgraded to https.
+
+    Args:
+        url (str): URL of the item.
+
+    Returns:
+        str: The canonical URL.
+    """
+    for item_class in PLATFORMS.values():
+        canonical_url = item_class.canonical_url(url)
+        if canonical_url is not None:
+            return canonical_url
+
+    return url.strip().replace("http://", "https://")
+
+
+def conversion_key(url: str, target: str) -> str:
+    """Gets the cache key of the conversion of the given URL to the given platform.
+
+    Args:
+        url (str): Canonical URL of the item.
+        target (str): The target platform.
+
+    Returns:
+        str: The cache key.
+    """
+    return f"{target}:{url}"
+
+
+@STAGE_TIMES.timed("convert_item")
+def convert_item(
+    init_item: AbstractItem,
+    target: str | None = None,
+    deadline: Deadline | None = None,
+) -> AbstractItem:
+    """Converts the given initial item into an item of the target platform,
+    e.g from a DeezerItem to a SpotifyItem.
 
     Args:
         init_item (AbstractItem): The initial item to convert.
+        target (str, optional): The target platform. Defaults to the default target of the item's platform.
+        deadline (Deadline, optional): The deadline of the request. Defaults to None.
+
+    Raises:
+        ValueError: If the target platform is unknown, or is the platform of the item.
 
     Returns:
-        AbstractItem: The item from the given URL.
+        AbstractItem: The converted item.
     """
-    if type(init_item) is DeezerItem:
-        result_item = SpotifyItem(item=init_item)
-    elif type(init_item) is SpotifyItem:
-        result_item = DeezerItem(item=init_item)
-    else:
-        raise ValueError(f"Unknown item type: {type(init_item)}")
+    target = target or get_default_target(init_item.PLATFORM)
+    if target == init_item.PLATFORM:
+        raise ValueError(f"Cannot convert a {target} item to {target}")
+
+    result_item = get_platform(target)(item=init_item, deadline=deadline)
 
     LOGGER.info(
         "item_converted",
@@ -56,3 +100,290 @@ def convert_item(init_item: AbstractItem) -> Union[DeezerItem, SpotifyItem]:
     )
 
     return result_item
+
+
+def convert_url(
+    url: str,
+    deadline: Deadline | None = None,
+    target: str | None = None,
+    with_fragments: bool = False,
+) -> dict[str, Any]:
+    """Converts the item of the given URL. Results are cached by canonical URL,
+    and stale results are served immediately while being refreshed in the background.
+
+    Args:
+        url (str): URL of the item.
+        deadline (Deadline, optional): The deadline of the request. Defaults to None.
+        target (str, optional): The target platform. Defaults to the default target of the URL's platform.
+        with_fragments (bool, optional): Whether to also return the pre-serialized JSON
+            "fragments" of the items, if available. Defaults to False.
+
+    Raises:
+        FileNotFoundError: If the item could not be found on the target platform.
+
+    Returns:
+        dict: The web information of the initial ("init") and converted ("result") items.
+    """
+    url = canonicalize_url(url)
+    target = target or get_default_target(get_platform_from_url(url).PLATFORM)
+    key = conversion_key(url, target)
+    result = RESULT_CACHE.get(key, refresh=lambda: refresh_conversion(url, target))
+    if result is not None:
+        LOGGER.info("conversion_cache_hit", url=url, target=target)
+    elif is_known_not_found(url, target):
+        raise FileNotFoundError(f"Could not find item on {target.capitalize()}...")
+    else:
+        init_item = get_item(url, deadline=deadline)
+        result = convert_and_record(url, target, init_item, deadline)
+
+    return result if with_fragments else without_fragments(result)
+
+
+def not_found_key(target: str, item_key: str) -> str:
+    """Gets the cache key marking an item as unavailable on the given platform.
+
+    Args:
+        target (str): The target platform.
+        item_key (str): The canonical URL of the item, or its ISRC as "isrc:<ISRC>".
+
+    Returns:
+        str: The cache key.
+    """
+    return f"not_found:{target}:{item_key}"
+
+
+def is_known_not_found(url: str, target: str) -> bool:
+    """Checks whether the item of the given URL recently could not be found on the target platform.
+
+    Args:
+        url (str): Canonical URL of the item.
+        target (str): The target platform.
+
+    Returns:
+        bool: Whether the item is known to be unavailable.
+    """
+    if CACHE.get(not_found_key(target, url)) is None:
+        return False
+
+    LOGGER.info("known_not_found", url=url, target=target)
+    return True
+
+
+def convert_and_record(
+    url: str, target: str, init_item: AbstractItem, deadline: Deadline | None = None
+) -> dict[str, Any]:
+    """Converts the given item to the target platform and records the result. Items
+    which cannot be found are remembered for a while, by URL and by ISRC (e.g for the
+    other releases of the same track), so that retrying them costs no upstream call.
+
+    Args:
+        url (str): Canonical URL of the item.
+        target (str): The target platform.
+        init_item (AbstractItem): The item of the URL.
+        deadline (Deadline, optional): The deadline of the request. Defaults to None.
+
+    Raises:
+        FileNotFoundError: If the item could not be found on the target platform.
+
+    Returns:
+        dict: The result, as returned by record_conversion.
+    """
+    not_found_keys = {not_found_key(target, url), not_found_key(target, canonicalize_url(init_item.web_info["url"]))}
+    isrc = getattr(init_item, "isrc", None)
+    if isinstance(isrc, str):
+        isrc_key = not_found_key(target, f"isrc:{isrc}")
+        not_found_keys.add(isrc_key)
+        if CACHE.get(isrc_key) is not None:
+            LOGGER.info("known_not_found", url=url, target=target, isrc=isrc)
+            CACHE.set(not_found_key(target, url), True, NOT_FOUND_TTL_SEC)
+            raise FileNotFoundError(f"Could not find item on {target.capitalize()}...")
+
+    try:
+        result_item = convert_item(init_item, target=target, deadline=deadline)
+    except FileNotFoundError:
+        for key in not_found_keys:
+            CACHE.set(key, True, NOT_FOUND_TTL_SEC)
+        raise
+
+    return record_conversion(url, target, init_item, result_item)
+
+
+def without_fragments(result: dict[str, Any]) -> dict[str, Any]:
+    """Gets a cached conversion result without its pre-serialized JSON fragments.
+
+    Args:
+        result (dict): The cached conversion result.
+
+    Returns:
+        dict: The web information of the initial ("init") and converted ("result") items.
+    """
+    return {"init": result["init"], "result": result["result"]}
+
+
+def convert_url_to_all(
+    url: str,
+    targets: list[str] | None = None,
+    deadline: Deadline | None = None,
+) -> dict[str, Any]:
+    """Converts the item of the given URL to several platforms at once. The
+    source item is resolved once, and all the targets missing from the cache
+    are converted concurrently, so that adding targets adds no serial latency.
+
+    Args:
+        url (str): URL of the item.
+        targets (list, optional): The target platforms. Defaults to all the other registered platforms.
+        deadline (Deadline, optional): The deadline of the request. Defaults to None.
+
+    Raises:
+        ValueError: If a target platform is unknown.
+
+    Returns:
+        dict: The web information of the initial item ("init"), of the converted items
+        by platform ("results"), and the error messages of the failed targets ("errors").
+    """
+    url = canonicalize_url(url)
+    source = get_platform_from_url(url).PLATFORM
+    targets = [target for target in dict.fromkeys(targets or PLATFORMS) if target != source]
+    for target in targets:
+        get_platform(target)
+
+    cached = RESULT_CACHE.get_many(
+        [conversion_key(url, target) for target in targets],
+        [partial(refresh_conversion, url, target) for target in targets],
+    )
+    init_info = next((result["init"] for result in cached if result is not None), None)
+    results = {target: result["result"] for target, result in zip(targets, cached) if result is not None}
+    errors: dict[str, str] = {}
+
+    missed_targets = []
+    for target in targets:
+        if target in results:
+            continue
+        if is_known_not_found(url, target):
+            errors[target] = f"Could not find item on {target.capitalize()}..."
+        else:
+            missed_targets.append(target)
+
+    if missed_targets or init_info is None:
+        init_item = get_item(url, deadline=deadline)
+        init_info = init_item.web_info
+        with ThreadPoolExecutor(max_workers=max(len(missed_targets), 1)) as executor:
+            futures = {
+                target: executor.submit(convert_and_record, url, target, init_item, deadline)
+                for target in missed_targets
+            }
+
+        for target, future in futures.items():
+            try:
+                results[target] = future.result()["result"]
+            except FileNotFoundError:
+                errors[target] = f"Could not find item on {target.capitalize()}..."
+            except ConversionCancelled:
+                raise
+            # A failed target is reported in the errors, without failing the other targets
+            except Exception as e:  # noqa: BLE001
+                LOGGER.warning("fan_out_conversion_failed", url=url, target=target, error=str(e))
+                errors[target] = str(e)
+
+    LOGGER.info("fan_out_conversion_done", url=url, converted=len(missed_targets), failed=len(errors))
+
+    return {"init": init_info, "results": results, "errors": errors}
+
+
+def get_cached_conversions(urls: list[str], with_fragments: bool = False) -> list[dict[str, Any] | None]:
+    """Gets the cached results of several URLs, converted to their default
+    target, in a single round trip to the cache. Stale results are refreshed
+    in the background, as in convert_url.
+
+    Args:
+        urls (list): URLs of the items.
+        with_fragments (bool, optional): Whether to also return the pre-serialized JSON
+            "fragments" of the items, if available. Defaults to False.
+
+    Returns:
+        list: The cached results, None for cache misses, in the order of the URLs.
+    """
+    results: list[dict[str, Any] | None] = [None] * len(urls)
+    indices, keys, refreshes = [], [], []
+    for i, url in enumerate(urls):
+        url = canonicalize_url(url)
+        try:
+            target = get_default_target(get_platform_from_url(url).PLATFORM)
+        except ValueError:
+            # Not a link of a registered platform: left for convert_url to report
+            continue
+        indices.append(i)
+        keys.append(conversion_key(url, target))
+        refreshes.append(partial(refresh_conversion, url, target))
+
+    for i, result in zip(indices, RESULT_CACHE.get_many(keys, refreshes)):
+        if result is not None:
+            results[i] = result if with_fragments else without_fragments(result)
+
+    return results
+
+
+def refresh_conversion(url: str, target: str) -> None:
+    """Converts the item of the given URL again, to refresh its cached result.
+    The result is dropped if the item cannot be found anymore.
+
+    Args:
+        url (str): Canonical URL of the item.
+        target (str): The target platform.
+    """
+    try:
+        deadline = Deadline()
+        convert_and_record(url, target, get_item(url, deadline=deadline), deadline)
+    except FileNotFoundError:
+        LOGGER.info("cached_result_removed", url=url, target=target)
+        RESULT_CACHE.delete(conversion_key(url, target))
+
+
+@STAGE_TIMES.timed("record_conversion")
+def record_conversion(url: str, target: str, init_item: AbstractItem, result_item: AbstractItem) -> dict[str, Any]:
+    """Stores the result of a conversion in both directions, so that converting
+    the result back (or converting an alternate id of either item) is a cache hit.
+
+    A reverse mapping is only written if it does not contradict an existing one,
+    e.g when several releases of a track convert to the same track.
+
+    Args:
+        url (str): The converted URL.
+        target (str): The target platform.
+        init_item (AbstractItem): The initial item.
+        result_item (AbstractItem): The converted item.
+
+    Returns:
+        dict: The web information of the initial ("init") and converted ("result") items,
+        and their pre-serialized JSON "fragments".
+    """
+    # Each item is serialized once, then assembled as-is into the responses
+    init_fragment = web_info_fragment(init_item.web_info)
+    result_fragment = web_info_fragment(result_item.web_info)
+    result = {
+        "init": init_item.web_info,
+        "result": result_item.web_info,
+        "fragments": {"init": init_fragment, "result": result_fragment},
+    }
+    reverse_result = {
+        "init": result_item.web_info,
+        "result": init_item.web_info,
+        "fragments": {"init": result_fragment, "result": init_fragment},
+    }
+    source = get_platform_from_url(url).PLATFORM
+
+    # Also cache the result under the resolved URL (e.g for short links) and the alternate ids
+    init_url = canonicalize_url(init_item.web_info["url"])
+    for url_key in {url, init_url, *init_item.get_alternate_urls()}:
+        RESULT_CACHE.set(conversion_key(url_key, target), result)
+
+    result_url = canonicalize_url(result_item.web_info["url"])
+    for url_key in {result_url, *result_item.get_alternate_urls()}:
+        key = conversion_key(url_key, source)
+        existing = RESULT_CACHE.peek(key)
+        if existing is not None and canonicalize_url(existing["result"]["url"]) != init_url:
+            LOGGER.info("reverse_mapping_conflict", key=key, existing=existing["result"]["url"], new=init_url)
+            continue
+        RESULT_CACHE.set(key, reverse_result)
+
+    return result
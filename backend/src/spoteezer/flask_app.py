@@ -1,12 +1,43 @@
+import hmac
+import json
+import time
+import queue
+import select
+import socket
 import logging
+import threading
+import requests
 import structlog
 
 from typing import Any
+from collections.abc import Callable, Generator, Iterator
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
-from flask import Flask, request
+from flask import Flask, Response, abort, g, jsonify, redirect, request, send_file, url_for
 from flask_cors import CORS
+from werkzeug.wrappers import Response as WerkzeugResponse
 
-from spoteezer.convert_link import get_item, convert_item
+from spoteezer.admission import QUEUE_FULL, AdmissionController
+from spoteezer.config import (
+    JOB_QUEUE,
+    JOB_WORKERS,
+    MAX_CONVERSIONS,
+    MAX_WAITING_CONVERSIONS,
+    PROFILING_TOKEN,
+    SPOTIFY_TOKEN_REFRESH,
+    SPOTIFY_TOKEN_REFRESHER,
+    THUMBNAIL_CACHE,
+)
+from spoteezer.convert_link import canonicalize_url, convert_url, convert_url_to_all, get_cached_conversions
+from spoteezer.http_cache import compress_response, set_cache_headers
+from spoteezer.jobs import FINISHED_STATUSES, JobWorkerPool
+from spoteezer.links import find_links, rewrite_links
+from spoteezer.metrics import METRICS
+from spoteezer.platforms import PLATFORMS
+from spoteezer.profiling import MAX_PROFILE_SEC, STAGE_TIMES, SamplingProfiler
+from spoteezer.serialization import OrjsonProvider, conversion_fragment, dumps, orjson, render_fragment
+from spoteezer.resilience import BREAKERS, CLIENT_REQUESTS, CircuitOpenError, ConversionCancelled, Deadline, DeadlineExceeded
 
 # Configure standard library logging
 file_handler = logging.FileHandler("logs.log")
@@ -37,46 +68,188 @@ structlog.configure(
 )
 
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*", "methods": ["GET", "POST", "OPTIONS"], "allow_headers": ["Content-Type"]}})
+CORS(app, resources={r"/*": {"origins": "*", "methods": ["GET", "POST", "OPTIONS"], "allow_headers": ["Content-Type", "X-Client-Token", "X-Profile"]}})
+
+# Serialize the responses with orjson, if installed
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
 # Get a logger for the Flask app
 LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
 app.logger = LOGGER
 
+# Keep the shared Spotify token fresh in the background
+if SPOTIFY_TOKEN_REFRESH:
+    SPOTIFY_TOKEN_REFRESHER.start()
+
+
+# Maximum number of URLs in a batch conversion, and of conversions run concurrently
+MAX_BATCH_SIZE = 50
+BATCH_WORKERS = 8
+
+# Cache lifetime (seconds) of the thumbnails in browsers and CDNs
+THUMBNAIL_MAX_AGE = 30 * 24 * 3600
+
+# Maximum number of URLs in a conversion job
+MAX_JOB_SIZE = 1000
+
+# Interval (seconds) between two progress checks of a job event stream, and
+# maximum duration of the stream, after which clients reconnect
+JOB_EVENTS_INTERVAL = 1.0
+JOB_EVENTS_MAX_SEC = 300.0
+
+# Maximum size (characters) of a text whose links are converted
+MAX_TEXT_SIZE = 1024 * 1024
+
+# Conversions run concurrently for a stream, and records read ahead of the
+# results read by the client, bounding the memory of a stream whose client reads slowly
+STREAM_WORKERS = 8
+STREAM_MAX_IN_FLIGHT = 32
+
+# Maximum size of a record of a conversion stream
+STREAM_MAX_RECORD_BYTES = 8 * 1024
+
+# Interval (seconds) at which a stream reader waiting for its client checks whether the stream was closed
+STREAM_POLL_INTERVAL_SEC = 0.5
+
+# Header identifying the client (e.g a browser tab), whose newer requests cancel its previous ones
+CLIENT_TOKEN_HEADER = "X-Client-Token"
 
-@app.route("/convert", methods=["POST"])
-def convert() -> dict[str, Any]:
-    """Creates an Item from the given URL, converts it
-    into another item (Spotify or Deezer), and extract useful
-    information for web display.
+
+def with_thumbnail(web_info: dict[str, Any]) -> dict[str, Any]:
+    """Points the image URL of an item to the thumbnail proxy.
+    Must be called from the request thread, to build the external proxy URL.
+
+    Args:
+        web_info (dict): The web information of the item.
 
     Returns:
-        dict: The response to the initial POST request.
+        dict: The web information, with the proxied image URL.
     """
+    img_url = web_info.get("img_url")
+    if img_url and THUMBNAIL_CACHE.is_allowed(img_url):
+        web_info = {**web_info, "img_url": url_for("thumbnail", src=img_url, _external=True)}
+    return web_info
 
-    LOGGER.info("conversion_started")
 
-    # Get the init URL from the request body
-    request_json = request.get_json()
-    if request_json is None:
-        return {"result": {}, "log": "Invalid request: missing JSON body"}
-    init_url = request_json.get("initURL", None)
-    if init_url is None:
-        return {"result": {}, "log": "Invalid request: missing initURL"}
+def with_thumbnails(response: dict[str, Any]) -> dict[str, Any]:
+    """Points the image URLs of a conversion response to the thumbnail proxy.
+    Must be called from the request thread, to build the external proxy URLs.
+
+    Args:
+        response (dict): The conversion response.
+
+    Returns:
+        dict: The conversion response, with the proxied image URLs.
+    """
+    result = {}
+    for key, value in response["result"].items():
+        if key == "results":
+            # Fan-out conversions: one item per target platform
+            value = {platform: with_thumbnail(web_info) for platform, web_info in value.items()}
+        elif key != "errors" and value is not None:
+            value = with_thumbnail(value)
+        result[key] = value
 
+    return {**response, "result": result}
+
+
+def disconnect_probe(environ: dict[str, Any]) -> Callable[[], bool] | None:
+    """Creates a probe checking whether the client of the current request went away,
+    by peeking at its socket: a readable socket without any data was closed.
+
+    Args:
+        environ (dict): The WSGI environment of the request.
+
+    Returns:
+        Callable: The probe, or None if the server does not expose the client socket.
+    """
+    client_socket = environ.get("gunicorn.socket")
+    if client_socket is None:
+        return None
+
+    def is_disconnected() -> bool:
+        try:
+            readable, _, _ = select.select([client_socket], [], [], 0)
+            return bool(readable) and client_socket.recv(1, socket.MSG_PEEK) == b""
+        except ValueError:
+            # TLS sockets cannot be peeked at
+            return False
+        except OSError:
+            return True
+
+    return is_disconnected
+
+
+@contextmanager
+def request_deadline() -> Generator[Deadline, None, None]:
+    """Creates the deadline of the current request, cancelled if its client
+    disconnects or sends a newer request with the same client token.
+
+    Yields:
+        Deadline: The deadline of the request.
+    """
+    deadline = Deadline(is_disconnected=disconnect_probe(request.environ))
+    token = request.headers.get(CLIENT_TOKEN_HEADER)
+    if token:
+        CLIENT_REQUESTS.start(token, deadline)
+    try:
+        yield deadline
+    finally:
+        if token:
+            CLIENT_REQUESTS.finish(token, deadline)
+
+
+def conversion_response(
+    init_url: str,
+    targets: list[str] | None = None,
+    with_fragments: bool = False,
+    deadline: Deadline | None = None,
+) -> dict[str, Any]:
+    """Creates an Item from the given URL, converts it
+    into another item (Spotify or Deezer), and extract useful
+    information for web display.
+
+    Args:
+        init_url (str): The URL to convert.
+        targets (list, optional): The target platforms, to convert to several platforms
+            at once. Defaults to None, i.e the default target only.
+        with_fragments (bool, optional): Whether to keep the pre-serialized JSON fragments
+            of the result, for response_json. Defaults to False.
+        deadline (Deadline, optional): The deadline of the request. Defaults to None, i.e a new one.
+
+    Returns:
+        dict: The conversion result and a log message.
+    """
+    deadline = deadline or Deadline()
     try:
-        init_item = get_item(init_url)
-        result_item = convert_item(init_item)
+        if targets is None:
+            result = convert_url(init_url, deadline=deadline, with_fragments=with_fragments)
+        else:
+            result = convert_url_to_all(init_url, targets=targets, deadline=deadline)
 
         # Return the result dictionary and a success message
         response = {
-            "result": {"init": init_item.web_info, "result": result_item.web_info},
+            "result": result,
             "log": "Conversion successful!",
         }
 
     except FileNotFoundError:
         response = {"result": {}, "log": "Could not find track..."}
 
+    except ConversionCancelled as e:
+        LOGGER.info("conversion_cancelled", url=init_url, reason=e.reason)
+        METRICS.increment(f"conversions_cancelled_{e.reason}")
+        response = {"result": {}, "log": "The conversion was cancelled."}
+
+    except DeadlineExceeded:
+        LOGGER.warning("conversion_deadline_exceeded", url=init_url)
+        response = {"result": {}, "log": "The conversion took too long, please try again!"}
+
+    except CircuitOpenError as e:
+        LOGGER.warning("conversion_circuit_open", url=init_url, platform=e.platform)
+        response = {"result": {}, "log": f"{e}, please try again later!"}
+
     except Exception as e:
         app.logger.error("conversion_error", exc_info=e, error=str(e))
         response = {
@@ -87,5 +260,613 @@ def convert() -> dict[str, Any]:
     return response
 
 
+# Bounds the conversions calling the upstream APIs at once in this process
+ADMISSION = AdmissionController(MAX_CONVERSIONS, MAX_WAITING_CONVERSIONS)
+
+
+def admitted_conversion_response(
+    init_url: str,
+    deadline: Deadline,
+    targets: list[str] | None = None,
+    with_fragments: bool = True,
+) -> tuple[dict[str, Any], int | None]:
+    """Converts the given URL if a conversion slot is free. Otherwise, the result
+    is served from the cache if possible (cache-only mode), or the conversion
+    waits for a slot, and is shed if none is freed in time.
+
+    Args:
+        init_url (str): The URL to convert.
+        deadline (Deadline): The deadline of the conversion.
+        targets (list, optional): The target platforms, as in conversion_response. Conversions
+            to several platforms are not served cache-only. Defaults to None.
+        with_fragments (bool, optional): Whether to keep the pre-serialized JSON fragments
+            of the result. Defaults to True.
+
+    Returns:
+        tuple: The conversion response, and the HTTP status of the shed
+        conversions (429 or 503), None otherwise.
+    """
+    if not ADMISSION.try_acquire():
+        cached = get_cached_conversions([init_url], with_fragments=with_fragments)[0] if targets is None else None
+        if cached is not None:
+            METRICS.increment("conversions_served_cache_only")
+            return {"result": cached, "log": "Conversion successful!"}, None
+
+        rejection = ADMISSION.acquire()
+        if rejection is not None:
+            LOGGER.warning("conversion_shed", url=init_url, reason=rejection, in_flight=ADMISSION.in_flight)
+            METRICS.increment(f"conversions_shed_{rejection}")
+            response = {"result": {}, "log": "Too many conversions at the moment, please try again!"}
+            return response, 429 if rejection == QUEUE_FULL else 503
+
+    try:
+        return conversion_response(init_url, targets=targets, with_fragments=with_fragments, deadline=deadline), None
+    finally:
+        ADMISSION.release()
+
+
+def shed_response(response: Response, status: int | None) -> Response:
+    """Marks the response of a shed conversion with its status and a Retry-After header.
+
+    Args:
+        response (Response): The response.
+        status (int): The status of the shed conversion, None if it was not shed.
+
+    Returns:
+        Response: The response.
+    """
+    if status is not None:
+        response.status_code = status
+        response.headers["Retry-After"] = str(ADMISSION.retry_after())
+    return response
+
+
+@STAGE_TIMES.timed("serialize")
+def response_json(response: dict[str, Any]) -> str:
+    """Serializes a conversion response, assembling the pre-serialized fragments
+    of its items when it has them instead of encoding them again. The root URL
+    placeholders are rendered by json_response.
+
+    Args:
+        response (dict): The conversion response.
+
+    Returns:
+        str: The JSON fragment of the response.
+    """
+    if "fragments" in response["result"]:
+        return conversion_fragment(response["result"], response["log"])
+    return dumps(with_thumbnails(response))
+
+
+def json_response(fragment: str) -> Response:
+    """Creates a JSON response from the given JSON fragment, for the current request.
+
+    Args:
+        fragment (str): The JSON fragment.
+
+    Returns:
+        Response: The JSON response.
+    """
+    return Response(render_fragment(fragment, request.url_root), mimetype="application/json")
+
+
+@app.route("/convert", methods=["POST"])
+def convert() -> dict[str, Any] | Response:
+    """Converts the URL given in the JSON body of the request.
+
+    Returns:
+        dict: The response to the initial POST request.
+    """
+
+    LOGGER.info("conversion_started")
+
+    # Get the init URL from the request body
+    request_json = request.get_json()
+    if request_json is None:
+        return {"result": {}, "log": "Invalid request: missing JSON body"}
+    init_url = request_json.get("initURL", None)
+    if init_url is None:
+        return {"result": {}, "log": "Invalid request: missing initURL"}
+
+    with request_deadline() as deadline:
+        response, status = admitted_conversion_response(init_url, deadline)
+    return shed_response(json_response(response_json(response)), status)
+
+
+@app.route("/convert/all", methods=["POST"])
+def convert_all() -> dict[str, Any] | Response:
+    """Converts the URL given in the JSON body of the request to all the platforms
+    listed in its optional `targets`, or to all the other supported platforms.
+
+    Returns:
+        dict: The converted items by platform, and the errors of the failed targets.
+    """
+    request_json = request.get_json(silent=True)
+    if not isinstance(request_json, dict) or not isinstance(request_json.get("initURL"), str):
+        return {"result": {}, "log": "Invalid request: missing initURL"}
+
+    targets = request_json.get("targets", list(PLATFORMS))
+    if not isinstance(targets, list) or not all(target in PLATFORMS for target in targets):
+        return {"result": {}, "log": f"Invalid request: targets must be among {', '.join(PLATFORMS)}"}
+
+    LOGGER.info("fan_out_conversion_started", targets=targets)
+    with request_deadline() as deadline:
+        response, status = admitted_conversion_response(
+            request_json["initURL"], deadline, targets=targets, with_fragments=False
+        )
+    if status is not None:
+        return shed_response(jsonify(response), status)
+    return with_thumbnails(response)
+
+
+@app.route("/convert", methods=["GET"])
+def convert_get() -> WerkzeugResponse:
+    """Converts the URL given in the `url` query parameter. Responses are keyed
+    by the canonical source URL (other forms are redirected to it), carry a strong
+    ETag and a Cache-Control header, so that CDN and browser caches can serve
+    repeated conversions.
+
+    Returns:
+        Response: The conversion response, or a 304 if the client copy is still valid.
+    """
+    init_url = request.args.get("url", None)
+    if init_url is None:
+        response = jsonify({"result": {}, "log": "Invalid request: missing url"})
+        set_cache_headers(response, None)
+        return response
+
+    # Redirect to the canonical URL so that caches store a single entry per item
+    canonical_url = canonicalize_url(init_url)
+    if canonical_url != init_url:
+        return redirect(url_for("convert_get", url=canonical_url), code=301)
+
+    LOGGER.info("conversion_started")
+    with request_deadline() as deadline:
+        result, status = admitted_conversion_response(canonical_url, deadline)
+    response = json_response(response_json(result))
+    set_cache_headers(response, result["result"].get("result", {}).get("type"))
+    if status is not None:
+        return shed_response(response, status)
+
+    response.make_conditional(request)
+    return response
+
+
+@app.route("/convert/batch", methods=["POST"])
+def convert_batch() -> Response:
+    """Converts all the URLs given in the `initURLs` list of the JSON body.
+    The response is compressed with brotli or gzip when the client accepts it.
+
+    Returns:
+        Response: The list of conversion results, in the order of the given URLs.
+    """
+    request_json = request.get_json(silent=True)
+    init_urls = request_json.get("initURLs", None) if isinstance(request_json, dict) else None
+    if not isinstance(init_urls, list) or not all(isinstance(url, str) for url in init_urls):
+        return jsonify({"results": [], "log": "Invalid request: missing initURLs"})
+    if len(init_urls) > MAX_BATCH_SIZE:
+        return jsonify({"results": [], "log": f"Invalid request: more than {MAX_BATCH_SIZE} URLs"})
+
+    LOGGER.info("batch_conversion_started", size=len(init_urls))
+
+    # Get all the cached results at once, and only convert the others
+    cached_results = get_cached_conversions(init_urls, with_fragments=True)
+    missed_urls = [url for url, cached in zip(init_urls, cached_results) if cached is None]
+    # Each URL has its own time budget and conversion slot, but the batch is
+    # abandoned as a whole if its client goes away
+    is_disconnected = disconnect_probe(request.environ)
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as executor:
+        converted = list(
+            executor.map(
+                lambda url: admitted_conversion_response(url, Deadline(is_disconnected=is_disconnected)),
+                missed_urls,
+            )
+        )
+    converted_responses = iter(response for response, _ in converted)
+    shed_statuses = [status for _, status in converted if status is not None]
+
+    results = [
+        {"result": cached, "log": "Conversion successful!"} if cached is not None else next(converted_responses)
+        for cached in cached_results
+    ]
+
+    fragment = f'{{"log":"Batch conversion done!","results":[{",".join(map(response_json, results))}]}}'
+    response = compress_response(json_response(fragment), request)
+    # The batch is only shed as a whole if none of its URLs was served
+    if shed_statuses and len(shed_statuses) == len(init_urls):
+        return shed_response(response, shed_statuses[0])
+    return response
+
+
+@app.route("/convert/text", methods=["POST"])
+def convert_text() -> dict[str, Any]:
+    """Converts all the Spotify and Deezer links found in the `text` of the JSON
+    body, e.g a whole message, and rewrites them in the text. Each distinct item
+    is converted once, whatever the number and the forms of its links.
+
+    Returns:
+        dict: The rewritten text, and the conversion of each distinct link.
+    """
+    request_json = request.get_json(silent=True)
+    text = request_json.get("text") if isinstance(request_json, dict) else None
+    if not isinstance(text, str):
+        return {"text": None, "links": [], "log": "Invalid request: missing text"}
+    if len(text) > MAX_TEXT_SIZE:
+        return {"text": None, "links": [], "log": f"Invalid request: text longer than {MAX_TEXT_SIZE} characters"}
+
+    links = find_links(text)
+    urls = list(dict.fromkeys(link.canonical_url for link in links))
+    if len(urls) > MAX_BATCH_SIZE:
+        return {"text": None, "links": [], "log": f"Invalid request: more than {MAX_BATCH_SIZE} links"}
+
+    LOGGER.info("text_conversion_started", links=len(links), urls=len(urls))
+    is_disconnected = disconnect_probe(request.environ)
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as executor:
+        responses = [
+            response
+            for response, _ in executor.map(
+                lambda url: admitted_conversion_response(
+                    url, Deadline(is_disconnected=is_disconnected), with_fragments=False
+                ),
+                urls,
+            )
+        ]
+
+    converted_urls = {
+        url: response["result"]["result"]["url"] for url, response in zip(urls, responses) if response["result"]
+    }
+    return {
+        "text": rewrite_links(text, links, converted_urls),
+        "links": [
+            {"url": url, "converted_url": converted_urls.get(url), "log": response["log"]}
+            for url, response in zip(urls, responses)
+        ],
+        "log": f"Converted {len(converted_urls)} of {len(urls)} links",
+    }
+
+
+def read_stream_line(stream: Any, max_bytes: int = STREAM_MAX_RECORD_BYTES) -> tuple[bytes, bool]:
+    """Reads a line of a conversion stream, without holding more than max_bytes of it.
+
+    Args:
+        stream: The input stream.
+        max_bytes (int, optional): The maximum size of a record. Defaults to STREAM_MAX_RECORD_BYTES.
+
+    Returns:
+        tuple: The line (empty at the end of the stream), and whether it fits in
+        max_bytes. The rest of a longer line is read and dropped.
+    """
+    line = stream.readline(max_bytes)
+    if len(line) < max_bytes or line.endswith(b"\n"):
+        return line, True
+    while (rest := stream.readline(max_bytes)) and not rest.endswith(b"\n"):
+        pass
+    return line, False
+
+
+def parse_stream_record(line: bytes, number: int) -> tuple[Any, str | None]:
+    """Parses a record of a conversion stream, i.e {"url": ..., "id": ...}.
+
+    Args:
+        line (bytes): The NDJSON line of the record.
+        number (int): The line number, the id of the records without one.
+
+    Returns:
+        tuple: The id of the record, and its URL or None if the record is invalid.
+    """
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return number, None
+    if not isinstance(record, dict):
+        return number, None
+    url = record.get("url")
+    return record.get("id", number), url if isinstance(url, str) else None
+
+
+def stream_line(record_id: Any, response: dict[str, Any]) -> str:
+    """Serializes the conversion response of a stream record, with its id.
+
+    Args:
+        record_id: The id of the record, echoed to correlate the out-of-order results.
+        response (dict): The conversion response.
+
+    Returns:
+        str: The JSON fragment of the line, to render with render_fragment.
+    """
+    # The response fragment is an object starting with its "log" key, which sorts after "id"
+    return f'{{"id":{dumps(record_id)},{response_json(response)[1:]}'
+
+
+@app.route("/convert/stream", methods=["POST"])
+def convert_stream() -> Response:
+    """Converts the URLs of a stream of NDJSON records ({"url": ..., "id": ...}),
+    e.g sent by a bot over a single long-lived connection. The results are
+    streamed back as NDJSON lines as soon as they are done, in any order, with
+    the id of their record (its line number if it has none).
+
+    Returns:
+        Response: The NDJSON stream of the conversion results.
+    """
+    input_stream = request.stream
+    app_root = request.url_root
+    LOGGER.info("stream_conversion_started")
+
+    def generate() -> Iterator[bytes]:
+        lines: queue.Queue[bytes | None] = queue.Queue()
+        # A slot is taken by each record read, and released once its result is read by the client
+        slots = threading.BoundedSemaphore(STREAM_MAX_IN_FLIGHT)
+        stopped = threading.Event()
+
+        def convert_record(record_id: Any, url: str) -> None:
+            line = None
+            try:
+                if not stopped.is_set():
+                    # The socket is not probed, as it stays readable while records come in:
+                    # the conversions are cancelled once the response stream is closed instead
+                    deadline = Deadline(is_disconnected=stopped.is_set)
+                    response, _ = admitted_conversion_response(url, deadline)
+                    line = render_fragment(stream_line(record_id, response), app_root)
+            finally:
+                if line is None:
+                    slots.release()
+                else:
+                    lines.put(line)
+
+        def read_records() -> None:
+            executor = ThreadPoolExecutor(max_workers=STREAM_WORKERS)
+            try:
+                number = 0
+                while not stopped.is_set():
+                    line, fits = read_stream_line(input_stream, STREAM_MAX_RECORD_BYTES)
+                    if not line:
+                        break
+                    number += 1
+                    if not line.strip():
+                        continue
+
+                    # Wait for the client to read a result before reading further
+                    while not slots.acquire(timeout=STREAM_POLL_INTERVAL_SEC):
+                        if stopped.is_set():
+                            return
+
+                    record_id, url = parse_stream_record(line, number) if fits else (number, None)
+                    if url is None:
+                        log = "Invalid record: missing url" if fits else "Invalid record: too large"
+                        lines.put(render_fragment(stream_line(record_id, {"result": {}, "log": log}), app_root))
+                        continue
+                    executor.submit(convert_record, record_id, url)
+            except OSError as e:
+                LOGGER.warning("stream_read_failed", error=str(e))
+            finally:
+                executor.shutdown(wait=True)
+                lines.put(None)
+
+        threading.Thread(target=read_records, name="stream-reader", daemon=True).start()
+        try:
+            while (line := lines.get()) is not None:
+                yield line
+                slots.release()
+        finally:
+            # The client went away: stop reading, and cancel the conversions in progress
+            stopped.set()
+
+    return Response(generate(), mimetype="application/x-ndjson", headers={"Cache-Control": "no-store"})
+
+
+@app.route("/thumbnail", methods=["GET"])
+def thumbnail() -> Response:
+    """Serves the downsized and locally cached version of a cover image.
+
+    Returns:
+        Response: The JPEG thumbnail.
+    """
+    src = request.args.get("src", "")
+    if not THUMBNAIL_CACHE.is_allowed(src):
+        abort(400)
+
+    try:
+        path = THUMBNAIL_CACHE.get_path(src)
+    except requests.RequestException as e:
+        LOGGER.warning("thumbnail_fetch_failed", src=src, error=str(e))
+        abort(502)
+
+    return send_file(path, mimetype="image/jpeg", max_age=THUMBNAIL_MAX_AGE)
+
+
+def is_profiling_authorized(token: str | None) -> bool:
+    """Checks whether the given token enables profiling.
+
+    Args:
+        token (str): The token sent by the client.
+
+    Returns:
+        bool: False if profiling is disabled, or if the token is wrong.
+    """
+    return PROFILING_TOKEN is not None and token is not None and hmac.compare_digest(token, PROFILING_TOKEN)
+
+
+@app.before_request
+def start_request_profile() -> None:
+    """Profiles the current request if it carries the profiling token in its X-Profile header."""
+    if is_profiling_authorized(request.headers.get("X-Profile")):
+        g.profiler = SamplingProfiler(thread_ids={threading.get_ident()}).start()
+
+
+@app.after_request
+def stop_request_profile(response: Response) -> Response:
+    """Replaces the response of a profiled request by its collapsed stacks.
+    The status of the original response is kept in the X-Profiled-Status header.
+    """
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    profiled = Response(profiler.stop(), mimetype="text/plain")
+    profiled.headers["X-Profiled-Status"] = str(response.status_code)
+    profiled.headers["Cache-Control"] = "no-store"
+    return profiled
+
+
+@app.route("/admin/profile", methods=["GET"])
+def profile_window() -> Response:
+    """Profiles all the threads of the current worker process for `seconds`
+    (1 by default), e.g while replaying production traffic.
+
+    Returns:
+        Response: The collapsed stacks, one "frame;frame;frame count" line per stack.
+    """
+    if not is_profiling_authorized(request.headers.get("X-Profile-Token")):
+        abort(404)
+
+    seconds = min(max(request.args.get("seconds", 1.0, type=float), 0.0), MAX_PROFILE_SEC)
+    profiler = SamplingProfiler().start()
+    time.sleep(seconds)
+    return Response(profiler.stop(), mimetype="text/plain", headers={"Cache-Control": "no-store"})
+
+
+@app.route("/admin/stages", methods=["GET"])
+def stage_times() -> dict[str, Any]:
+    """Gets the cumulative CPU time of the conversion stages in the current worker process.
+
+    Returns:
+        dict: The calls, CPU and wall-clock milliseconds of each stage.
+    """
+    if not is_profiling_authorized(request.headers.get("X-Profile-Token")):
+        abort(404)
+    return {"stages": STAGE_TIMES.report()}
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics() -> dict[str, Any]:
+    """Gets the counters of the current worker process, e.g of the cancelled
+    conversions and of the upstream calls they spared.
+
+    Returns:
+        dict: The value of each counter, and the state of the circuit of each platform.
+    """
+    return {
+        "counters": METRICS.snapshot(),
+        "conversions": {"in_flight": ADMISSION.in_flight, "waiting": ADMISSION.waiting},
+        "circuits": {platform: breaker.state for platform, breaker in BREAKERS.items()},
+    }
+
+
+# Workers running the conversion jobs in the background, started on the first job request
+JOB_POOL = JobWorkerPool(JOB_QUEUE, conversion_response, workers=JOB_WORKERS)
+
+
+def job_progress(job: dict[str, Any]) -> dict[str, Any]:
+    """Gets the public progress information of a job.
+
+    Args:
+        job (dict): The job, as stored in the job queue.
+
+    Returns:
+        dict: The id, status, progress and error of the job.
+    """
+    return {key: job[key] for key in ("id", "status", "done", "total", "error")}
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job() -> tuple[Response, int]:
+    """Submits a job converting all the URLs given in the `initURLs` list of the
+    JSON body, to the platforms of the optional `targets` list. The job runs in
+    the background: its progress is polled at `status_url` or streamed at
+    `events_url`, and its results are fetched at `results_url`.
+
+    Returns:
+        Response: The id and URLs of the job, with a 202 status.
+    """
+    request_json = request.get_json(silent=True)
+    if not isinstance(request_json, dict):
+        request_json = {}
+    init_urls = request_json.get("initURLs", None)
+    if not isinstance(init_urls, list) or not init_urls or not all(isinstance(url, str) for url in init_urls):
+        return jsonify({"log": "Invalid request: missing initURLs"}), 400
+    if len(init_urls) > MAX_JOB_SIZE:
+        return jsonify({"log": f"Invalid request: more than {MAX_JOB_SIZE} URLs"}), 400
+
+    targets = request_json.get("targets", None)
+    if targets is not None and (not isinstance(targets, list) or not all(target in PLATFORMS for target in targets)):
+        return jsonify({"log": f"Invalid request: targets must be among {', '.join(PLATFORMS)}"}), 400
+
+    job_id = JOB_QUEUE.submit(init_urls, targets)
+    if JOB_WORKERS > 0:
+        JOB_POOL.start()
+        JOB_POOL.notify()
+
+    response = {
+        "job_id": job_id,
+        "status_url": url_for("job_status", job_id=job_id, _external=True),
+        "events_url": url_for("job_events", job_id=job_id, _external=True),
+        "results_url": url_for("job_results", job_id=job_id, _external=True),
+        "log": "Job submitted!",
+    }
+    return jsonify(response), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id: str) -> dict[str, Any]:
+    """Gets the status and progress of a job.
+
+    Returns:
+        dict: The id, status, progress and error of the job.
+    """
+    job = JOB_QUEUE.get(job_id, with_results=False)
+    if job is None:
+        abort(404)
+
+    return job_progress(job)
+
+
+@app.route("/jobs/<job_id>/results", methods=["GET"])
+def job_results(job_id: str) -> Response | tuple[Response, int]:
+    """Gets the results of a job done so far, in the order of its URLs, starting
+    from the optional `offset` query parameter to only fetch the new ones.
+
+    Returns:
+        Response: The progress of the job and its conversion results, or a 400 if the offset is invalid.
+    """
+    raw_offset = request.args.get("offset", "0")
+    if not raw_offset.isdecimal():
+        return jsonify({"log": "Invalid request: offset must be a non-negative integer"}), 400
+    offset = int(raw_offset)
+
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        abort(404)
+
+    results = [with_thumbnails(result) for result in job["results"][offset:]]
+    return compress_response(jsonify({**job_progress(job), "offset": offset, "results": results}), request)
+
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id: str) -> Response:
+    """Streams the progress of a job as server-sent events, until it is finished.
+
+    Returns:
+        Response: The event stream.
+    """
+    if JOB_QUEUE.get(job_id, with_results=False) is None:
+        abort(404)
+
+    def generate() -> Iterator[str]:
+        last_progress = None
+        started_at = time.monotonic()
+        while time.monotonic() - started_at < JOB_EVENTS_MAX_SEC:
+            job = JOB_QUEUE.get(job_id, with_results=False)
+            if job is None:
+                return
+            progress = job_progress(job)
+            if progress != last_progress:
+                yield f"data: {json.dumps(progress)}\n\n"
+                last_progress = progress
+            if job["status"] in FINISHED_STATUSES:
+                return
+            time.sleep(JOB_EVENTS_INTERVAL)
+
+    return Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-store"})
+
+
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=5000, debug=True)
@@ -55,3 +55,15 @@ def preprocess_string(string: str):
     string = string.lower()
 
     return string
+
+
+def sample_evenly(items: list[Any], limit: int) -> list[Any]:
+    """Samples at most `limit` items, evenly spread over the given list.
+
+    Returns:
+        list: The sampled items, in their original order.
+    """
+    if len(items) <= limit:
+        return list(items)
+    step = len(items) / limit
+    return [items[int(i * step)] for i in range(limit)]
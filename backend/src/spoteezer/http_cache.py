@@ -0,0 +1,66 @@
+import gzip
+import hashlib
+
+from flask import Request, Response
+
+try:
+    import brotli  # ty: ignore[unresolved-import]
+except ImportError:  # Optional dependency, gzip is used instead
+    brotli = None
+
+# Cache-Control max-age (seconds) of successful conversions, by item type.
+# Track and album links are stable, artist pictures and links change more often.
+CACHE_MAX_AGE_BY_TYPE = {
+    "track": 7 * 24 * 3600,
+    "album": 7 * 24 * 3600,
+    "artist": 24 * 3600,
+}
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+def set_cache_headers(response: Response, item_type: str | None) -> None:
+    """Sets a strong ETag derived from the response body, and a Cache-Control
+    header tuned to the converted item type. Responses without an item type
+    (errors) are not cached.
+
+    Args:
+        response (Response): The response to update.
+        item_type (str, optional): The type of the converted item.
+    """
+    max_age = CACHE_MAX_AGE_BY_TYPE.get(item_type) if item_type else None
+    if max_age is None:
+        response.headers["Cache-Control"] = "no-store"
+        return
+
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest()[:32])
+    response.headers["Cache-Control"] = f"public, max-age={max_age}"
+
+
+def compress_response(response: Response, request: Request) -> Response:
+    """Compresses the response body with brotli (if installed) or gzip,
+    according to the encodings accepted by the client.
+
+    Args:
+        response (Response): The response to compress.
+        request (Request): The request being answered.
+
+    Returns:
+        Response: The (possibly) compressed response.
+    """
+    response.vary.add("Accept-Encoding")
+    if response.direct_passthrough or response.content_length is None:
+        return response
+    if response.content_length < MIN_COMPRESS_SIZE or "Content-Encoding" in response.headers:
+        return response
+
+    accept_encodings = request.accept_encodings
+    if brotli is not None and accept_encodings["br"]:
+        response.set_data(brotli.compress(response.get_data()))
+        response.headers["Content-Encoding"] = "br"
+    elif accept_encodings["gzip"]:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+
+    return response
@@ -1,13 +1,29 @@
+import re
 import pprint
 import requests
 import structlog
 
 from abc import ABC, abstractmethod
-from typing import Optional, Any
+from collections import Counter
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, TypeVar
+from collections.abc import Callable, Generator, Iterable
+from urllib.parse import urlparse
+
+from spoteezer.cache import ISRC_TTL_SEC, LINK_TTL_SEC, NOT_FOUND_TTL_SEC
+from spoteezer.config import CACHE, CATALOG, HEDGE_UPSTREAM_CALLS
+from spoteezer.items.album_tracks import AlbumTracks
+from spoteezer.items.query import QueryPlan, build_query_plan
+from spoteezer.items.search_trials import SEARCH_TRIAL_STATS
+from spoteezer.profiling import STAGE_TIMES
+from spoteezer.resilience import CircuitOpenError, Deadline, DeadlineExceeded, UPSTREAM_TIMEOUT_SEC, call_upstream
 
 PRETTY_PRINTER = pprint.PrettyPrinter(indent=4)
 LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
 
+T = TypeVar("T")
+
 # Search parameters dictionary
 # The key is the type of the item (track, album, artist)
 # The value is a list of search parameter groups, in order of priority
@@ -26,25 +42,50 @@ SEARCH_PARAM_TRIALS_DICT = {
     "artist": [["artist"]],
 }
 
+# Number of top tracks fingerprinting an artist, of tracks fingerprinting an album,
+# and of their ISRCs looked up concurrently
+ARTIST_FINGERPRINT_TRACKS = 10
+ALBUM_FINGERPRINT_TRACKS = 5
+ISRC_LOOKUP_WORKERS = 5
+
 
 class AbstractItem(ABC):
     PLATFORM: str
+    # Pattern capturing the (type, id) of the platform's item URLs
+    URL_PATTERN: re.Pattern[str]
+    # Template of the canonical URL of an item, filled with its type and id
+    URL_TEMPLATE: str
+    # Host names (and their subdomains) serving the platform's links, short links included
+    HOSTS: tuple[str, ...]
+    # Host names of the platform's short links, resolved to a full item URL by redirection
+    SHORT_LINK_HOSTS: tuple[str, ...]
     url: str
     type: str
     id: str | int
     raw_info: dict[str, Any] | None
     search_params: dict[str, Any]
     img_url: str
+    web_info: dict[str, Any]
     isrc: str | None
+    # Normalized tracks of an album converted from its URL
+    album_tracks: AlbumTracks | None = None
+    # Deadline of the request the item is created for, if any
+    deadline: Deadline | None = None
 
-    def __init__(self, url: Optional[str] = None, item: Optional["AbstractItem"] = None):
+    def __init__(
+        self,
+        url: str | None = None,
+        item: "AbstractItem | None" = None,
+        deadline: Deadline | None = None,
+    ):
         """Instantiates an Item object given an URL.
 
         Args:
             url (str): The URL to instanciate the Item object from.
+            deadline (Deadline, optional): The deadline of the request. Defaults to None.
 
         Raises:
-            ValueError: If the URL was not specified.
+            ValueError: If the URL was not specified, or is not a full item URL in catalog mode.
         """
         # Check if the url is valid
         if url is None:
@@ -54,12 +95,128 @@ class AbstractItem(ABC):
         tmp_url = url.strip()
         tmp_url = url.replace("http://", "https://")
 
-        # Get the final URL after redirections
-        responses = requests.get(tmp_url)
+        # Get the final URL after redirections, cached for short links shared many times
+        self.deadline = deadline
+        link_key = f"link:{tmp_url}"
+        cached_url = CACHE.get(link_key)
+        if cached_url is not None:
+            self.url = cached_url
+            return
+
+        # The catalog is offline: only full item URLs are served, without resolving them
+        if CATALOG is not None:
+            canonical_url = self.canonical_url(tmp_url)
+            if canonical_url is None:
+                raise ValueError(f"Only full item URLs are served offline, not {tmp_url}")
+            self.url = canonical_url
+            return
+
+        responses = self.call(requests.get, tmp_url, timeout=self.upstream_timeout())
         if len(responses.history) > 0:
             self.url = responses.history[-1].url
         else:
             self.url = responses.url
+        CACHE.set(link_key, self.url, LINK_TTL_SEC)
+
+    @classmethod
+    def parse_url(cls, url: str) -> tuple[str, str] | None:
+        """Parses the type and id of an item from its URL, without any network call.
+
+        Args:
+            url (str): The URL of the item.
+
+        Returns:
+            tuple: The type and id of the item, or None if the URL is not a full
+            item URL of this platform (e.g a short link).
+        """
+        match = cls.URL_PATTERN.match(url.strip())
+        if match is None:
+            return None
+        return match.group(1), match.group(2)
+
+    @classmethod
+    def matches_url(cls, url: str) -> bool:
+        """Checks whether the given URL is a link of this platform, without any network call.
+
+        Args:
+            url (str): The URL of the item.
+
+        Returns:
+            bool: Whether the URL is a full item URL or a short link of this platform.
+        """
+        if cls.parse_url(url) is not None:
+            return True
+        host = urlparse(url.strip()).hostname or ""
+        return any(host == allowed or host.endswith(f".{allowed}") for allowed in cls.HOSTS)
+
+    @classmethod
+    def is_item_link(cls, url: str) -> bool:
+        """Checks whether the given URL links to an item of this platform, without any
+        network call: unlike matches_url, other pages of the platform (e.g its home page
+        or a playlist) are not item links.
+
+        Args:
+            url (str): The URL of the item.
+
+        Returns:
+            bool: Whether the URL is a full item URL or a short link of this platform.
+        """
+        if cls.parse_url(url) is not None:
+            return True
+        host = (urlparse(url.strip()).hostname or "").lower()
+        return host in cls.SHORT_LINK_HOSTS
+
+    @classmethod
+    def canonical_url(cls, url: str) -> str | None:
+        """Gets the canonical form of the given item URL, i.e without locale,
+        query string, or trailing slash.
+
+        Args:
+            url (str): The URL of the item.
+
+        Returns:
+            str: The canonical URL, or None if the URL could not be parsed.
+        """
+        parsed = cls.parse_url(url)
+        if parsed is None:
+            return None
+        return cls.URL_TEMPLATE.format(type=parsed[0], id=parsed[1])
+
+    def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Makes an upstream call to the platform of the item, guarded by the
+        deadline of the request and the circuit breaker of the platform.
+
+        Args:
+            func (Callable): The function making the call.
+
+        Returns:
+            The result of the call.
+        """
+        return call_upstream(self.PLATFORM, func, *args, deadline=self.deadline, **kwargs)
+
+    def call_idempotent(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Makes an idempotent upstream call (e.g a lookup) to the platform of the item,
+        hedged if it is slow and hedging is enabled, and guarded as in call.
+
+        Args:
+            func (Callable): The function making the call.
+
+        Returns:
+            The result of the call.
+        """
+        return call_upstream(
+            self.PLATFORM, func, *args, deadline=self.deadline, hedge=HEDGE_UPSTREAM_CALLS, **kwargs
+        )
+
+    def upstream_timeout(self) -> float:
+        """Gets the timeout of the next upstream call, bounded by the deadline.
+
+        Returns:
+            float: The timeout (seconds).
+        """
+        if self.deadline is None:
+            return UPSTREAM_TIMEOUT_SEC
+        return self.deadline.timeout()
 
     def extract_web_info(self) -> dict[str, Any]:
         """Extracts useful information for the web interfaces.
@@ -79,6 +236,15 @@ class AbstractItem(ABC):
             "img_url": self.img_url,
         }
 
+    def get_alternate_urls(self) -> list[str]:
+        """Gets the canonical URLs of the other ids of the same item seen in its
+        raw information (e.g relinked tracks), which convert to the same result.
+
+        Returns:
+            list: The alternate URLs.
+        """
+        return []
+
     @abstractmethod
     def get_raw_info_from_id(self) -> dict[str, Any]:
         pass
@@ -100,5 +266,211 @@ class AbstractItem(ABC):
         pass
 
     @abstractmethod
-    def get_track_from_isrc(self) -> dict[str, Any] | None:
+    def get_track_from_isrc(self, isrc: str) -> dict[str, Any] | None:
+        pass
+
+    @abstractmethod
+    def get_top_track_isrcs(self, limit: int) -> list[str]:
+        pass
+
+    @abstractmethod
+    def get_track_artist_ids(self, track_result: dict[str, Any]) -> list[str | int]:
+        pass
+
+    @abstractmethod
+    def get_album_track_isrcs(self, limit: int) -> list[str]:
+        pass
+
+    @abstractmethod
+    def get_track_album_id(self, track_result: dict[str, Any]) -> str | int:
         pass
+
+    @abstractmethod
+    def iter_album_tracks(self) -> Generator[tuple[str | int | None, str, int | None], None, None]:
+        pass
+
+    def get_album_tracks(self) -> AlbumTracks:
+        """Pages through the tracks of the current album, keeping only their
+        normalized fields. The track list of raw_info is dropped on the way.
+
+        Returns:
+            AlbumTracks: The tracks, at most MAX_ALBUM_TRACKS of them.
+        """
+        tracks = self.iter_album_tracks()
+        try:
+            return AlbumTracks(tracks)
+        finally:
+            # Stops paging when the album is truncated
+            tracks.close()
+
+    def query_plan(self, search_params: dict[str, Any], _type: str) -> QueryPlan:
+        """Compiles the search queries of the given search parameters on the platform of the item.
+
+        Args:
+            search_params (dict): The search parameters the queries are built from.
+            _type (str): The item type, i.e track, album, or artist.
+
+        Returns:
+            QueryPlan: The queries of the SEARCH_PARAM_TRIALS_DICT trials of the type.
+        """
+        return build_query_plan(self.PLATFORM, _type, search_params, SEARCH_PARAM_TRIALS_DICT[_type])
+
+    @STAGE_TIMES.timed("search")
+    def run_search_trials(
+        self,
+        plan: QueryPlan,
+        run_query: Callable[[str], T],
+        is_found: Callable[[T], bool],
+    ) -> T | None:
+        """Runs the queries of a plan, ordered by the hit statistics of their trials
+        on the platform of the item, until one finds an item. Searches which
+        recently found nothing with all their trials are not run at all.
+
+        Args:
+            plan (QueryPlan): The compiled queries of the search.
+            run_query (Callable): Runs a query on the platform.
+            is_found (Callable): Checks whether the results of a query contain an item.
+
+        Returns:
+            The results of the first successful trial, or None if no trial found anything.
+        """
+        not_found_key = f"not_found:{self.PLATFORM}:search:{plan.type}:{plan.fingerprint}"
+        if CACHE.get(not_found_key) is not None:
+            LOGGER.info("search_known_not_found", platform=self.PLATFORM, type=plan.type)
+            return None
+
+        queries = plan.order(partial(SEARCH_TRIAL_STATS.order, self.PLATFORM, plan.type))
+        for trial, query in queries:
+            LOGGER.info("trying_search_trial", search_trial=trial, type=plan.type, platform=self.PLATFORM, query=query)
+            results = run_query(query)
+            found = is_found(results)
+            SEARCH_TRIAL_STATS.record(self.PLATFORM, plan.type, trial, found)
+            if found:
+                return results
+
+        # The trials skipped by their statistics might still have found the item
+        if len(queries) == len(plan):
+            CACHE.set(not_found_key, True, NOT_FOUND_TTL_SEC)
+        return None
+
+    def get_cached_track_from_isrc(self, isrc: str | None) -> dict[str, Any] | None:
+        """Gets the track with the given ISRC, from the cache shared by the
+        app nodes if it was already looked up.
+
+        Args:
+            isrc (str): The ISRC of the track.
+
+        Returns:
+            dict: The result of get_track_from_isrc.
+        """
+        if isrc is None:
+            return None
+
+        key = f"isrc:{self.PLATFORM}:{isrc}"
+        result = CACHE.get(key)
+        if result is None:
+            result = self.get_track_from_isrc(isrc)
+            if result is not None:
+                CACHE.set(key, result, ISRC_TTL_SEC)
+
+        return result
+
+    def vote_on_isrcs(
+        self,
+        isrcs: list[str],
+        get_candidates: Callable[[dict[str, Any]], Iterable[str | int]],
+        min_votes: int = 2,
+    ) -> str | int | None:
+        """Looks up the given ISRCs concurrently on the platform of the item, and
+        votes for the candidate (e.g artist or album id) most of the found tracks
+        belong to. Stops as soon as the remaining lookups cannot change the winner.
+
+        Args:
+            isrcs (list): The ISRCs to look up.
+            get_candidates (Callable): Gets the candidate ids of a found track.
+            min_votes (int, optional): The minimum number of votes of the winner. Defaults to 2.
+
+        Returns:
+            The id of the winning candidate, or None if there is no clear winner.
+        """
+        votes: Counter[str | int] = Counter()
+        executor = ThreadPoolExecutor(max_workers=ISRC_LOOKUP_WORKERS)
+        try:
+            futures = [executor.submit(self.get_cached_track_from_isrc, isrc) for isrc in isrcs]
+            remaining = len(futures)
+            for future in as_completed(futures):
+                remaining -= 1
+                track_result = future.result()
+                if track_result is not None:
+                    votes.update(set(get_candidates(track_result)))
+
+                ranking = votes.most_common(2)
+                lead = ranking[0][1] - (ranking[1][1] if len(ranking) > 1 else 0) if ranking else 0
+                if lead > remaining and ranking[0][1] >= min_votes:
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        LOGGER.info("isrc_vote", platform=self.PLATFORM, votes=dict(votes.most_common(3)))
+        if not votes:
+            return None
+
+        ranking = votes.most_common(2)
+        winner, winner_votes = ranking[0]
+        if winner_votes < min(min_votes, len(isrcs)) or (len(ranking) > 1 and ranking[1][1] == winner_votes):
+            return None
+        return winner
+
+    def match_artist(self, source: "AbstractItem") -> dict[str, Any] | None:
+        """Matches the given artist on the platform of the item by fingerprint:
+        the ISRCs of the artist's top tracks are looked up on this platform,
+        and the artist owning most of them wins.
+
+        Args:
+            source (AbstractItem): The artist to match.
+
+        Returns:
+            dict: The raw information of the matched artist, or None if there is no clear match.
+        """
+        return self._match_by_fingerprint(
+            lambda: source.get_top_track_isrcs(ARTIST_FINGERPRINT_TRACKS), self.get_track_artist_ids
+        )
+
+    def match_album(self, source: "AbstractItem") -> dict[str, Any] | None:
+        """Matches the given album on the platform of the item by fingerprint:
+        a sample of the album's track ISRCs are looked up on this platform, and
+        the album most of them belong to wins. Unlike title searches, this is
+        robust to noisy titles (e.g deluxe or remastered editions).
+
+        Args:
+            source (AbstractItem): The album to match.
+
+        Returns:
+            dict: The raw information of the matched album, or None if there is no clear match.
+        """
+        return self._match_by_fingerprint(
+            lambda: source.get_album_track_isrcs(ALBUM_FINGERPRINT_TRACKS),
+            lambda track_result: [self.get_track_album_id(track_result)],
+        )
+
+    def _match_by_fingerprint(
+        self,
+        get_isrcs: Callable[[], list[str]],
+        get_candidates: Callable[[dict[str, Any]], Iterable[str | int]],
+    ) -> dict[str, Any] | None:
+        try:
+            isrcs = get_isrcs()
+        except (DeadlineExceeded, CircuitOpenError):
+            raise
+        # Fingerprinting is best effort: any other failure falls back to the text search
+        except Exception as e:  # noqa: BLE001
+            LOGGER.warning("fingerprint_failed", type=self.type, error=str(e))
+            return None
+
+        matched_id = self.vote_on_isrcs(isrcs, get_candidates)
+        if matched_id is None:
+            return None
+
+        LOGGER.info("matched_by_fingerprint", platform=self.PLATFORM, type=self.type, id=matched_id)
+        self.id = matched_id
+        return self.get_raw_info_from_id()
@@ -0,0 +1,76 @@
+from array import array
+from collections.abc import Iterable, Iterator
+from itertools import islice
+
+from spoteezer.helper import preprocess_string, sample_evenly
+
+# Maximum number of tracks kept per album, bounding the memory of huge compilations:
+# the pages past it are not even fetched
+MAX_ALBUM_TRACKS = 1000
+
+# Maximum duration (seconds) stored, i.e the largest unsigned short
+MAX_DURATION_SEC = 0xFFFF
+
+# Separator of the packed titles and ids, which normalized titles never contain
+SEPARATOR = "\n"
+
+
+class AlbumTracks:
+    """Tracks of an album, reduced to their normalized fields and packed into
+    arrays and strings rather than kept as one dictionary per track, so that
+    compilations of hundreds of tracks only take a few kilobytes per request.
+    Built from a generator of tracks, e.g paging through the album, which is
+    consumed once and only up to MAX_ALBUM_TRACKS.
+    """
+
+    __slots__ = ("_ids", "_titles", "durations")
+
+    def __init__(self, tracks: Iterable[tuple[str | int | None, str, int | None]], limit: int = MAX_ALBUM_TRACKS):
+        """Packs the given tracks.
+
+        Args:
+            tracks (Iterable): The (id, title, duration in seconds) of the tracks, in album order.
+            limit (int, optional): The maximum number of tracks kept. Defaults to MAX_ALBUM_TRACKS.
+        """
+        self.durations = array("H")
+        titles, ids = [], []
+        for track_id, title, duration_sec in islice(tracks, limit):
+            titles.append(preprocess_string(title or "").replace(SEPARATOR, " "))
+            ids.append(track_id)
+            self.durations.append(min(max(int(duration_sec or 0), 0), MAX_DURATION_SEC))
+
+        self._titles = SEPARATOR.join(titles)
+        # Deezer ids are integers, Spotify ids base62 strings
+        if all(isinstance(track_id, int) for track_id in ids):
+            self._ids: array | str = array("q", ids)
+        else:
+            self._ids = SEPARATOR.join("" if track_id is None else str(track_id) for track_id in ids)
+
+    def __len__(self) -> int:
+        return len(self.durations)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.titles)
+
+    @property
+    def titles(self) -> list[str]:
+        """The normalized titles of the tracks."""
+        return self._titles.split(SEPARATOR) if self.durations else []
+
+    @property
+    def ids(self) -> list[str | int | None]:
+        """The ids of the tracks, None where unknown."""
+        if isinstance(self._ids, array):
+            return list(self._ids)
+        return [track_id or None for track_id in self._ids.split(SEPARATOR)] if self.durations else []
+
+    def sample_ids(self, limit: int) -> list[str | int]:
+        """Samples the ids of at most `limit` tracks, evenly spread over the album.
+
+        Args:
+            limit (int): The maximum number of ids.
+
+        Returns:
+            list: The sampled ids, in album order.
+        """
+        return sample_evenly([track_id for track_id in self.ids if track_id is not None], limit)
@@ -1,35 +1,55 @@
+import re
 import pprint
 import structlog
 
-from typing import Optional, Any
-from urllib.parse import quote
+from typing import Any
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
 
-from spoteezer.items.abstract_item import AbstractItem, SEARCH_PARAM_TRIALS_DICT
+from spoteezer.items.abstract_item import AbstractItem, ISRC_LOOKUP_WORKERS
 from spoteezer.config import DEEZER
 from spoteezer.helper import preprocess_string
+from spoteezer.resilience import CircuitOpenError, Deadline, DeadlineExceeded
 
 PRETTY_PRINTER = pprint.PrettyPrinter(indent=4)
 LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
 
+# Number of album tracks fetched per page, past the ones embedded in the album
+ALBUM_TRACKS_PAGE_SIZE = 100
+
 
 class DeezerItem(AbstractItem):
     PLATFORM = "deezer"
+    URL_PATTERN = re.compile(
+        r"^(?:https?://)?(?:www\.)?deezer\.com/(?:[a-z]{2}(?:-[a-z]{2})?/)?(track|album|artist)/(\d+)"
+    )
+    URL_TEMPLATE = "https://www.deezer.com/{type}/{id}"
+    HOSTS = ("deezer.com", "deezer.page.link", "dzr.page.link")
+    SHORT_LINK_HOSTS = ("link.deezer.com", "deezer.page.link", "dzr.page.link")
     id: int  # Override: Deezer IDs are always int
 
-    def __init__(self, url: Optional[str] = None, item: Optional[AbstractItem] = None):
+    def __init__(
+        self,
+        url: str | None = None,
+        item: AbstractItem | None = None,
+        deadline: Deadline | None = None,
+    ):
         """Instanciates a Deezer item based on the given parameter(s).
 
         Args:
             url (str, optional): URL to instanciate the item from. Defaults to None.
             item (Item, optional): Item to instanciate the item from. Defaults to None.
+            deadline (Deadline, optional): The deadline of the request. Defaults to None.
         """
 
         # Constructor from url
         if url:
-            super().__init__(url)
+            super().__init__(url, deadline=deadline)
             self.type = self.url.split("/")[-2]
             self.id = int(self.url.split("/")[-1].split("?")[0])
             self.raw_info = self.get_raw_info_from_id()
+            if self.type == "album":
+                self.album_tracks = self.get_album_tracks()
             self.search_params = self.get_search_params()
             self.img_url = self.get_img_url()
             self.web_info = self.extract_web_info()
@@ -37,6 +57,7 @@ class DeezerItem(AbstractItem):
 
         # Constructor from another item
         elif item:
+            self.deadline = deadline
             self.type = item.type
             self.raw_info = None
             self.search_params = item.search_params
@@ -44,11 +65,17 @@ class DeezerItem(AbstractItem):
             # Get raw_info by ISRC
             if self.type == "track":
                 self.isrc = item.isrc
-                res = self.get_track_from_isrc()
+                res = self.get_cached_track_from_isrc(self.isrc)
 
                 if res is not None:
                     self.raw_info = res
 
+            # Get raw_info by matching the artist's top tracks, or the album's tracks
+            elif self.type == "artist":
+                self.raw_info = self.match_artist(item)
+            elif self.type == "album":
+                self.raw_info = self.match_album(item)
+
             # Get raw_info by search
             if self.raw_info is None:
                 results = self.search(self.search_params, self.type)
@@ -56,6 +83,9 @@ class DeezerItem(AbstractItem):
 
             # Get id, url, and web_info from raw_info
             assert self.raw_info is not None, "raw_info must be set"
+            # Only the tracks of the source album are needed
+            if self.type == "album":
+                self.raw_info.pop("tracks", None)
             self.id = self.raw_info["id"]
             self.url = self.raw_info["link"]
             self.img_url = self.get_img_url()
@@ -74,14 +104,26 @@ class DeezerItem(AbstractItem):
 
         # Get the data from the Deezer API
         if self.type == "track":
-            result = DEEZER.get_track(self.id)
+            result = self.call_idempotent(DEEZER.get_track, self.id)
         elif self.type == "album":
-            result = DEEZER.get_album(self.id)
+            result = self.call_idempotent(DEEZER.get_album, self.id)
         elif self.type == "artist":
-            result = DEEZER.get_artist(self.id)
+            result = self.call_idempotent(DEEZER.get_artist, self.id)
 
         return result.as_dict()
 
+    def get_alternate_urls(self) -> list[str]:
+        """Gets the URL of the alternative track Deezer suggests when the
+        track is unavailable.
+
+        Returns:
+            list: The alternate URLs.
+        """
+        alternative = (self.raw_info or {}).get("alternative")
+        if self.type != "track" or not alternative:
+            return []
+        return [self.URL_TEMPLATE.format(type=self.type, id=alternative["id"])]
+
     def get_first_raw_info(self, results: Any) -> dict[str, Any]:
         """Extracts raw information from search results, i.e the
         first item here.
@@ -120,10 +162,7 @@ class DeezerItem(AbstractItem):
             search_params = {
                 "album": preprocess_string(self.raw_info["title"]),
                 "artist": preprocess_string(self.raw_info["artist"]["name"]),
-                "tracks": [
-                    preprocess_string(track["title"])
-                    for track in self.raw_info["tracks"]
-                ],
+                "tracks": self.album_tracks,
             }
 
         elif self.type == "artist":
@@ -153,7 +192,7 @@ class DeezerItem(AbstractItem):
     def search(self, search_params: dict[str, Any], _type: str, limit: int = 1) -> Any:
         """Searches the Deeezer database with the given search parameters.
         Tries search parameter combinations by decreasing order of precision,
-        according to the SEARCH_PARAM_TRIALS_DICT dictionary.
+        according to the SEARCH_PARAM_TRIALS_DICT dictionary and to their hit statistics.
 
         Args:
             search_params (dict): The search parameters to search with.
@@ -165,53 +204,133 @@ class DeezerItem(AbstractItem):
         Returns:
             dict: The results obtained from the search.
         """
-        # Get the search trial list
-        search_param_trials = SEARCH_PARAM_TRIALS_DICT[_type]
-
-        def _get_query(search_trial, _type):
-            query = ""
-            for key, value in search_params.items():
-                if key in search_trial:
-                    if key == "duration_sec":
-                        query += f"dur_min:{value} dur_max:{value} "
-                    elif key == "tracks":
-                        pass
-                    else:
-                        query += f'{key}:"{value}" '
-            return query
-
-        # Try each search trial
-        for search_trial in search_param_trials:
-            LOGGER.info("trying_search_trial", search_trial=search_trial, type=_type)
-            query = _get_query(search_trial, _type)
-            LOGGER.info("deezer_query", query=query)
-            query = quote(query)
-
-            # Make the search request
-            if _type == "track":
-                results = DEEZER.search(query)
-            elif _type == "album":
-                results = DEEZER.search_albums(query)
-            elif _type == "artist":
-                results = DEEZER.search_artists(query)
-
-            if len(results) > 0:
-                break
-
-        if len(results) == 0:
+
+        def _fetch_first_page(results):
+            len(results)
+            return results
+
+        # Make the search request
+        if _type == "track":
+            search_func = DEEZER.search
+        elif _type == "album":
+            search_func = DEEZER.search_albums
+        elif _type == "artist":
+            search_func = DEEZER.search_artists
+
+        # Results are paginated lazily: fetch the first page within the guarded call
+        results = self.run_search_trials(
+            self.query_plan(search_params, _type),
+            lambda query: self.call(lambda: _fetch_first_page(search_func(query))),
+            lambda results: len(results) > 0,
+        )
+
+        if results is None:
             raise FileNotFoundError("Could not find item on Deezer...")
 
         return results
 
-    def get_track_from_isrc(self) -> dict[str, Any] | None:
-        """Searches the Deezer database with the current ISRC.
+    def get_track_from_isrc(self, isrc: str) -> dict[str, Any] | None:
+        """Searches the Deezer database with the given ISRC.
+
+        Args:
+            isrc (str): The ISRC of the track.
 
         Returns:
             dict: The results obtained from the search.
         """
         try:
-            return DEEZER.request("GET", f"track/isrc:{self.isrc}").as_dict()
+            return self.call_idempotent(
+                DEEZER.request, "GET", f"track/isrc:{isrc}", timeout=self.upstream_timeout()
+            ).as_dict()
 
-        except Exception as e:
-            LOGGER.warning("isrc_search_failed", isrc=self.isrc, error=str(e))
+        except (DeadlineExceeded, CircuitOpenError):
+            raise
+
+        # Any other failure only loses the ISRC match, the item is still searched by text
+        except Exception as e:  # noqa: BLE001
+            LOGGER.warning("isrc_search_failed", isrc=isrc, error=str(e))
             return None
+
+    def get_top_track_isrcs(self, limit: int) -> list[str]:
+        """Gets the ISRCs of the top tracks of the current artist.
+
+        Args:
+            limit (int): The maximum number of top tracks.
+
+        Returns:
+            list: The ISRCs of the top tracks.
+        """
+        top_tracks = self.call(
+            DEEZER.request, "GET", f"artist/{self.id}/top", params={"limit": limit}, timeout=self.upstream_timeout()
+        )
+        return self._get_track_isrcs([track.id for track in top_tracks[:limit]])
+
+    def get_album_track_isrcs(self, limit: int) -> list[str]:
+        """Gets the ISRCs of a sample of tracks spread over the current album.
+
+        Args:
+            limit (int): The maximum number of tracks.
+
+        Returns:
+            list: The ISRCs of the sampled tracks.
+        """
+        assert self.album_tracks is not None, "album_tracks must be set before calling get_album_track_isrcs"
+        # Deezer track ids are integers
+        return self._get_track_isrcs([int(track_id) for track_id in self.album_tracks.sample_ids(limit)])
+
+    def iter_album_tracks(self) -> Generator[tuple[int | None, str, int | None], None, None]:
+        """Pages through the tracks of the current album: the tracks embedded in
+        its raw information first, then the next pages if the album has more.
+        Only the current page is held in memory.
+
+        Yields:
+            tuple: The id, title, and duration (seconds) of each track.
+        """
+        assert self.raw_info is not None, "raw_info must be set before calling iter_album_tracks"
+        tracks = self.raw_info.pop("tracks", None) or []
+        nb_tracks = self.raw_info.get("nb_tracks", len(tracks))
+        index = 0
+        while tracks:
+            for track in tracks:
+                yield track.get("id"), track["title"], track.get("duration")
+            index += len(tracks)
+            if index >= nb_tracks:
+                return
+            page = self.call_idempotent(
+                DEEZER.request,
+                "GET",
+                f"album/{self.id}/tracks",
+                params={"index": index, "limit": ALBUM_TRACKS_PAGE_SIZE},
+                timeout=self.upstream_timeout(),
+            )
+            tracks = [track.as_dict() for track in page]
+
+    def _get_track_isrcs(self, track_ids: list[int]) -> list[str]:
+        # Track lists do not carry the ISRCs, so the tracks are fetched concurrently
+        with ThreadPoolExecutor(max_workers=ISRC_LOOKUP_WORKERS) as executor:
+            tracks = executor.map(lambda track_id: self.call_idempotent(DEEZER.get_track, track_id), track_ids)
+            return [track.isrc for track in tracks if getattr(track, "isrc", None)]
+
+    def get_track_artist_ids(self, track_result: dict[str, Any]) -> list[str | int]:
+        """Gets the ids of the artists credited on a track found by ISRC.
+
+        Args:
+            track_result (dict): The result of get_track_from_isrc.
+
+        Returns:
+            list: The ids of the main artist and of the contributors.
+        """
+        artist_ids: list[str | int] = [track_result["artist"]["id"]]
+        artist_ids += [contributor["id"] for contributor in track_result.get("contributors", [])]
+        return artist_ids
+
+    def get_track_album_id(self, track_result: dict[str, Any]) -> str | int:
+        """Gets the id of the album of a track found by ISRC.
+
+        Args:
+            track_result (dict): The result of get_track_from_isrc.
+
+        Returns:
+            int: The album id.
+        """
+        return track_result["album"]["id"]
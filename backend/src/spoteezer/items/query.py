@@ -0,0 +1,120 @@
+import hashlib
+import json
+from collections.abc import Callable, Iterator
+from typing import Any, NamedTuple
+from urllib.parse import quote
+
+
+def _deezer_term(key: str, value: Any) -> str | None:
+    if key == "duration_sec":
+        return f"dur_min:{value} dur_max:{value}"
+    if key == "tracks":
+        return None
+    # Deezer has no escape sequence for double quotes inside a quoted value
+    return f'{key}:"{str(value).replace(chr(34), "")}"'
+
+
+def _spotify_term(key: str, value: Any) -> str | None:
+    # Spotify search supports neither durations nor track lists
+    if key in ("duration_sec", "tracks"):
+        return None
+    return f"{key}:{value}"
+
+
+class QueryFormat(NamedTuple):
+    # Renders a search parameter into a query term, or None if the platform cannot search by it
+    term: Callable[[str, Any], str | None]
+    # Whether the query is URL-quoted before being sent, as the Deezer client does not quote it
+    url_quoted: bool
+
+
+QUERY_FORMATS: dict[str, QueryFormat] = {
+    "deezer": QueryFormat(_deezer_term, url_quoted=True),
+    "spotify": QueryFormat(_spotify_term, url_quoted=False),
+}
+
+
+class SearchQuery(NamedTuple):
+    # The search parameter keys of the trial actually searched by, e.g ["track", "artist"]
+    trial: list[str]
+    # The query sent to the platform
+    query: str
+
+
+class QueryPlan:
+    """Search queries of an item on a platform, compiled once from its search
+    parameters: one query per search trial, by decreasing precision. Trials are
+    reduced to the keys the platform can search by, and the trials whose query is
+    the same as a more precise one are dropped. Executors iterate over the plan,
+    in order or reordered with order().
+    """
+
+    def __init__(self, platform: str, _type: str, queries: list[SearchQuery], fingerprint: str):
+        self.platform = platform
+        self.type = _type
+        self.queries = queries
+        self.fingerprint = fingerprint
+
+    def __iter__(self) -> Iterator[SearchQuery]:
+        return iter(self.queries)
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def order(self, order_trials: Callable[[list[list[str]]], list[list[str]]]) -> list[SearchQuery]:
+        """Reorders the queries of the plan by their trials, e.g by hit statistics.
+
+        Args:
+            order_trials (Callable): Orders (and possibly filters) a list of trials.
+
+        Returns:
+            list: The queries, in the order of their trials.
+        """
+        by_trial = {tuple(search_query.trial): search_query for search_query in self.queries}
+        return [by_trial[tuple(trial)] for trial in order_trials([search_query.trial for search_query in self.queries])]
+
+
+def build_query_plan(platform: str, _type: str, search_params: dict[str, Any], trials: list[list[str]]) -> QueryPlan:
+    """Compiles the search queries of an item for all the given trials at once.
+
+    Args:
+        platform (str): The platform searched, i.e deezer or spotify.
+        _type (str): The item type, i.e track, album, or artist.
+        search_params (dict): The search parameters of the item.
+        trials (list): The search trials, i.e lists of search parameter keys, by decreasing precision.
+
+    Raises:
+        ValueError: If the platform has no query format.
+
+    Returns:
+        QueryPlan: The deduplicated queries, in the order of the trials.
+    """
+    if platform not in QUERY_FORMATS:
+        raise ValueError(f"No query format for platform: {platform}")
+    query_format = QUERY_FORMATS[platform]
+
+    # Each term is rendered (and quoted) once, whatever the number of trials using it
+    terms = {}
+    for key, value in search_params.items():
+        term = query_format.term(key, value) if value is not None else None
+        if term is not None:
+            terms[key] = quote(term) if query_format.url_quoted else term
+    separator = quote(" ") if query_format.url_quoted else " "
+
+    queries: list[SearchQuery] = []
+    seen: set[str] = set()
+    for trial in trials:
+        # Trials are reduced to the keys actually searched by, each once
+        searched_keys = [key for key in dict.fromkeys(trial) if key in terms]
+        query = separator.join([terms[key] for key in searched_keys])
+        if not query or query in seen:
+            continue
+        seen.add(query)
+        queries.append(SearchQuery(searched_keys, query))
+
+    # Reduced trials may have lost their precision rank, e.g a track and duration trial on Spotify
+    queries.sort(key=lambda search_query: -len(search_query.trial))
+
+    # Identifies the search, e.g to remember the searches which found nothing
+    fingerprint = json.dumps([platform, _type, *(search_query.query for search_query in queries)])
+    return QueryPlan(platform, _type, queries, hashlib.sha256(fingerprint.encode()).hexdigest()[:32])
@@ -0,0 +1,97 @@
+import random
+import threading
+from collections import defaultdict
+
+import structlog
+
+LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
+
+# Number of attempts of a search trial before its hit rate is trusted
+TRIAL_MIN_ATTEMPTS = 50
+
+# Trials hitting less often than this are skipped, since they mostly cost a wasted call
+TRIAL_SKIP_RATE = 0.02
+
+# Share of the searches still trying the skipped trials, to keep their statistics up to date
+TRIAL_EXPLORE_RATE = 0.05
+
+
+class SearchTrialStats:
+    """Hit statistics of the search trials, per platform and item type, used to
+    skip the trials which (almost) never find anything and to try the trials of
+    the same precision by decreasing hit rate. Trials are never tried before more
+    precise ones, so that a looser query cannot shadow a more accurate match.
+    """
+
+    def __init__(
+        self,
+        min_attempts: int = TRIAL_MIN_ATTEMPTS,
+        skip_rate: float = TRIAL_SKIP_RATE,
+        explore_rate: float = TRIAL_EXPLORE_RATE,
+    ):
+        self.min_attempts = min_attempts
+        self.skip_rate = skip_rate
+        self.explore_rate = explore_rate
+        # (platform, type, trial) -> [attempts, hits]
+        self._counts: defaultdict[tuple[str, str, tuple[str, ...]], list[int]] = defaultdict(lambda: [0, 0])
+        self._lock = threading.Lock()
+
+    def hit_rate(self, platform: str, _type: str, trial: list[str]) -> float | None:
+        """Gets the hit rate of a search trial.
+
+        Args:
+            platform (str): The platform searched.
+            _type (str): The item type, i.e track, album, or artist.
+            trial (list): The search parameter keys of the trial.
+
+        Returns:
+            float: The share of the attempts which found an item, or None if it was not tried enough.
+        """
+        with self._lock:
+            attempts, hits = self._counts.get((platform, _type, tuple(trial)), (0, 0))
+        return hits / attempts if attempts >= self.min_attempts else None
+
+    def record(self, platform: str, _type: str, trial: list[str], hit: bool) -> None:
+        """Records the outcome of a search trial.
+
+        Args:
+            platform (str): The platform searched.
+            _type (str): The item type, i.e track, album, or artist.
+            trial (list): The search parameter keys of the trial.
+            hit (bool): Whether the trial found an item.
+        """
+        with self._lock:
+            counts = self._counts[(platform, _type, tuple(trial))]
+            counts[0] += 1
+            counts[1] += hit
+
+    def order(self, platform: str, _type: str, trials: list[list[str]]) -> list[list[str]]:
+        """Orders the given trials for a search: the trials are kept by decreasing
+        precision (number of keys), trials of the same precision are sorted by
+        decreasing hit rate, and the trials which rarely hit are skipped, except
+        for the last one and for a small share of exploring searches.
+
+        Args:
+            platform (str): The platform searched.
+            _type (str): The item type, i.e track, album, or artist.
+            trials (list): The trials, by decreasing precision.
+
+        Returns:
+            list: The trials to try, in order.
+        """
+        hit_rates = [self.hit_rate(platform, _type, trial) for trial in trials]
+        explore = random.random() < self.explore_rate
+
+        ordered = []
+        for i, (trial, hit_rate) in enumerate(zip(trials, hit_rates)):
+            is_last = i == len(trials) - 1
+            if not explore and not is_last and hit_rate is not None and hit_rate < self.skip_rate:
+                LOGGER.debug("search_trial_skipped", platform=platform, type=_type, trial=trial, hit_rate=hit_rate)
+                continue
+            # Untried trials rank first within their precision, to learn their hit rate
+            ordered.append((-len(trial), -(hit_rate if hit_rate is not None else 1.0), i, trial))
+
+        return [trial for *_, trial in sorted(ordered)]
+
+
+SEARCH_TRIAL_STATS = SearchTrialStats()
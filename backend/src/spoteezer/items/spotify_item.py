@@ -2,33 +2,51 @@ import re
 import pprint
 import structlog
 
-from typing import Optional, Any
+from typing import Any
+from collections.abc import Generator
 from urllib.parse import urlparse
 
-from spoteezer.items.abstract_item import AbstractItem, SEARCH_PARAM_TRIALS_DICT
+from spoteezer.items.abstract_item import AbstractItem
 from spoteezer.config import SPOTIFY
 from spoteezer.helper import preprocess_string, get_first_value_with_substr
+from spoteezer.resilience import CircuitOpenError, Deadline, DeadlineExceeded
 
 PRETTY_PRINTER = pprint.PrettyPrinter(indent=4)
 LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
 
+# Number of album tracks fetched per page, past the first one embedded in the album (API maximum)
+ALBUM_TRACKS_PAGE_SIZE = 50
+
 
 class SpotifyItem(AbstractItem):
     PLATFORM = "spotify"
-
-    def __init__(self, url: Optional[str] = None, item: Optional[AbstractItem] = None):
+    URL_PATTERN = re.compile(
+        r"^(?:https?://open\.spotify\.com/(?:intl-[a-z]{2}(?:-[a-z]{2})?/)?|spotify:)"
+        r"(track|album|artist)[/:]([A-Za-z0-9]{22})"
+    )
+    URL_TEMPLATE = "https://open.spotify.com/{type}/{id}"
+    HOSTS = ("spotify.com", "spotify.link", "spotify.app.link")
+    SHORT_LINK_HOSTS = ("spotify.link", "spotify.app.link")
+
+    def __init__(
+        self,
+        url: str | None = None,
+        item: AbstractItem | None = None,
+        deadline: Deadline | None = None,
+    ):
         """Constructor for the SpotifyItem class.
 
         Args:
             url (str, optional): The Spotify URL to the item. Defaults to None.
             item (AbstractItem, optional): The Item to copy. Defaults to None.
+            deadline (Deadline, optional): The deadline of the request. Defaults to None.
         """
 
         #  Constructor from URL
         #  Infer type and id from URL
         #  Use id and type to get info from Spotify API
         if url:
-            super().__init__(url)
+            super().__init__(url, deadline=deadline)
 
             parsed_url = urlparse(self.url)
             if parsed_url.netloc != "open.spotify.com":
@@ -39,6 +57,8 @@ class SpotifyItem(AbstractItem):
             self.type = path_parts[1]
             self.id = path_parts[2]
             self.raw_info = self.get_raw_info_from_id()
+            if self.type == "album":
+                self.album_tracks = self.get_album_tracks()
             self.search_params = self.get_search_params()
             self.img_url = self.get_img_url()
             self.web_info = self.extract_web_info()
@@ -57,6 +77,7 @@ class SpotifyItem(AbstractItem):
         #  Constructor from search info
         #  Meaning that we want to search for the item on Spotify
         elif item:
+            self.deadline = deadline
             self.type = item.type
             self.raw_info = None
             self.search_params = item.search_params
@@ -64,10 +85,16 @@ class SpotifyItem(AbstractItem):
             # Get raw_info by ISRC
             if self.type == "track":
                 self.isrc = item.isrc
-                res = self.get_track_from_isrc()
+                res = self.get_cached_track_from_isrc(self.isrc)
 
                 if res is not None and res["tracks"]["total"] != 0:
-                    self.raw_info = res
+                    self.raw_info = self.get_first_raw_info(res)
+
+            # Get raw_info by matching the artist's top tracks, or the album's tracks
+            elif self.type == "artist":
+                self.raw_info = self.match_artist(item)
+            elif self.type == "album":
+                self.raw_info = self.match_album(item)
 
             # Get raw_info by search
             if self.raw_info is None:
@@ -81,6 +108,9 @@ class SpotifyItem(AbstractItem):
 
             # Get id, url, and web_info from raw_info
             assert self.raw_info is not None, "raw_info must be set"
+            # Only the tracks of the source album are needed
+            if self.type == "album":
+                self.raw_info.pop("tracks", None)
             self.id = self.raw_info["id"]
             url_result = get_first_value_with_substr(
                 self.raw_info, "spotify", substring=self.type
@@ -118,17 +148,29 @@ class SpotifyItem(AbstractItem):
         """
         # Get the info from the Spotify API using the id and type
         if self.type == "track":
-            return SPOTIFY.track(self.id)
+            return self.call_idempotent(SPOTIFY.track, self.id)
 
         elif self.type == "album":
-            return SPOTIFY.album(self.id)
+            return self.call_idempotent(SPOTIFY.album, self.id)
 
         elif self.type == "artist":
-            return SPOTIFY.artist(self.id)
+            return self.call_idempotent(SPOTIFY.artist, self.id)
 
         else:
             raise ValueError("Invalid Spotify item type")
 
+    def get_alternate_urls(self) -> list[str]:
+        """Gets the URL of the original track when Spotify relinked it
+        to another track playable in the market.
+
+        Returns:
+            list: The alternate URLs.
+        """
+        linked_from = (self.raw_info or {}).get("linked_from")
+        if self.type != "track" or not linked_from:
+            return []
+        return [self.URL_TEMPLATE.format(type=self.type, id=linked_from["id"])]
+
     def get_first_raw_info(self, results: dict[str, Any]) -> dict[str, Any]:
         """Gets the first item from a Spotify search results.
 
@@ -178,10 +220,7 @@ class SpotifyItem(AbstractItem):
             search_params = {
                 "album": preprocess_string(self.raw_info["name"]),
                 "artist": preprocess_string(self.raw_info["artists"][0]["name"]),
-                "tracks": [
-                    preprocess_string(track["name"])
-                    for track in self.raw_info["tracks"]["items"]
-                ],
+                "tracks": self.album_tracks,
             }
 
         elif self.type == "artist":
@@ -218,52 +257,20 @@ class SpotifyItem(AbstractItem):
             dict: The search results.
         """
 
-        # Get the trials corresponding to the item_type
-        search_params_trials = SEARCH_PARAM_TRIALS_DICT[_type]
-
-        def _get_query(trial):
-            """Generates the query from the current search trial and
-            the search params of the current SpotifyItem object.
-
-            Args:
-                trial (list): List of keys to process in the query
-
-            Returns:
-                str: The final query for that search parameters trial.
-            """
+        results = self.run_search_trials(
+            self.query_plan(search_params, _type),
+            lambda query: self.call(SPOTIFY.search, q=query, limit=limit, type=_type),
+            lambda results: results[_type + "s"]["total"] > 0,
+        )
 
-            query = ""
-            for key in trial:  # e.g ['track', 'artist', 'album']
-                value = search_params[key]
-                if key == "duration_sec":
-                    # Spotify search doesn't support duration search
-                    pass
-                elif key == "tracks":
-                    # TODO
-                    pass
-                else:
-                    query += (f"{key}:" + str(value) + " ") if value is not None else ""
-            LOGGER.info("spotify_query", query=query)
-
-            return query
-
-        for search_params_t in search_params_trials:
-            LOGGER.info("trying_search_trial", search_trial=search_params_t, type=_type)
-            query = _get_query(search_params_t)
-            results = SPOTIFY.search(q=query, limit=limit, type=_type)
-            found = results[_type + "s"]["total"] > 0
-
-            if found:
-                break
-
-        if not found:
+        if results is None:
             raise FileNotFoundError("Could not find item on Spotify...")
 
         LOGGER.info("item_found", type=_type, platform="spotify")
         LOGGER.debug("spotify_results", results=PRETTY_PRINTER.pformat(results))
         return results
 
-    def get_track_from_isrc(self) -> dict[str, Any] | None:
+    def get_track_from_isrc(self, isrc: str) -> dict[str, Any] | None:
         """Gets the track info from the Spotify API using the ISRC.
 
         Args:
@@ -274,9 +281,87 @@ class SpotifyItem(AbstractItem):
         """
 
         try:
-            LOGGER.info("getting_track_by_isrc", isrc=self.isrc, platform="spotify")
-            return SPOTIFY.search(q=f"isrc:{self.isrc}", type="track")
+            LOGGER.info("getting_track_by_isrc", isrc=isrc, platform="spotify")
+            results = self.call_idempotent(SPOTIFY.search, q=f"isrc:{isrc}", type="track")
+            return results if results["tracks"]["total"] != 0 else None
+
+        except (DeadlineExceeded, CircuitOpenError):
+            raise
 
-        except Exception as e:
-            LOGGER.warning("isrc_search_failed", isrc=self.isrc, error=str(e))
+        # Any other failure only loses the ISRC match, the item is still searched by text
+        except Exception as e:  # noqa: BLE001
+            LOGGER.warning("isrc_search_failed", isrc=isrc, error=str(e))
             return None
+
+    def get_top_track_isrcs(self, limit: int) -> list[str]:
+        """Gets the ISRCs of the top tracks of the current artist.
+
+        Args:
+            limit (int): The maximum number of top tracks.
+
+        Returns:
+            list: The ISRCs of the top tracks.
+        """
+        top_tracks = self.call(SPOTIFY.artist_top_tracks, self.id)["tracks"][:limit]
+        return [track["external_ids"]["isrc"] for track in top_tracks if track.get("external_ids", {}).get("isrc")]
+
+    def get_track_artist_ids(self, track_result: dict[str, Any]) -> list[str | int]:
+        """Gets the ids of the artists credited on a track found by ISRC.
+
+        Args:
+            track_result (dict): The result of get_track_from_isrc.
+
+        Returns:
+            list: The ids of the artists of the first track found.
+        """
+        return [artist["id"] for artist in track_result["tracks"]["items"][0]["artists"]]
+
+    def get_album_track_isrcs(self, limit: int) -> list[str]:
+        """Gets the ISRCs of a sample of tracks spread over the current album.
+        Album tracks do not carry their ISRC, so the sampled tracks are fetched
+        in a single batch call.
+
+        Args:
+            limit (int): The maximum number of tracks.
+
+        Returns:
+            list: The ISRCs of the sampled tracks.
+        """
+        assert self.album_tracks is not None, "album_tracks must be set before calling get_album_track_isrcs"
+        track_ids = self.album_tracks.sample_ids(limit)
+        if not track_ids:
+            return []
+
+        tracks = self.call_idempotent(SPOTIFY.tracks, track_ids)["tracks"]
+        return [track["external_ids"]["isrc"] for track in tracks if track and track.get("external_ids", {}).get("isrc")]
+
+    def iter_album_tracks(self) -> Generator[tuple[str | None, str, int | None], None, None]:
+        """Pages through the tracks of the current album: the first page embedded
+        in its raw information, then the next pages if the album has more. Only
+        the current page is held in memory.
+
+        Yields:
+            tuple: The id, name, and duration (seconds) of each track.
+        """
+        assert self.raw_info is not None, "raw_info must be set before calling iter_album_tracks"
+        page = self.raw_info.pop("tracks", None) or {}
+        offset = 0
+        while page.get("items"):
+            for track in page["items"]:
+                duration_ms = track.get("duration_ms")
+                yield track.get("id"), track["name"], duration_ms // 1000 if duration_ms is not None else None
+            offset += len(page["items"])
+            if not page.get("next"):
+                return
+            page = self.call_idempotent(SPOTIFY.album_tracks, self.id, limit=ALBUM_TRACKS_PAGE_SIZE, offset=offset)
+
+    def get_track_album_id(self, track_result: dict[str, Any]) -> str | int:
+        """Gets the id of the album of the first track found by ISRC.
+
+        Args:
+            track_result (dict): The result of get_track_from_isrc.
+
+        Returns:
+            str: The album id.
+        """
+        return track_result["tracks"]["items"][0]["album"]["id"]
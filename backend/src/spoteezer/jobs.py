@@ -0,0 +1,298 @@
+import argparse
+import json
+import signal
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from contextlib import closing
+from typing import Any
+
+import structlog
+
+LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
+
+# Lifetime of the finished jobs and of their results
+JOB_TTL_SEC = 7 * 24 * 3600
+
+# Running jobs not updated for this long (e.g their worker died) are claimed again
+JOB_STALE_AFTER_SEC = 300.0
+
+# Statuses of the jobs which will not change anymore
+FINISHED_STATUSES = ("done", "failed")
+
+# Default number of job worker threads of a `spoteezer worker` process
+DEFAULT_JOB_WORKERS = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    urls TEXT NOT NULL,
+    targets TEXT,
+    results TEXT NOT NULL DEFAULT '[]',
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created_at ON jobs (status, created_at);
+"""
+
+
+class JobQueue:
+    """Persistent queue of conversion jobs, stored in a local SQLite database.
+    The database can be shared by several processes of the same host, e.g the
+    request-serving workers submitting jobs and the job workers running them.
+    """
+
+    def __init__(self, path: str, stale_after: float = JOB_STALE_AFTER_SEC):
+        self.path = path
+        self.stale_after = stale_after
+        with closing(self._connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened explicitly where needed
+        connection = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def submit(self, urls: list[str], targets: list[str] | None = None) -> str:
+        """Queues a conversion job.
+
+        Args:
+            urls (list): The URLs to convert.
+            targets (list, optional): The target platforms. Defaults to None, i.e the default target.
+
+        Returns:
+            str: The id of the job.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, status, urls, targets, total, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(urls), json.dumps(targets) if targets is not None else None, len(urls), now, now),
+            )
+            # Finished jobs are purged as new ones come in
+            connection.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (*FINISHED_STATUSES, now - JOB_TTL_SEC)
+            )
+
+        LOGGER.info("job_submitted", job_id=job_id, total=len(urls))
+        return job_id
+
+    def get(self, job_id: str, with_results: bool = True) -> dict[str, Any] | None:
+        """Gets a job and its progress.
+
+        Args:
+            job_id (str): The id of the job.
+            with_results (bool, optional): Whether to load the results done so far. Defaults to True.
+
+        Returns:
+            dict: The job, or None if it does not exist.
+        """
+        columns = "id, status, done, total, error, created_at, updated_at" + (", results" if with_results else "")
+        with closing(self._connect()) as connection:
+            row = connection.execute(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        if row is None:
+            return None
+        job = dict(row)
+        if with_results:
+            job["results"] = json.loads(job["results"])
+        return job
+
+    def claim(self) -> dict[str, Any] | None:
+        """Claims the oldest queued job, or a running job whose worker stopped
+        updating it. The results already recorded are kept, so the job resumes
+        where it stopped.
+
+        Returns:
+            dict: The claimed job, with its URLs, targets and number of done URLs, or None if there is none.
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            # Take the write lock first, so that concurrent workers never claim the same job
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT id, urls, targets, done FROM jobs "
+                    "WHERE status = 'queued' OR (status = 'running' AND updated_at < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now - self.stale_after,),
+                ).fetchone()
+                if row is not None:
+                    connection.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (now, row["id"]))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "urls": json.loads(row["urls"]),
+            "targets": json.loads(row["targets"]) if row["targets"] is not None else None,
+            "done": row["done"],
+        }
+
+    def record_result(self, job_id: str, result: dict[str, Any]) -> None:
+        """Appends the result of the next URL of a running job.
+
+        Args:
+            job_id (str): The id of the job.
+            result (dict): The conversion result, JSON-serializable.
+        """
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "UPDATE jobs SET results = json_insert(results, '$[#]', json(?)), done = done + 1, updated_at = ? "
+                "WHERE id = ?",
+                (json.dumps(result), time.time(), job_id),
+            )
+
+    def finish(self, job_id: str, error: str | None = None) -> None:
+        """Marks a job as done, or as failed with the given error.
+
+        Args:
+            job_id (str): The id of the job.
+            error (str, optional): The error which stopped the job. Defaults to None.
+        """
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                ("failed" if error is not None else "done", error, time.time(), job_id),
+            )
+
+    def release(self, job_id: str) -> None:
+        """Queues a running job again, e.g when its worker is stopping.
+
+        Args:
+            job_id (str): The id of the job.
+        """
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            )
+
+
+class JobWorkerPool:
+    """Pool of threads running the queued jobs, one URL at a time, recording
+    each result as it is done so that the progress can be followed.
+    """
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        run_item: Callable[[str, list[str] | None], dict[str, Any]],
+        workers: int = DEFAULT_JOB_WORKERS,
+        poll_interval: float = 1.0,
+    ):
+        self.job_queue = job_queue
+        self.run_item = run_item
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        """Starts the worker threads, if not already running. Safe to call on each submission."""
+        with self._lock:
+            # Started lazily, so that they run in the worker processes, not in a preloading master
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            if self._stopping.is_set():
+                # Workers still finishing their URL after a stop must exit before new ones start
+                if self._threads:
+                    return
+                self._stopping.clear()
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name="job-worker", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self) -> None:
+        """Wakes the idle workers up, e.g after a job was submitted."""
+        self._wakeup.set()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stops the workers once they are done with their current URL. Their jobs are queued again.
+
+        Args:
+            timeout (float, optional): The maximum time to wait for each worker. Defaults to None.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        with self._lock:
+            # The workers which did not exit in time are kept, still seeing the stop flag
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            if not self._threads:
+                self._stopping.clear()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self.job_queue.claim()
+            except sqlite3.Error as e:
+                LOGGER.warning("job_claim_failed", error=str(e))
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._run_job(job)
+
+    def _run_job(self, job: dict[str, Any]) -> None:
+        LOGGER.info("job_started", job_id=job["id"], done=job["done"], total=len(job["urls"]))
+        try:
+            for url in job["urls"][job["done"]:]:
+                if self._stopping.is_set():
+                    self.job_queue.release(job["id"])
+                    return
+                self.job_queue.record_result(job["id"], self.run_item(url, job["targets"]))
+        # Any failure is recorded on the job, and must not stop the worker thread
+        except Exception as e:  # noqa: BLE001
+            LOGGER.error("job_failed", job_id=job["id"], error=str(e))
+            self.job_queue.finish(job["id"], error=str(e))
+            return
+
+        self.job_queue.finish(job["id"])
+        LOGGER.info("job_done", job_id=job["id"])
+
+
+def run_workers(argv: list[str] | None = None) -> None:
+    """Runs job workers in the current process, apart from the request-serving
+    workers, until interrupted.
+
+    Args:
+        argv (list, optional): The command-line arguments. Defaults to sys.argv.
+    """
+    from spoteezer.config import JOB_QUEUE, JOB_WORKERS
+    from spoteezer.flask_app import conversion_response
+
+    parser = argparse.ArgumentParser(prog="spoteezer worker", description="Run the Spoteezer conversion job workers.")
+    parser.add_argument("--workers", "-w", type=int, default=JOB_WORKERS or DEFAULT_JOB_WORKERS)
+    args = parser.parse_args(argv)
+
+    pool = JobWorkerPool(JOB_QUEUE, conversion_response, workers=args.workers)
+    LOGGER.info("job_workers_starting", workers=args.workers, path=JOB_QUEUE.path)
+    pool.start()
+
+    # Stop gracefully on SIGINT or SIGTERM: the jobs in progress are queued again
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    stopped.wait()
+    LOGGER.info("job_workers_stopping")
+    pool.stop()
@@ -0,0 +1,83 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+from spoteezer.convert_link import canonicalize_url
+from spoteezer.platforms import PLATFORMS
+
+# Characters ending a link in free text, besides whitespace
+LINK_END_CHARACTERS = "<>\"'`()[]{}"
+
+# Punctuation ending a sentence right after a link, not part of it
+TRAILING_PUNCTUATION = ".,;:!?"
+
+
+class Link(NamedTuple):
+    # Position of the link in the text
+    start: int
+    end: int
+    # The URL of the link, and its canonical form
+    url: str
+    canonical_url: str
+
+
+@lru_cache(maxsize=8)
+def _scanner(hosts: tuple[str, ...], schemes: tuple[str, ...]) -> re.Pattern[str]:
+    """Compiles the scanner of the links of the given hosts (and their subdomains) and URI schemes."""
+    not_end = re.escape(LINK_END_CHARACTERS)
+    host_pattern = "|".join(re.escape(host) for host in sorted(hosts, key=len, reverse=True))
+    scheme_pattern = "|".join(re.escape(scheme) for scheme in schemes)
+    return re.compile(
+        rf"(?<![\w./-])(?P<scheme>https?://)?(?:[\w-]+\.)*(?:{host_pattern})/[^\s{not_end}]+"
+        rf"|\b(?:{scheme_pattern}):[a-z]+:[A-Za-z0-9]+",
+        re.IGNORECASE,
+    )
+
+
+def find_links(text: str) -> list[Link]:
+    """Finds the links of the supported platforms in free text, e.g a whole chat
+    message, in a single pass over the text.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        list: The links of the supported platforms, in order of appearance.
+    """
+    hosts = tuple(host for item_class in PLATFORMS.values() for host in item_class.HOSTS)
+    scanner = _scanner(hosts, tuple(PLATFORMS))
+
+    links = []
+    for match in scanner.finditer(text):
+        link = match.group().rstrip(TRAILING_PUNCTUATION)
+        # Links written without their scheme, e.g deezer.com/track/3135556
+        is_uri = match.group("scheme") is None and "/" not in link
+        url = link if is_uri or match.group("scheme") else f"https://{link}"
+        # E.g a platform home page, a playlist, or an URI of an unsupported type
+        if not any(item_class.is_item_link(url) for item_class in PLATFORMS.values()):
+            continue
+        links.append(Link(match.start(), match.start() + len(link), url, canonicalize_url(url)))
+
+    return links
+
+
+def rewrite_links(text: str, links: list[Link], converted_urls: dict[str, str]) -> str:
+    """Replaces the links of a text by their converted URL.
+
+    Args:
+        text (str): The text.
+        links (list): The links found in the text, from find_links.
+        converted_urls (dict): The converted URL of each canonical URL. Links without one are kept.
+
+    Returns:
+        str: The text with the links rewritten.
+    """
+    parts, position = [], 0
+    for link in links:
+        converted_url = converted_urls.get(link.canonical_url)
+        if converted_url is None:
+            continue
+        parts += [text[position : link.start], converted_url]
+        position = link.end
+    parts.append(text[position:])
+    return "".join(parts)
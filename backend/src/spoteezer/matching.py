@@ -0,0 +1,199 @@
+import zlib
+from typing import TYPE_CHECKING, Any
+
+from spoteezer.helper import preprocess_string
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    try:
+        import numpy as np
+    except ImportError:  # Optional dependency, only needed for bulk matching
+        np = None
+
+# Number of buckets the character trigrams are hashed into
+TRIGRAM_BUCKETS = 1024
+
+# Sources scored at once, bounding the memory of the score matrices
+SOURCE_CHUNK_SIZE = 2048
+
+# Weights of the title, artist and duration similarities in the match score
+MATCH_WEIGHTS = {"track": 0.5, "artist": 0.35, "duration_sec": 0.15}
+
+# Duration difference (seconds) at which the duration similarity drops to zero
+DURATION_TOLERANCE_SEC = 10.0
+
+# Minimum score of a candidate to be considered a match
+MIN_MATCH_SCORE = 0.6
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("The numpy package is required for bulk matching")
+
+
+def trigram_ids(string: str) -> list[int]:
+    """Gets the hashed character trigrams of the given string, once normalized.
+    The hash is stable across processes, unlike the built-in hash of strings.
+
+    Args:
+        string (str): The string, e.g a track title.
+
+    Returns:
+        list: The trigram buckets, in [0, TRIGRAM_BUCKETS).
+    """
+    padded = f"  {preprocess_string(string).strip()} ".encode()
+    return [zlib.crc32(padded[i : i + 3]) % TRIGRAM_BUCKETS for i in range(len(padded) - 2)]
+
+
+def encode_strings(strings: list[str | None], binary: bool = False) -> "np.ndarray":
+    """Encodes strings into hashed trigram feature vectors.
+
+    Args:
+        strings (list): The strings to encode. Missing strings are encoded as zero vectors.
+        binary (bool, optional): Whether to encode the presence of the trigrams
+            (for Jaccard similarities) instead of their L2-normalized counts
+            (for cosine similarities). Defaults to False.
+
+    Returns:
+        ndarray: The (len(strings), TRIGRAM_BUCKETS) float32 feature matrix.
+    """
+    _require_numpy()
+    rows, cols = [], []
+    for row, string in enumerate(strings):
+        if string:
+            ids = trigram_ids(string)
+            rows.extend([row] * len(ids))
+            cols.extend(ids)
+
+    features = np.zeros((len(strings), TRIGRAM_BUCKETS), dtype=np.float32)
+    np.add.at(features, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+    if binary:
+        return np.minimum(features, 1.0, out=features)
+
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return np.divide(features, norms, out=features, where=norms > 0)
+
+
+def similarities(sources: "np.ndarray", candidates: "np.ndarray", metric: str = "cosine") -> "np.ndarray":
+    """Computes the similarities of all the source and candidate feature vectors at once.
+
+    Args:
+        sources (ndarray): The source features, from encode_strings.
+        candidates (ndarray): The candidate features, from encode_strings.
+        metric (str, optional): "cosine" over normalized counts, or "jaccard" over
+            binary features. Defaults to "cosine".
+
+    Returns:
+        ndarray: The (len(sources), len(candidates)) similarities, in [0, 1].
+    """
+    _require_numpy()
+    products = sources @ candidates.T
+    if metric == "cosine":
+        return np.clip(products, 0.0, 1.0)
+    if metric == "jaccard":
+        unions = sources.sum(axis=1)[:, None] + candidates.sum(axis=1)[None, :] - products
+        return np.divide(products, unions, out=np.zeros_like(products), where=unions > 0)
+    raise ValueError(f"Unknown similarity metric: {metric}")
+
+
+def duration_similarities(sources: list[float | None], candidates: list[float | None]) -> "np.ndarray":
+    """Computes the similarities of all the source and candidate durations at once,
+    decreasing linearly with their difference. Unknown durations are neutral (0.5).
+
+    Args:
+        sources (list): The source durations (seconds).
+        candidates (list): The candidate durations (seconds).
+
+    Returns:
+        ndarray: The (len(sources), len(candidates)) similarities, in [0, 1].
+    """
+    _require_numpy()
+    source_durations = np.array([np.nan if d is None else d for d in sources], dtype=np.float32)
+    candidate_durations = np.array([np.nan if d is None else d for d in candidates], dtype=np.float32)
+    deltas = np.abs(source_durations[:, None] - candidate_durations[None, :])
+    scores = np.clip(1.0 - deltas / DURATION_TOLERANCE_SEC, 0.0, 1.0)
+    return np.where(np.isnan(deltas), np.float32(0.5), scores)
+
+
+def encode_tracks(tracks: list[dict[str, Any]], metric: str = "cosine") -> dict[str, Any]:
+    """Encodes tracks for score_matrix, e.g to score several source batches against the same candidates.
+
+    Args:
+        tracks (list): The tracks, as search parameters ("track", "artist", "duration_sec").
+        metric (str, optional): The string similarity, "cosine" or "jaccard". Defaults to "cosine".
+
+    Returns:
+        dict: The feature matrices of the titles and artists, and the durations.
+    """
+    binary = metric == "jaccard"
+    return {
+        "track": encode_strings([track.get("track") for track in tracks], binary),
+        "artist": encode_strings([track.get("artist") for track in tracks], binary),
+        "duration_sec": [track.get("duration_sec") for track in tracks],
+    }
+
+
+def score_matrix(
+    sources: list[dict[str, Any]] | dict[str, Any],
+    candidates: list[dict[str, Any]] | dict[str, Any],
+    metric: str = "cosine",
+    weights: dict[str, float] = MATCH_WEIGHTS,
+) -> "np.ndarray":
+    """Scores every source track against every candidate track, combining the
+    trigram similarities of their titles and artists with their duration difference.
+
+    Args:
+        sources (list): The source tracks, as search parameters ("track", "artist",
+            "duration_sec"), or as encoded by encode_tracks.
+        candidates (list): The candidate tracks, in the same formats.
+        metric (str, optional): The string similarity, "cosine" or "jaccard". Defaults to "cosine".
+        weights (dict, optional): The weight of each parameter. Defaults to MATCH_WEIGHTS.
+
+    Returns:
+        ndarray: The (len(sources), len(candidates)) match scores, in [0, 1].
+    """
+    _require_numpy()
+    sources = sources if isinstance(sources, dict) else encode_tracks(sources, metric)
+    candidates = candidates if isinstance(candidates, dict) else encode_tracks(candidates, metric)
+
+    scores = weights["duration_sec"] * duration_similarities(sources["duration_sec"], candidates["duration_sec"])
+    for key in ("track", "artist"):
+        scores += weights[key] * similarities(sources[key], candidates[key], metric)
+    return scores
+
+
+def best_matches(
+    sources: list[dict[str, Any]],
+    candidates: list[dict[str, Any]],
+    min_score: float = MIN_MATCH_SCORE,
+    metric: str = "cosine",
+) -> list[tuple[int, float] | None]:
+    """Finds the best candidate of each source track, scoring the sources by chunks
+    so that large batches (e.g whole playlists) run in bounded memory.
+
+    Args:
+        sources (list): The source tracks, as search parameters ("track", "artist", "duration_sec").
+        candidates (list): The candidate tracks, in the same format.
+        min_score (float, optional): The minimum score of a match. Defaults to MIN_MATCH_SCORE.
+        metric (str, optional): The string similarity, "cosine" or "jaccard". Defaults to "cosine".
+
+    Returns:
+        list: The (index, score) of the best candidate of each source, or None if no candidate scores enough.
+    """
+    _require_numpy()
+    if not candidates:
+        return [None] * len(sources)
+
+    encoded_candidates = encode_tracks(candidates, metric)
+    matches: list[tuple[int, float] | None] = []
+    for start in range(0, len(sources), SOURCE_CHUNK_SIZE):
+        scores = score_matrix(sources[start : start + SOURCE_CHUNK_SIZE], encoded_candidates, metric)
+        best_indices = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(best_indices)), best_indices]
+        matches += [
+            (int(index), float(score)) if score >= min_score else None
+            for index, score in zip(best_indices, best_scores)
+        ]
+
+    return matches
@@ -0,0 +1,48 @@
+import threading
+from collections import Counter
+
+
+class Counters:
+    """Thread-safe counters of the work done (or spared) by the process, exposed by the /metrics endpoint."""
+
+    def __init__(self):
+        self._counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Increments a counter.
+
+        Args:
+            name (str): The name of the counter.
+            value (int, optional): The increment. Defaults to 1.
+        """
+        with self._lock:
+            self._counts[name] += value
+
+    def get(self, name: str) -> int:
+        """Gets the value of a counter.
+
+        Args:
+            name (str): The name of the counter.
+
+        Returns:
+            int: The value of the counter, 0 if it was never incremented.
+        """
+        with self._lock:
+            return self._counts[name]
+
+    def snapshot(self) -> dict[str, int]:
+        """Gets the values of all the counters.
+
+        Returns:
+            dict: The value of each counter, by name.
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+METRICS = Counters()
@@ -0,0 +1,84 @@
+from spoteezer.items.abstract_item import AbstractItem
+from spoteezer.items.deezer_item import DeezerItem
+from spoteezer.items.spotify_item import SpotifyItem
+from spoteezer.resilience import BREAKERS, CircuitBreaker
+
+# Registered platforms, by name, in registration order. Each platform plugs in
+# its item class, which parses its URLs, fetches items by id, and searches them
+PLATFORMS: dict[str, type[AbstractItem]] = {}
+
+
+def register_platform(item_class: type[AbstractItem]) -> type[AbstractItem]:
+    """Registers a platform, so that its links are converted and it is a
+    conversion target. Can be used as a class decorator.
+
+    Args:
+        item_class (type): The item class of the platform.
+
+    Returns:
+        type: The item class.
+    """
+    PLATFORMS[item_class.PLATFORM] = item_class
+    BREAKERS.setdefault(item_class.PLATFORM, CircuitBreaker(item_class.PLATFORM))
+    return item_class
+
+
+def get_platform(name: str) -> type[AbstractItem]:
+    """Gets the item class of the given platform.
+
+    Args:
+        name (str): The name of the platform, e.g deezer or spotify.
+
+    Raises:
+        ValueError: If the platform is not registered.
+
+    Returns:
+        type: The item class of the platform.
+    """
+    try:
+        return PLATFORMS[name]
+    except KeyError:
+        raise ValueError(f"Unknown platform: {name}") from None
+
+
+def get_platform_from_url(url: str) -> type[AbstractItem]:
+    """Gets the item class of the platform the given URL links to, without any network call.
+
+    Args:
+        url (str): The URL of the item.
+
+    Raises:
+        ValueError: If the URL is not from a registered platform.
+
+    Returns:
+        type: The item class of the platform.
+    """
+    for item_class in PLATFORMS.values():
+        if item_class.matches_url(url):
+            return item_class
+
+    raise ValueError(f"Could not determine the platform from URL, supported platforms: {', '.join(PLATFORMS)}.")
+
+
+def get_default_target(platform: str) -> str:
+    """Gets the platform the items of the given platform are converted to by
+    default, i.e the first other registered platform.
+
+    Args:
+        platform (str): The name of the source platform.
+
+    Raises:
+        ValueError: If there is no other platform.
+
+    Returns:
+        str: The name of the target platform.
+    """
+    for name in PLATFORMS:
+        if name != platform:
+            return name
+
+    raise ValueError(f"No platform to convert {platform} items to.")
+
+
+register_platform(DeezerItem)
+register_platform(SpotifyItem)
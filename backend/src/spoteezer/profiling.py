@@ -0,0 +1,138 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from functools import wraps
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+# Interval (seconds) between two stack samples
+PROFILE_INTERVAL_SEC = 0.005
+
+# Maximum duration (seconds) of a profiled time window
+MAX_PROFILE_SEC = 60.0
+
+
+def _collapse(frame: Any) -> str:
+    """Collapses the stack of a frame, root first, as in the flamegraph input format."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Sampling profiler of the Python threads of the process: a background thread
+    samples their stacks at a fixed interval, without instrumenting the code, so
+    that the profiled threads run at nearly full speed.
+    """
+
+    def __init__(self, thread_ids: set[int] | None = None, interval: float = PROFILE_INTERVAL_SEC):
+        """Creates a profiler.
+
+        Args:
+            thread_ids (set, optional): The ids of the threads to profile. Defaults to None, i.e all threads.
+            interval (float, optional): The sampling interval (seconds). Defaults to PROFILE_INTERVAL_SEC.
+        """
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> str:
+        """Stops sampling.
+
+        Returns:
+            str: The collapsed stacks, one "frame;frame;frame count" line per stack,
+            e.g for flamegraph.pl or speedscope.
+        """
+        self._stopped.set()
+        self._thread.join()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id and (self.thread_ids is None or thread_id in self.thread_ids):
+                    self.samples[_collapse(frame)] += 1
+
+
+class StageTimes:
+    """Cumulative CPU and wall-clock time spent in each stage of the conversions
+    (e.g fetching the source item, converting it, serializing the response),
+    per process. Stages are inclusive of the stages they call. Only recorded
+    when enabled, and a single flag check otherwise.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        # stage -> [calls, CPU seconds, wall-clock seconds]
+        self._times: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, cpu_seconds: float, wall_seconds: float) -> None:
+        with self._lock:
+            times = self._times.setdefault(stage, [0, 0.0, 0.0])
+            times[0] += 1
+            times[1] += cpu_seconds
+            times[2] += wall_seconds
+
+    def timed(self, stage: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+        """Decorates a function to record the time spent in it under the given stage.
+
+        Args:
+            stage (str): The name of the stage.
+
+        Returns:
+            Callable: The decorator.
+        """
+
+        def decorator(func: Callable[..., T]) -> Callable[..., T]:
+            @wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> T:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                # CPU time of the calling thread only: work handed over to other threads is not counted
+                cpu_started_at, started_at = time.thread_time(), time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.thread_time() - cpu_started_at, time.perf_counter() - started_at)
+
+            return wrapper
+
+        return decorator
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """Gets the cumulative times of each stage.
+
+        Returns:
+            dict: The number of calls, CPU and wall-clock milliseconds of each stage, by decreasing CPU time.
+        """
+        with self._lock:
+            times = sorted(self._times.items(), key=lambda item: -item[1][1])
+        return {
+            stage: {"calls": int(calls), "cpu_ms": round(cpu * 1000, 3), "wall_ms": round(wall * 1000, 3)}
+            for stage, (calls, cpu, wall) in times
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._times.clear()
+
+
+STAGE_TIMES = StageTimes()
@@ -0,0 +1,528 @@
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextvars import ContextVar, copy_context
+from typing import Any
+
+import deezer
+import httpx
+import requests
+import spotipy
+import structlog
+from deezer.exceptions import DeezerErrorResponse, DeezerHTTPError
+from spotipy.exceptions import SpotifyException
+
+from spoteezer.metrics import METRICS
+
+LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
+
+# Maximum duration (seconds) of a single upstream call
+UPSTREAM_TIMEOUT_SEC = 5.0
+
+# Total time budget (seconds) of a conversion request
+REQUEST_DEADLINE_SEC = 10.0
+
+# Deezer error code returned when the API quota is exceeded
+DEEZER_QUOTA_ERROR_CODE = 4
+
+# Percentile of the recent latencies of a platform after which an idempotent call
+# is hedged, i.e duplicated, and the number of latencies it is computed from
+HEDGE_PERCENTILE = 0.95
+HEDGE_LATENCY_WINDOW = 256
+HEDGE_MIN_SAMPLES = 20
+
+# Hedge delay (seconds) until enough latencies are known, and its lower bound
+HEDGE_DEFAULT_DELAY_SEC = 0.5
+HEDGE_MIN_DELAY_SEC = 0.05
+
+# Share of the hedgeable calls which may be hedged, and hedges which may be sent in a burst
+HEDGE_BUDGET_RATIO = 0.05
+HEDGE_BUDGET_BURST = 5.0
+
+# Threads running the hedged calls: calls which would have to wait for one run on the caller's thread
+HEDGE_WORKERS = 32
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request ran out of its time budget."""
+
+
+class ConversionCancelled(DeadlineExceeded):
+    """Raised when a request was cancelled, e.g because its client went away
+    or sent a newer request. Handled as an exceeded deadline, so that no further
+    upstream call is made for it.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(f"Conversion cancelled ({reason})")
+        self.reason = reason
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised when calls to a degraded platform are failing fast."""
+
+    def __init__(self, platform: str):
+        super().__init__(f"{platform.capitalize()} is currently unavailable")
+        self.platform = platform
+
+
+class Deadline:
+    """Time budget of a request, propagated to every upstream call it makes.
+    The request can also be cancelled, by another thread or by a probe checking
+    whether its client is still connected.
+    """
+
+    def __init__(self, timeout: float = REQUEST_DEADLINE_SEC, is_disconnected: Callable[[], bool] | None = None):
+        self.expires_at = time.monotonic() + timeout
+        self.is_disconnected = is_disconnected
+        self.cancel_reason: str | None = None
+
+    def remaining(self) -> float:
+        """Gets the remaining time budget.
+
+        Returns:
+            float: The remaining time (seconds), negative once expired.
+        """
+        return self.expires_at - time.monotonic()
+
+    def cancel(self, reason: str) -> None:
+        """Cancels the request: its next upstream calls will not be made.
+
+        Args:
+            reason (str): Why the request was cancelled, e.g disconnected or superseded.
+        """
+        if self.cancel_reason is None:
+            self.cancel_reason = reason
+
+    def check(self) -> None:
+        """Checks that the time budget is not exhausted, and that the request was not cancelled.
+
+        Raises:
+            ConversionCancelled: If the request was cancelled, or its client disconnected.
+            DeadlineExceeded: If the deadline has passed.
+        """
+        if self.cancel_reason is None and self.is_disconnected is not None and self.is_disconnected():
+            self.cancel("disconnected")
+        if self.cancel_reason is not None:
+            raise ConversionCancelled(self.cancel_reason)
+        if self.remaining() <= 0:
+            raise DeadlineExceeded("Conversion deadline exceeded")
+
+    def timeout(self, cap: float = UPSTREAM_TIMEOUT_SEC) -> float:
+        """Gets the timeout to give to the next upstream call.
+
+        Args:
+            cap (float, optional): The maximum timeout. Defaults to UPSTREAM_TIMEOUT_SEC.
+
+        Raises:
+            DeadlineExceeded: If the deadline has passed.
+
+        Returns:
+            float: The remaining time budget, capped.
+        """
+        self.check()
+        return min(self.remaining(), cap)
+
+
+# Deadline of the request making the upstream call running in the current context
+_CALL_DEADLINE: ContextVar[Deadline | None] = ContextVar("call_deadline", default=None)
+
+
+def upstream_timeout(cap: float = UPSTREAM_TIMEOUT_SEC) -> float:
+    """Gets the timeout of the upstream call running in the current context,
+    bounded by the deadline of its request.
+
+    Args:
+        cap (float, optional): The maximum timeout. Defaults to UPSTREAM_TIMEOUT_SEC.
+
+    Raises:
+        DeadlineExceeded: If the deadline has passed.
+
+    Returns:
+        float: The timeout (seconds).
+    """
+    deadline = _CALL_DEADLINE.get()
+    return cap if deadline is None else deadline.timeout(cap)
+
+
+class DeadlineDeezerClient(deezer.Client):
+    """Deezer client whose requests time out with the deadline of the upstream call making them."""
+
+    def request(self, method: str, path: str, *args: Any, **kwargs: Any) -> Any:
+        kwargs.setdefault("timeout", upstream_timeout())
+        return super().request(method, path, *args, **kwargs)
+
+
+class DeadlineSpotify(spotipy.Spotify):
+    """Spotify client whose requests time out with the deadline of the upstream
+    call making them, spotipy reading its timeout before each request.
+    """
+
+    @property
+    def requests_timeout(self) -> float:
+        return upstream_timeout(self._requests_timeout)
+
+    @requests_timeout.setter
+    def requests_timeout(self, timeout: float) -> None:
+        self._requests_timeout = timeout
+
+
+class CircuitBreaker:
+    """Per-platform circuit breaker. Opens when the error rate over the last
+    calls spikes, fails fast while open, then lets a single trial call through
+    after a cooldown to probe whether the platform recovered.
+    """
+
+    def __init__(
+        self,
+        platform: str,
+        window: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        cooldown: float = 30.0,
+    ):
+        self.platform = platform
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at: float | None = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Gets the state of the breaker, i.e closed, open, or half-open."""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        """Checks whether a call to the platform may be made.
+
+        Returns:
+            bool: False if the breaker is open, or if a trial call is already running.
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                LOGGER.info("circuit_closed", platform=self.platform)
+                self._opened_at = None
+                self._outcomes.clear()
+            self._trial_running = False
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._outcomes.append(False)
+            if self._opened_at is not None:
+                # Calls admitted before the circuit opened do not push the trial call back
+                if self.state == "half-open":
+                    # The trial call failed: stay open for another cooldown
+                    self._trial_running = False
+                    self._opened_at = time.monotonic()
+                return
+
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                LOGGER.warning("circuit_opened", platform=self.platform, failures=failures)
+                self._opened_at = time.monotonic()
+
+
+BREAKERS: dict[str, CircuitBreaker] = {
+    "deezer": CircuitBreaker("deezer"),
+    "spotify": CircuitBreaker("spotify"),
+}
+
+
+class HedgePolicy:
+    """Decides when the idempotent upstream calls are hedged: after the given
+    percentile of the recent latencies of their platform, as long as the hedging
+    budget (a token bucket refilled by each hedgeable call) is not exhausted, so
+    that hedges stay a small fraction of the traffic even when a platform slows down.
+    """
+
+    def __init__(
+        self,
+        percentile: float = HEDGE_PERCENTILE,
+        window: int = HEDGE_LATENCY_WINDOW,
+        budget_ratio: float = HEDGE_BUDGET_RATIO,
+        budget_burst: float = HEDGE_BUDGET_BURST,
+    ):
+        self.percentile = percentile
+        self.window = window
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self._latencies: dict[str, deque[float]] = {}
+        self._tokens = budget_burst
+        self._lock = threading.Lock()
+
+    def record_latency(self, platform: str, seconds: float) -> None:
+        """Records the latency of a successful upstream call.
+
+        Args:
+            platform (str): The platform called.
+            seconds (float): The latency of the call.
+        """
+        with self._lock:
+            self._latencies.setdefault(platform, deque(maxlen=self.window)).append(seconds)
+
+    def delay(self, platform: str) -> float:
+        """Gets the time after which a call to the given platform is hedged.
+
+        Args:
+            platform (str): The platform called.
+
+        Returns:
+            float: The delay (seconds).
+        """
+        with self._lock:
+            latencies = sorted(self._latencies.get(platform, ()))
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY_SEC
+        return max(latencies[min(int(len(latencies) * self.percentile), len(latencies) - 1)], HEDGE_MIN_DELAY_SEC)
+
+    def count_call(self) -> None:
+        """Counts a hedgeable call, refilling the hedging budget."""
+        with self._lock:
+            self._tokens = min(self._tokens + self.budget_ratio, self.budget_burst)
+
+    def can_hedge(self) -> bool:
+        """Checks whether the budget has a hedge left, without taking it."""
+        with self._lock:
+            return self._tokens >= 1
+
+    def try_hedge(self) -> bool:
+        """Takes a hedge from the budget.
+
+        Returns:
+            bool: Whether the call may be hedged.
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+HEDGING = HedgePolicy()
+_HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+_HEDGE_SLOTS = threading.BoundedSemaphore(HEDGE_WORKERS)
+
+
+def _timed_call[T](func: Callable[..., T], args: Any, kwargs: Any) -> tuple[T, float]:
+    """Makes a call, timing it from its actual start."""
+    started_at = time.monotonic()
+    result = func(*args, **kwargs)
+    return result, time.monotonic() - started_at
+
+
+def _submit[T](func: Callable[..., T], args: Any, kwargs: Any) -> Future[tuple[T, float]] | None:
+    """Runs a timed call on the hedging pool, if one of its threads is idle so
+    that the call never waits in its queue.
+    """
+    if not _HEDGE_SLOTS.acquire(blocking=False):
+        return None
+
+    # The attempt runs in a copy of the context of the call, i.e with its deadline
+    context = copy_context()
+
+    def run() -> tuple[T, float]:
+        try:
+            return context.run(lambda: _timed_call(func, args, kwargs))
+        finally:
+            _HEDGE_SLOTS.release()
+
+    try:
+        return _HEDGE_EXECUTOR.submit(run)
+    except BaseException:
+        _HEDGE_SLOTS.release()
+        raise
+
+
+def _call_hedged[T](
+    platform: str, func: Callable[..., T], args: Any, kwargs: Any, deadline: Deadline | None
+) -> tuple[T, float]:
+    """Makes an idempotent call, duplicated if it is slower than the hedge delay. The
+    first successful attempt wins, the other one completes in the background. The
+    call only goes through the hedging pool when it may be hedged, i.e the budget
+    has a hedge left and a thread of the pool is idle, and runs on the caller's
+    thread otherwise.
+
+    Returns:
+        tuple: The result of the call, and the latency of the attempt which answered.
+    """
+    HEDGING.count_call()
+    primary = _submit(func, args, kwargs) if HEDGING.can_hedge() else None
+    if primary is None:
+        return _timed_call(func, args, kwargs)
+
+    delay = HEDGING.delay(platform)
+    if deadline is not None:
+        delay = min(delay, max(deadline.remaining(), 0.0))
+    try:
+        return primary.result(timeout=delay)
+    except FutureTimeoutError:
+        pass
+
+    if not HEDGING.try_hedge():
+        METRICS.increment(f"hedges_over_budget_{platform}")
+        return primary.result()
+
+    hedge = _submit(func, args, kwargs)
+    if hedge is None:
+        METRICS.increment(f"hedges_no_worker_{platform}")
+        return primary.result()
+
+    METRICS.increment(f"hedges_sent_{platform}")
+    pending = {primary, hedge}
+    error: BaseException | None = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    METRICS.increment(f"hedges_won_{platform}")
+                return future.result()
+            error = future.exception()
+
+    assert error is not None
+    raise error
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Checks whether the given error means the platform is degraded (timeouts,
+    connection errors, rate limiting, server errors), as opposed to functional
+    errors such as an item not being found.
+
+    Args:
+        error (Exception): The error raised by an upstream call.
+
+    Returns:
+        bool: Whether the error should count towards opening the circuit.
+    """
+    if isinstance(error, DeadlineExceeded):
+        # The request ran out of its time budget, not the platform
+        return False
+    if isinstance(error, (requests.RequestException, httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    if isinstance(error, SpotifyException):
+        return error.http_status == 429 or error.http_status >= 500
+    if isinstance(error, DeezerHTTPError):
+        status = error.args[0] if error.args and isinstance(error.args[0], int) else 500
+        return status == 429 or status >= 500
+    if isinstance(error, DeezerErrorResponse):
+        # Annotated as dict[str, str] by deezer-python, the error is actually a nested object
+        error_info: Any = error.json_data.get("error")
+        return isinstance(error_info, dict) and error_info.get("code") == DEEZER_QUOTA_ERROR_CODE
+    return False
+
+
+def call_upstream[T](
+    platform: str,
+    func: Callable[..., T],
+    *args: Any,
+    deadline: Deadline | None = None,
+    hedge: bool = False,
+    **kwargs: Any,
+) -> T:
+    """Makes an upstream call, guarded by the request deadline and the
+    circuit breaker of the platform.
+
+    Args:
+        platform (str): The platform called, i.e deezer or spotify.
+        func (Callable): The function making the call.
+        deadline (Deadline, optional): The deadline of the request. Defaults to None.
+        hedge (bool, optional): Whether to hedge the call if it is slow. Only for
+            idempotent calls, e.g lookups. Defaults to False.
+
+    Raises:
+        DeadlineExceeded: If the deadline has passed.
+        CircuitOpenError: If the circuit of the platform is open.
+
+    Returns:
+        The result of the call.
+    """
+    if deadline is not None:
+        try:
+            deadline.check()
+        except ConversionCancelled:
+            METRICS.increment("upstream_calls_cancelled")
+            raise
+
+    breaker = BREAKERS[platform]
+    if not breaker.allow():
+        raise CircuitOpenError(platform)
+
+    # The clients time the call out with the deadline rather than after a full upstream timeout
+    token = _CALL_DEADLINE.set(deadline)
+    try:
+        # Calls probing a recovering platform are never duplicated
+        if hedge and breaker.state == "closed":
+            result, latency = _call_hedged(platform, func, args, kwargs, deadline)
+        else:
+            result, latency = _timed_call(func, args, kwargs)
+    except Exception as e:
+        if is_upstream_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    finally:
+        _CALL_DEADLINE.reset(token)
+
+    breaker.record_success()
+    HEDGING.record_latency(platform, latency)
+    return result
+
+
+class ClientRequests:
+    """Current request of each client (identified by a token it sends), so that
+    a newer request of a client cancels the one it supersedes, e.g when the user
+    kept typing. Clients are tracked per process.
+    """
+
+    def __init__(self):
+        self._deadlines: dict[str, Deadline] = {}
+        self._lock = threading.Lock()
+
+    def start(self, token: str, deadline: Deadline) -> None:
+        """Registers the request of a client, cancelling its previous request if still running.
+
+        Args:
+            token (str): The token of the client.
+            deadline (Deadline): The deadline of the new request.
+        """
+        with self._lock:
+            previous = self._deadlines.get(token)
+            self._deadlines[token] = deadline
+        if previous is not None:
+            previous.cancel("superseded")
+
+    def finish(self, token: str, deadline: Deadline) -> None:
+        """Unregisters the request of a client, unless it was already superseded.
+
+        Args:
+            token (str): The token of the client.
+            deadline (Deadline): The deadline of the finished request.
+        """
+        with self._lock:
+            if self._deadlines.get(token) is deadline:
+                del self._deadlines[token]
+
+
+CLIENT_REQUESTS = ClientRequests()
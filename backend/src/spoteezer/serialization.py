@@ -0,0 +1,97 @@
+import json
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlencode
+
+from flask.json.provider import DefaultJSONProvider
+
+from spoteezer.thumbnails import ThumbnailCache
+
+if TYPE_CHECKING:
+    import orjson
+else:
+    try:
+        import orjson
+    except ImportError:  # Optional dependency, the standard json module is used otherwise
+        orjson = None
+
+# Stands for the root URL of the app in the pre-serialized fragments, and is
+# replaced by the root URL of each request, e.g to build the thumbnail URLs
+APP_ROOT_PLACEHOLDER = "$spoteezer-root$/"
+
+# Characters kept as-is in the query strings, as in the URLs built by Flask
+URL_SAFE_CHARACTERS = "!$'()*,/:;?@"
+
+
+def dumps(value: Any) -> str:
+    """Serializes a value to compact JSON, with sorted keys as Flask does.
+
+    Args:
+        value: The JSON-serializable value.
+
+    Returns:
+        str: The JSON text.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def web_info_fragment(web_info: dict[str, Any]) -> str:
+    """Pre-serializes the web information of an item, once for all the responses
+    it appears in. Its image is pointed to the thumbnail proxy of the app.
+
+    Args:
+        web_info (dict): The web information of the item.
+
+    Returns:
+        str: The JSON fragment, to be assembled with render_fragment.
+    """
+    img_url = web_info.get("img_url")
+    if img_url and ThumbnailCache.is_allowed(img_url):
+        proxied_url = f"{APP_ROOT_PLACEHOLDER}thumbnail?{urlencode({'src': img_url}, safe=URL_SAFE_CHARACTERS)}"
+        web_info = {**web_info, "img_url": proxied_url}
+    return dumps(web_info)
+
+
+def conversion_fragment(result: dict[str, Any], log: str) -> str:
+    """Assembles the JSON of a conversion response from the pre-serialized fragments of its items.
+
+    Args:
+        result (dict): The cached conversion result, with its "fragments".
+        log (str): The log message of the response.
+
+    Returns:
+        str: The JSON fragment of the response.
+    """
+    fragments = result["fragments"]
+    return f'{{"log":{dumps(log)},"result":{{"init":{fragments["init"]},"result":{fragments["result"]}}}}}'
+
+
+def render_fragment(fragment: str, app_root: str) -> bytes:
+    """Renders a JSON fragment for the given app root URL.
+
+    Args:
+        fragment (str): The assembled JSON fragment.
+        app_root (str): The root URL of the app, e.g request.url_root.
+
+    Returns:
+        bytes: The JSON response body.
+    """
+    return f"{fragment.replace(APP_ROOT_PLACEHOLDER, app_root)}\n".encode()
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider serializing the responses with orjson, several times
+    faster than the standard json module.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
@@ -0,0 +1,136 @@
+import argparse
+import os
+from typing import Any
+
+import structlog
+from gunicorn.app.base import BaseApplication
+
+LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
+
+# WSGI application served in production
+APP_URI = "spoteezer.flask_app:app"
+
+# Default number of threads of each worker process
+DEFAULT_THREADS = 4
+
+
+def default_workers() -> int:
+    """Gets the default number of worker processes, i.e the usual
+    (2 x cores) + 1 recommended by gunicorn for I/O-bound services.
+
+    Returns:
+        int: The default number of worker processes.
+    """
+    return (os.cpu_count() or 1) * 2 + 1
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    """Gunicorn hook run in each worker right after it is forked.
+    Threads do not survive the fork, so the background token refresher
+    started while preloading the app is restarted here, and the job
+    workers are started if the request-serving processes run them too.
+    """
+    from spoteezer.config import (
+        JOB_WORKERS,
+        SPOTIFY_TOKEN_REFRESH,
+        SPOTIFY_TOKEN_REFRESHER,
+    )
+
+    if SPOTIFY_TOKEN_REFRESH:
+        SPOTIFY_TOKEN_REFRESHER.start()
+    if JOB_WORKERS > 0:
+        from spoteezer.flask_app import JOB_POOL
+
+        JOB_POOL.start()
+
+
+class SpoteezerServer(BaseApplication):
+    """Gunicorn application serving the Flask app with the given options."""
+
+    def __init__(self, options: dict[str, Any]):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        assert self.cfg is not None, "cfg is set by BaseApplication before load_config"
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+        self.cfg.set("post_fork", post_fork)
+
+    def load(self) -> Any:
+        from gunicorn.util import import_app
+
+        return import_app(APP_URI)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parses the command-line arguments of the production server.
+
+    Args:
+        argv (list, optional): The arguments to parse. Defaults to sys.argv.
+
+    Returns:
+        Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="spoteezer",
+        description="Run the Spoteezer API with a multi-process production server. "
+        "Send SIGHUP to the master process to gracefully reload the workers.",
+    )
+    parser.add_argument("--bind", "-b", default=os.environ.get("SPOTEEZER_BIND", "127.0.0.1:5000"))
+    parser.add_argument("--workers", "-w", type=int, default=int(os.environ.get("SPOTEEZER_WORKERS", default_workers())))
+    parser.add_argument("--threads", "-t", type=int, default=int(os.environ.get("SPOTEEZER_THREADS") or DEFAULT_THREADS))
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=1000,
+        help="Recycle a worker after it served this many requests (0 to disable).",
+    )
+    parser.add_argument(
+        "--max-requests-jitter",
+        type=int,
+        default=100,
+        help="Random jitter added to --max-requests so workers do not all restart at once.",
+    )
+    parser.add_argument("--timeout", type=int, default=30, help="Seconds before a silent worker is killed.")
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=30,
+        help="Seconds given to workers to finish in-flight requests on reload or shutdown.",
+    )
+    parser.add_argument(
+        "--no-preload",
+        dest="preload",
+        action="store_false",
+        help="Import the app in each worker instead of once in the master process.",
+    )
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+
+def run(argv: list[str] | None = None) -> None:
+    """Runs the production server.
+
+    Args:
+        argv (list, optional): The command-line arguments. Defaults to sys.argv.
+    """
+    args = parse_args(argv)
+    # Read by the configuration of the app, imported afterwards, e.g to bound the conversions in flight
+    os.environ["SPOTEEZER_THREADS"] = str(args.threads)
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        # Threaded workers keep serving while other threads wait on upstream APIs
+        "worker_class": "gthread" if args.threads > 1 else "sync",
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "preload_app": args.preload,
+        "loglevel": args.log_level,
+    }
+    LOGGER.info("server_starting", **options)
+    SpoteezerServer(options).run()
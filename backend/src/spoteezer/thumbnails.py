@@ -0,0 +1,138 @@
+import hashlib
+import io
+import os
+import threading
+from urllib.parse import urlparse
+
+import requests
+import structlog
+
+try:
+    from PIL import Image
+except ImportError:  # Optional dependency, images are then cached full-size
+    Image = None
+
+LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
+
+# Image hosts of Spotify and Deezer, the only ones the proxy fetches from
+ALLOWED_HOST_SUFFIXES = (".scdn.co", ".spotifycdn.com", ".dzcdn.net")
+
+# Side (px) of the cached thumbnails: the cover art is displayed at 60px,
+# doubled for high-density screens
+THUMBNAIL_SIZE = 120
+
+# Timeout (seconds) when fetching the original image
+FETCH_TIMEOUT_SEC = 5
+
+
+class ThumbnailCache:
+    """Downsized cover images cached on local disk, evicting the least
+    recently used files once the cache grows over its size cap.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, size: int = THUMBNAIL_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+    @staticmethod
+    def is_allowed(src: str) -> bool:
+        """Checks that the given image URL points to a Spotify or Deezer image host.
+
+        Args:
+            src (str): The URL of the original image.
+
+        Returns:
+            bool: Whether the proxy may fetch the image.
+        """
+        parsed = urlparse(src)
+        return parsed.scheme == "https" and (parsed.hostname or "").endswith(ALLOWED_HOST_SUFFIXES)
+
+    def get_path(self, src: str) -> str:
+        """Gets the path of the cached thumbnail of the given image, fetching
+        and downsizing it first if needed.
+
+        Args:
+            src (str): The URL of the original image.
+
+        Raises:
+            ValueError: If the image host is not allowed.
+            requests.RequestException: If the original image could not be fetched.
+
+        Returns:
+            str: The path of the cached thumbnail.
+        """
+        if not self.is_allowed(src):
+            raise ValueError(f"Image host not allowed: {src}")
+
+        key = hashlib.sha256(f"{self.size}:{src}".encode()).hexdigest()
+        path = os.path.join(self.directory, f"{key}.jpg")
+
+        try:
+            # Mark the thumbnail as recently used
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        response = requests.get(src, timeout=FETCH_TIMEOUT_SEC)
+        response.raise_for_status()
+        data = self.downsize(response.content)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        LOGGER.info("thumbnail_cached", src=src, size=len(data))
+
+        with self._lock:
+            self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self.evict()
+
+        return path
+
+    def downsize(self, data: bytes) -> bytes:
+        """Downsizes the given image to the thumbnail size, as a JPEG.
+
+        Args:
+            data (bytes): The original image.
+
+        Returns:
+            bytes: The thumbnail, or the original image if Pillow is not installed.
+        """
+        if Image is None:
+            return data
+
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert("RGB")
+            image.thumbnail((self.size, self.size))
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=85, optimize=True)
+            return output.getvalue()
+
+    def evict(self) -> None:
+        """Removes the least recently used thumbnails until the cache is back
+        under 90% of its size cap. The directory is rescanned, since it may be
+        shared with other worker processes.
+        """
+        entries = [entry for entry in os.scandir(self.directory) if entry.is_file()]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        total_bytes = sum(entry.stat().st_size for entry in entries)
+
+        target_bytes = int(self.max_bytes * 0.9)
+        for entry in entries:
+            if total_bytes <= target_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+        LOGGER.info("thumbnails_evicted", total_bytes=total_bytes)
+        self._total_bytes = total_bytes
@@ -0,0 +1,157 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import Any
+
+import requests
+import structlog
+from spotipy.cache_handler import CacheHandler
+from spotipy.oauth2 import SpotifyClientCredentials, SpotifyOauthError
+
+LOGGER: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
+
+# Refresh the token this many seconds before it expires. Spotipy itself only
+# refreshes inline once the token is within 60 seconds of expiry, so any margin
+# above that keeps user requests off the token endpoint.
+REFRESH_MARGIN_SEC = 300
+
+# How often the background refresher wakes up to check the shared token.
+REFRESH_INTERVAL_SEC = 30
+
+
+class SharedTokenCacheHandler(CacheHandler):
+    """Spotipy cache handler storing the access token in a file shared by
+    every worker process of the host.
+
+    Writes are atomic (temporary file + rename) and refreshes are serialized
+    with an exclusive lock on a sibling ``.lock`` file, so N workers share a
+    single client-credentials token instead of fetching N of them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self._token_info: dict[str, Any] | None = None
+        self._mtime: float | None = None
+        self._mutex = threading.Lock()
+
+    def get_cached_token(self) -> dict[str, Any] | None:
+        """Gets the token, re-reading the shared file only when another
+        process has replaced it since the last read.
+
+        Returns:
+            dict: The token info, or None if no token was cached yet.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return self._token_info
+
+        with self._mutex:
+            if mtime != self._mtime:
+                try:
+                    with open(self.path) as f:
+                        self._token_info = json.load(f)
+                    self._mtime = mtime
+                except (OSError, ValueError) as e:
+                    LOGGER.warning("token_cache_read_failed", path=self.path, error=str(e))
+            return self._token_info
+
+    def save_token_to_cache(self, token_info: dict[str, Any]) -> None:
+        """Atomically writes the token to the shared file.
+
+        Args:
+            token_info (dict): The token info returned by Spotify.
+        """
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._mutex:
+            self._token_info = token_info
+            try:
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w") as f:
+                    json.dump(token_info, f)
+                os.replace(tmp_path, self.path)
+                self._mtime = os.stat(self.path).st_mtime
+            except OSError as e:
+                LOGGER.warning("token_cache_write_failed", path=self.path, error=str(e))
+
+    @contextmanager
+    def lock(self) -> Generator[None, None, None]:
+        """Holds the cross-process lock guarding token refreshes."""
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+class TokenRefresher:
+    """Refreshes the shared Spotify token in a background thread before it
+    expires, so that no user request blocks on the token endpoint.
+    """
+
+    def __init__(
+        self,
+        credentials: SpotifyClientCredentials,
+        cache_handler: SharedTokenCacheHandler,
+        margin: int = REFRESH_MARGIN_SEC,
+        interval: int = REFRESH_INTERVAL_SEC,
+    ):
+        self.credentials = credentials
+        self.cache_handler = cache_handler
+        self.margin = margin
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _is_fresh(self, token_info: dict[str, Any] | None) -> bool:
+        return token_info is not None and token_info["expires_at"] - time.time() > self.margin
+
+    def refresh_if_needed(self) -> bool:
+        """Fetches a new token if the shared one is missing or about to expire.
+        The shared token is checked again once the lock is held, since another
+        worker may have refreshed it in the meantime.
+
+        Returns:
+            bool: Whether this process fetched a new token.
+        """
+        if self._is_fresh(self.cache_handler.get_cached_token()):
+            return False
+
+        with self.cache_handler.lock():
+            if self._is_fresh(self.cache_handler.get_cached_token()):
+                return False
+            # Saves the new token through the cache handler
+            self.credentials.get_access_token(as_dict=False, check_cache=False)
+
+        LOGGER.info("spotify_token_refreshed", pid=os.getpid())
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh_if_needed()
+            except (SpotifyOauthError, requests.RequestException, OSError) as e:
+                LOGGER.warning("spotify_token_refresh_failed", error=str(e))
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """Starts the background refresh thread (once per process)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="spotify-token-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -6,6 +6,16 @@ import pytest
 # Set environment variables before any imports to avoid credential errors
 os.environ.setdefault("SPOTIFY_CLIENT_ID", "test_client_id")
 os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "test_client_secret")
+os.environ.setdefault("SPOTIFY_TOKEN_REFRESH", "0")
+os.environ.setdefault("SPOTEEZER_JOB_WORKERS", "0")
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start each test with an empty cache."""
+    from spoteezer.config import CACHE
+
+    CACHE.clear()
 
 
 def pytest_addoption(parser):
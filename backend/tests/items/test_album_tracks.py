@@ -0,0 +1,50 @@
+"""Tests for the compact album tracks."""
+
+from array import array
+
+from spoteezer.items.album_tracks import MAX_DURATION_SEC, AlbumTracks
+
+
+def test_album_tracks_normalized():
+    """Test that only the normalized fields of the tracks are kept, packed."""
+    tracks = AlbumTracks(
+        [("4iV5W9uYEdYUVa79Axb7Rh", 'One More "Time"', 320), (None, "Aerodynamic", None), ("x", "Long", 10**6)]
+    )
+
+    assert len(tracks) == 3
+    assert list(tracks) == ["one more time", "aerodynamic", "long"]
+    assert tracks.ids == ["4iV5W9uYEdYUVa79Axb7Rh", None, "x"]
+    assert list(tracks.durations) == [320, 0, MAX_DURATION_SEC]
+    assert tracks.sample_ids(5) == ["4iV5W9uYEdYUVa79Axb7Rh", "x"]
+
+
+def test_album_tracks_integer_ids():
+    """Test that integer ids, i.e Deezer ones, are packed into an array."""
+    tracks = AlbumTracks((track_id, f"Track {track_id}", 200) for track_id in range(1, 11))
+
+    assert isinstance(tracks._ids, array)
+    assert tracks.sample_ids(2) == [1, 6]
+
+
+def test_album_tracks_limit():
+    """Test that the generator of tracks is only consumed up to the limit."""
+    consumed = []
+
+    def iter_tracks():
+        for track_id in range(100):
+            consumed.append(track_id)
+            yield track_id, f"Track {track_id}", 200
+
+    tracks = AlbumTracks(iter_tracks(), limit=10)
+
+    assert len(tracks) == 10
+    assert len(consumed) == 10
+
+
+def test_album_tracks_empty():
+    """Test that albums without tracks have neither titles nor ids."""
+    tracks = AlbumTracks([])
+
+    assert len(tracks) == 0
+    assert tracks.titles == []
+    assert tracks.sample_ids(5) == []
@@ -3,7 +3,9 @@
 import pytest
 from unittest.mock import Mock, patch
 
-from spoteezer.items.deezer_item import DeezerItem
+from spoteezer.items.album_tracks import MAX_ALBUM_TRACKS
+from spoteezer.items.deezer_item import ALBUM_TRACKS_PAGE_SIZE, DeezerItem
+from spoteezer.resilience import UPSTREAM_TIMEOUT_SEC
 
 
 class TestDeezerItem:
@@ -132,7 +134,7 @@ class TestDeezerItem:
         assert item.type == "track"
         assert item.id == 123456
         assert item.url == "https://www.deezer.com/track/123456"
-        mock_deezer.request.assert_called_once_with("GET", "track/isrc:USRC12345678")
+        mock_deezer.request.assert_called_once_with("GET", "track/isrc:USRC12345678", timeout=UPSTREAM_TIMEOUT_SEC)
 
     @patch("spoteezer.items.deezer_item.DEEZER")
     def test_init_from_item_with_search(self, mock_deezer):
@@ -167,6 +169,48 @@ class TestDeezerItem:
         assert item.id == 123456
         assert mock_deezer.search.called
 
+    @patch("spoteezer.items.abstract_item.requests.get")
+    @patch("spoteezer.items.deezer_item.DEEZER")
+    def test_init_from_url_album_pages(self, mock_deezer, mock_requests_get):
+        """Test that the tracks of large albums are paged through, up to the track limit."""
+        mock_response = Mock()
+        mock_response.url = "https://www.deezer.com/album/789012"
+        mock_response.history = []
+        mock_requests_get.return_value = mock_response
+
+        tracks = [{"id": i, "title": f"Track {i}", "duration": 200} for i in range(1, MAX_ALBUM_TRACKS + 101)]
+        mock_album = Mock()
+        mock_album.as_dict.return_value = {
+            "id": 789012,
+            "title": "Test Compilation",
+            "artist": {"name": "Various Artists"},
+            "cover_big": "https://example.com/album_cover.jpg",
+            "nb_tracks": len(tracks),
+            "tracks": tracks[:25],
+        }
+        mock_deezer.get_album.return_value = mock_album
+
+        def request_side_effect(method, path, params, **kwargs):
+            pages = []
+            for track in tracks[params["index"] : params["index"] + params["limit"]]:
+                page_track = Mock()
+                page_track.as_dict.return_value = track
+                pages.append(page_track)
+            return pages
+
+        mock_deezer.request.side_effect = request_side_effect
+
+        item = DeezerItem(url="https://www.deezer.com/album/789012")
+
+        assert item.album_tracks is not None
+        assert item.raw_info is not None
+        assert item.album_tracks.ids == list(range(1, MAX_ALBUM_TRACKS + 1))
+        assert item.album_tracks.sample_ids(4) == [1, 251, 501, 751]
+        # The pages past the track limit are not fetched
+        indexes = [call.kwargs["params"]["index"] for call in mock_deezer.request.call_args_list]
+        assert indexes == list(range(25, MAX_ALBUM_TRACKS, ALBUM_TRACKS_PAGE_SIZE))
+        assert "tracks" not in item.raw_info
+
     def test_get_search_params_invalid_type(self):
         """Test that get_search_params raises ValueError for invalid type."""
         with patch("spoteezer.items.abstract_item.requests.get"):
@@ -208,3 +252,62 @@ class TestDeezerItem:
         assert web_info["id"] == 123456
         assert web_info["url"] == "https://www.deezer.com/track/123456"
         assert web_info["img_url"] == "https://example.com/cover.jpg"
+
+    def test_canonical_url(self):
+        """Test that Deezer URLs are canonicalized without network calls."""
+        assert DeezerItem.parse_url("https://www.deezer.com/fr/album/789012?utm=x") == ("album", "789012")
+        assert DeezerItem.canonical_url("http://deezer.com/track/123456") == "https://www.deezer.com/track/123456"
+        assert DeezerItem.canonical_url("https://link.deezer.com/s/abc") is None
+
+    @patch("spoteezer.items.deezer_item.DEEZER")
+    def test_init_from_item_artist_fingerprint(self, mock_deezer):
+        """Test that artists are matched by the ISRCs of their top tracks."""
+        mock_source_item = Mock()
+        mock_source_item.type = "artist"
+        mock_source_item.search_params = {"artist": "test artist"}
+        mock_source_item.get_top_track_isrcs.return_value = ["ISRC1", "ISRC2", "ISRC3"]
+
+        # Two of the three top tracks belong to the artist 42
+        artist_by_isrc = {"track/isrc:ISRC1": 42, "track/isrc:ISRC2": 7, "track/isrc:ISRC3": 42}
+
+        def request_side_effect(method, path, **kwargs):
+            track = Mock()
+            track.as_dict.return_value = {"id": 1, "artist": {"id": artist_by_isrc[path]}, "contributors": []}
+            return track
+
+        mock_deezer.request.side_effect = request_side_effect
+        mock_artist = Mock()
+        mock_artist.as_dict.return_value = {
+            "id": 42,
+            "name": "Test Artist",
+            "link": "https://www.deezer.com/artist/42",
+            "picture_big": "https://example.com/artist_pic.jpg",
+        }
+        mock_deezer.get_artist.return_value = mock_artist
+
+        item = DeezerItem(item=mock_source_item)
+
+        assert item.id == 42
+        mock_deezer.get_artist.assert_called_once_with(42)
+        assert not mock_deezer.search_artists.called
+
+    @patch("spoteezer.items.deezer_item.DEEZER")
+    def test_init_from_item_artist_fingerprint_fallback(self, mock_deezer):
+        """Test that artists without a clear fingerprint match are searched by name."""
+        mock_source_item = Mock()
+        mock_source_item.type = "artist"
+        mock_source_item.search_params = {"artist": "test artist"}
+        mock_source_item.get_top_track_isrcs.return_value = []
+
+        mock_search_result = Mock()
+        mock_search_result.as_dict.return_value = {
+            "id": 42,
+            "link": "https://www.deezer.com/artist/42",
+            "picture_big": "https://example.com/artist_pic.jpg",
+        }
+        mock_deezer.search_artists.return_value = [mock_search_result]
+
+        item = DeezerItem(item=mock_source_item)
+
+        assert item.id == 42
+        assert mock_deezer.search_artists.called
@@ -0,0 +1,52 @@
+"""Tests for the compiled search query plans."""
+
+import pytest
+
+from spoteezer.items.abstract_item import SEARCH_PARAM_TRIALS_DICT
+from spoteezer.items.query import build_query_plan
+
+TRACK_PARAMS = {"track": 'say "hello"', "artist": "daft punk", "album": "discovery", "duration_sec": 224}
+
+
+def test_deezer_plan():
+    """Test that Deezer queries are quoted once, without the quotes of the values."""
+    plan = build_query_plan("deezer", "track", TRACK_PARAMS, SEARCH_PARAM_TRIALS_DICT["track"])
+
+    trial, query = plan.queries[0]
+    assert trial == ["track", "artist", "album", "duration_sec"]
+    assert query == "track%3A%22say%20hello%22%20artist%3A%22daft%20punk%22%20album%3A%22discovery%22%20dur_min%3A224%20dur_max%3A224"
+    assert len(plan) == len(SEARCH_PARAM_TRIALS_DICT["track"])
+
+
+def test_spotify_plan_deduplicated():
+    """Test that the trials differing only by keys Spotify cannot search by are compiled once."""
+    plan = build_query_plan("spotify", "track", TRACK_PARAMS, SEARCH_PARAM_TRIALS_DICT["track"])
+
+    assert [query for _, query in plan] == [
+        'track:say "hello" artist:daft punk album:discovery',
+        'track:say "hello" artist:daft punk',
+        'track:say "hello" album:discovery',
+        'track:say "hello"',
+    ]
+    assert plan.queries[-1].trial == ["track"]
+    album_params = {"album": "x", "artist": "y", "tracks": ["a"]}
+    album_plan = build_query_plan("spotify", "album", album_params, SEARCH_PARAM_TRIALS_DICT["album"])
+    assert [query for _, query in album_plan] == ["album:x artist:y"]
+
+
+def test_plan_fingerprint_and_order():
+    """Test that plans of the same queries share a fingerprint, and are reordered by trial."""
+    trials = SEARCH_PARAM_TRIALS_DICT["track"]
+    plan = build_query_plan("spotify", "track", TRACK_PARAMS, trials)
+
+    # Spotify does not search by duration
+    assert plan.fingerprint == build_query_plan("spotify", "track", {**TRACK_PARAMS, "duration_sec": 1}, trials).fingerprint
+    assert plan.fingerprint != build_query_plan("deezer", "track", TRACK_PARAMS, trials).fingerprint
+    reversed_trials = [trial for trial, _ in plan.order(lambda trials: trials[::-1])]
+    assert reversed_trials == [["track"], ["track", "album"], ["track", "artist"], ["track", "artist", "album"]]
+
+
+def test_unknown_platform():
+    """Test that plans cannot be compiled for platforms without a query format."""
+    with pytest.raises(ValueError):
+        build_query_plan("tidal", "track", TRACK_PARAMS, SEARCH_PARAM_TRIALS_DICT["track"])
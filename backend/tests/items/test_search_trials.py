@@ -0,0 +1,76 @@
+"""Tests for the adaptive ordering of the search trials."""
+
+from unittest.mock import patch
+
+import pytest
+
+from spoteezer.items.search_trials import SearchTrialStats
+from spoteezer.items.spotify_item import SpotifyItem
+
+TRIALS = [["track", "artist", "album"], ["track", "artist"], ["track", "album"], ["track"]]
+
+
+def _record(stats: SearchTrialStats, trial: list[str], attempts: int, hits: int) -> None:
+    """Record the given outcomes of a trial."""
+    for i in range(attempts):
+        stats.record("deezer", "track", trial, i < hits)
+
+
+def test_order_unchanged_without_statistics():
+    """Test that the trials are tried in their original order until their hit rates are known."""
+    stats = SearchTrialStats(min_attempts=10, explore_rate=0)
+    _record(stats, TRIALS[1], attempts=5, hits=0)
+
+    assert stats.order("deezer", "track", TRIALS) == TRIALS
+
+
+def test_order_by_hit_rate_within_precision():
+    """Test that trials of the same precision are sorted by hit rate, never before more precise ones."""
+    stats = SearchTrialStats(min_attempts=10, explore_rate=0)
+    _record(stats, TRIALS[0], attempts=10, hits=8)
+    _record(stats, TRIALS[1], attempts=10, hits=1)
+    _record(stats, TRIALS[2], attempts=10, hits=6)
+
+    assert stats.order("deezer", "track", TRIALS) == [TRIALS[0], TRIALS[2], TRIALS[1], TRIALS[3]]
+
+
+def test_rarely_hitting_trials_skipped():
+    """Test that trials which almost never hit are skipped, except the last one and when exploring."""
+    stats = SearchTrialStats(min_attempts=10, skip_rate=0.1, explore_rate=0)
+    _record(stats, TRIALS[1], attempts=20, hits=0)
+    _record(stats, TRIALS[3], attempts=20, hits=0)
+
+    assert stats.order("deezer", "track", TRIALS) == [TRIALS[0], TRIALS[2], TRIALS[3]]
+    assert stats.order("spotify", "track", TRIALS) == TRIALS
+
+    stats.explore_rate = 1
+    assert stats.order("deezer", "track", TRIALS) == [TRIALS[0], TRIALS[2], TRIALS[1], TRIALS[3]]
+
+
+@patch("spoteezer.items.spotify_item.SPOTIFY")
+def test_search_not_found_remembered(mock_spotify):
+    """Test that a search which found nothing is not run again."""
+    mock_spotify.search.return_value = {"artists": {"total": 0}}
+    item = SpotifyItem.__new__(SpotifyItem)
+
+    for _ in range(2):
+        with pytest.raises(FileNotFoundError):
+            item.search({"artist": "Unknown Artist"}, "artist")
+
+    mock_spotify.search.assert_called_once()
+
+
+@patch("spoteezer.items.spotify_item.SPOTIFY")
+def test_search_not_found_with_skipped_trials_not_remembered(mock_spotify):
+    """Test that a search which skipped some of its trials is run again."""
+    mock_spotify.search.return_value = {"tracks": {"total": 0}}
+    stats = SearchTrialStats(min_attempts=1, explore_rate=0)
+    stats.record("spotify", "track", ["track", "artist"], False)
+    item = SpotifyItem.__new__(SpotifyItem)
+
+    with patch("spoteezer.items.abstract_item.SEARCH_TRIAL_STATS", stats):
+        for _ in range(2):
+            with pytest.raises(FileNotFoundError):
+                item.search({"track": "Unknown Track", "artist": "Unknown Artist"}, "track")
+
+    assert [call.kwargs["q"] for call in mock_spotify.search.call_args_list] == ["track:Unknown Track"] * 2
@@ -3,6 +3,7 @@
 import pytest
 from unittest.mock import Mock, patch
 
+from spoteezer.items.album_tracks import AlbumTracks
 from spoteezer.items.spotify_item import SpotifyItem
 
 
@@ -214,6 +215,19 @@ class TestSpotifyItem:
         result = item.preprocess_string("Clean Song Title")
         assert result == "Clean Song Title"
 
+    @patch("spoteezer.items.spotify_item.SPOTIFY")
+    def test_search_deduplicates_queries(self, mock_spotify):
+        """Test that trials only differing by the duration, ignored by Spotify, are not searched twice."""
+        mock_spotify.search.return_value = {"tracks": {"total": 0}}
+        item = SpotifyItem.__new__(SpotifyItem)
+        search_params = {"track": "Song", "artist": "Artist", "album": "Album", "duration_sec": 180}
+
+        with pytest.raises(FileNotFoundError):
+            item.search(search_params, "track")
+
+        queries = [call.kwargs["q"] for call in mock_spotify.search.call_args_list]
+        assert len(queries) == len(set(queries)) == 4
+
     def test_get_search_params_invalid_type(self):
         """Test that get_search_params raises ValueError for invalid type."""
         with patch("spoteezer.items.abstract_item.requests.get"):
@@ -255,3 +269,84 @@ class TestSpotifyItem:
         assert web_info["id"] == "4iV5W9uYEdYUVa79Axb7Rh"
         assert web_info["url"] == "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"
         assert web_info["img_url"] == "https://example.com/cover.jpg"
+
+    def test_canonical_url(self):
+        """Test that Spotify URLs and URIs are canonicalized without network calls."""
+        canonical_url = "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"
+
+        assert SpotifyItem.canonical_url("https://open.spotify.com/intl-fr/track/4iV5W9uYEdYUVa79Axb7Rh?si=x") == canonical_url
+        assert SpotifyItem.canonical_url("spotify:track:4iV5W9uYEdYUVa79Axb7Rh") == canonical_url
+        assert SpotifyItem.canonical_url("https://spotify.link/abc") is None
+
+    @patch("spoteezer.items.spotify_item.SPOTIFY")
+    def test_init_from_item_album_majority_vote(self, mock_spotify):
+        """Test that albums are matched by the album most of their tracks belong to."""
+        mock_source_item = Mock()
+        mock_source_item.type = "album"
+        mock_source_item.search_params = {"album": "test album (deluxe)", "artist": "test artist"}
+        mock_source_item.get_album_track_isrcs.return_value = ["ISRC1", "ISRC2", "ISRC3"]
+
+        # Two of the three tracks belong to the album "deluxe"
+        album_by_isrc = {"isrc:ISRC1": "deluxe", "isrc:ISRC2": "single", "isrc:ISRC3": "deluxe"}
+        mock_spotify.search.side_effect = lambda q, type: {
+            "tracks": {"total": 1, "items": [{"album": {"id": album_by_isrc[q]}}]}
+        }
+        mock_spotify.album.return_value = {
+            "id": "deluxe",
+            "name": "Test Album (Deluxe)",
+            "images": [{"url": "https://example.com/album_cover.jpg"}],
+            "external_urls": {"spotify": "https://open.spotify.com/album/deluxe"},
+        }
+
+        item = SpotifyItem(item=mock_source_item)
+
+        assert item.id == "deluxe"
+        assert item.url == "https://open.spotify.com/album/deluxe"
+        mock_spotify.album.assert_called_once_with("deluxe")
+
+    @patch("spoteezer.items.spotify_item.SPOTIFY")
+    def test_get_album_track_isrcs(self, mock_spotify):
+        """Test that album track ISRCs are fetched in a single batch call."""
+        item = SpotifyItem.__new__(SpotifyItem)
+        item.type = "album"
+        item.album_tracks = AlbumTracks((f"track{i}", f"Track {i}", 180) for i in range(10))
+        mock_spotify.tracks.side_effect = lambda ids: {
+            "tracks": [{"external_ids": {"isrc": f"ISRC-{track_id}"}} for track_id in ids]
+        }
+
+        isrcs = item.get_album_track_isrcs(limit=5)
+
+        assert isrcs == ["ISRC-track0", "ISRC-track2", "ISRC-track4", "ISRC-track6", "ISRC-track8"]
+        mock_spotify.tracks.assert_called_once()
+
+    @patch("spoteezer.items.abstract_item.requests.get")
+    @patch("spoteezer.items.spotify_item.SPOTIFY")
+    def test_init_from_url_album_pages(self, mock_spotify, mock_requests_get):
+        """Test that the tracks of large albums are paged through, and their raw pages dropped."""
+        mock_response = Mock()
+        mock_response.url = "https://open.spotify.com/album/7x2nJBjbRxYc4NhLfokp5i"
+        mock_response.history = []
+        mock_requests_get.return_value = mock_response
+
+        tracks = [{"id": f"track{i}", "name": f"Track {i}", "duration_ms": 200_000} for i in range(120)]
+        mock_spotify.album.return_value = {
+            "id": "7x2nJBjbRxYc4NhLfokp5i",
+            "name": "Test Compilation",
+            "artists": [{"name": "Various Artists"}],
+            "images": [{"url": "https://example.com/album_cover.jpg"}],
+            "tracks": {"items": tracks[:50], "total": 120, "next": "next page"},
+        }
+        mock_spotify.album_tracks.side_effect = lambda album_id, limit, offset: {
+            "items": tracks[offset : offset + limit],
+            "next": "next page" if offset + limit < len(tracks) else None,
+        }
+
+        item = SpotifyItem(url="https://open.spotify.com/album/7x2nJBjbRxYc4NhLfokp5i")
+
+        assert item.album_tracks is not None
+        assert item.raw_info is not None
+        assert len(item.search_params["tracks"]) == 120
+        assert item.album_tracks.titles[-1] == "track 119"
+        assert list(item.album_tracks.durations[:2]) == [200, 200]
+        assert [call.kwargs["offset"] for call in mock_spotify.album_tracks.call_args_list] == [50, 100]
+        assert "tracks" not in item.raw_info
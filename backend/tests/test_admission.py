@@ -0,0 +1,39 @@
+"""Tests for the admission control of the conversions."""
+
+import threading
+
+from spoteezer.admission import QUEUE_FULL, WAIT_TIMEOUT, AdmissionController
+
+
+def test_slots_bounded():
+    """Test that no more conversions than the limit are admitted at once."""
+    admission = AdmissionController(max_in_flight=2, max_waiting=0, max_wait=0.01)
+
+    assert admission.try_acquire() and admission.try_acquire()
+    assert not admission.try_acquire()
+    assert admission.acquire() == QUEUE_FULL
+
+    admission.release()
+    assert admission.try_acquire()
+
+
+def test_waiting_conversion_admitted_on_release():
+    """Test that a waiting conversion takes the first freed slot, or is shed after its wait."""
+    admission = AdmissionController(max_in_flight=1, max_waiting=1, max_wait=0.05)
+    assert admission.try_acquire()
+    assert admission.acquire() == WAIT_TIMEOUT
+
+    admission.max_wait = 5.0
+    threading.Timer(0.05, admission.release).start()
+    assert admission.acquire() is None
+    assert admission.in_flight == 1 and admission.waiting == 0
+
+
+def test_retry_after_grows_with_backlog():
+    """Test that shed clients are told to retry later when the backlog is larger."""
+    admission = AdmissionController(max_in_flight=1, max_waiting=10, max_wait=2.0)
+    assert admission.retry_after() == 1
+
+    admission.try_acquire()
+    admission.waiting = 4
+    assert admission.retry_after() == 10
@@ -0,0 +1,145 @@
+"""Tests for the conversion results cache."""
+
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from spoteezer.cache import LocalCache, RefreshQueue, ResultCache
+from spoteezer.convert_link import conversion_key, convert_url
+
+URL = "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"
+
+
+def test_local_cache_expiry_and_lru():
+    """Test that entries expire, and that the least recently used entry is evicted."""
+    cache = LocalCache(max_entries=2)
+    cache.set("expired", 1, ttl=-1)
+    assert cache.get("expired") is None
+
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+
+    assert cache.get_many(["a", "b", "c"]) == [1, None, 3]
+
+
+def test_refresh_queue_deduplicates():
+    """Test that a refresh is scheduled only once per key while pending."""
+    refresh_queue = RefreshQueue(maxsize=10, workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_refresh():
+        started.set()
+        release.wait(5)
+
+    assert refresh_queue.schedule("busy", slow_refresh) is True
+    started.wait(5)
+    refresh = Mock()
+    assert refresh_queue.schedule("key", refresh) is True
+    assert refresh_queue.schedule("key", refresh) is False
+
+    release.set()
+    refresh_queue.join()
+    refresh.assert_called_once()
+
+
+def test_stale_result_served_and_refreshed():
+    """Test that a stale result is served while being refreshed in the background."""
+    result_cache = ResultCache(LocalCache(), RefreshQueue(), fresh_ttl=-1)
+    result_cache.set("key", {"result": "old"})
+    refresh = Mock()
+
+    assert result_cache.get("key", refresh) == {"result": "old"}
+    result_cache.refresh_queue.join()
+    refresh.assert_called_once()
+
+
+def test_convert_url_cached():
+    """Test that conversions are served from the cache by canonical URL."""
+    init_item = Mock()
+    init_item.get_alternate_urls.return_value = []
+    init_item.web_info = {"url": URL, "platform": "spotify"}
+    result_item = Mock()
+    result_item.get_alternate_urls.return_value = []
+    result_item.web_info = {"url": "https://www.deezer.com/track/1", "platform": "deezer"}
+    result_cache = ResultCache(LocalCache(), RefreshQueue())
+
+    with (
+        patch("spoteezer.convert_link.RESULT_CACHE", result_cache),
+        patch("spoteezer.convert_link.get_item", return_value=init_item) as mock_get_item,
+        patch("spoteezer.convert_link.convert_item", return_value=result_item),
+    ):
+        first = convert_url(URL)
+        second = convert_url(f"{URL}?si=abc")
+
+    assert first == second == {"init": init_item.web_info, "result": result_item.web_info}
+    mock_get_item.assert_called_once()
+
+
+def _item(url: str, alternate_urls: list[str] | None = None) -> Mock:
+    """Create a mocked item with the given URL."""
+    item = Mock()
+    item.web_info = {"url": url}
+    item.get_alternate_urls.return_value = alternate_urls or []
+    return item
+
+
+def test_conversion_recorded_in_both_directions():
+    """Test that converting the result back, or an alternate id, is a cache hit."""
+    deezer_url = "https://www.deezer.com/track/1"
+    relinked_url = "https://open.spotify.com/track/0000000000000000000000"
+    result_cache = ResultCache(LocalCache(), RefreshQueue())
+
+    with (
+        patch("spoteezer.convert_link.RESULT_CACHE", result_cache),
+        patch("spoteezer.convert_link.get_item", return_value=_item(URL, [relinked_url])) as mock_get_item,
+        patch("spoteezer.convert_link.convert_item", return_value=_item(deezer_url)),
+    ):
+        convert_url(URL)
+        reverse = convert_url(deezer_url)
+        alternate = convert_url(relinked_url)
+
+    mock_get_item.assert_called_once()
+    assert reverse == {"init": {"url": deezer_url}, "result": {"url": URL}}
+    assert alternate["result"] == {"url": deezer_url}
+
+
+def test_conflicting_reverse_mapping_kept():
+    """Test that a reverse mapping is not overwritten by another release converting to the same item."""
+    deezer_url = "https://www.deezer.com/track/1"
+    other_url = "https://open.spotify.com/track/1111111111111111111111"
+    result_cache = ResultCache(LocalCache(), RefreshQueue())
+
+    with (
+        patch("spoteezer.convert_link.RESULT_CACHE", result_cache),
+        patch("spoteezer.convert_link.get_item", side_effect=[_item(URL), _item(other_url)]),
+        patch("spoteezer.convert_link.convert_item", return_value=_item(deezer_url)),
+    ):
+        convert_url(URL)
+        convert_url(other_url)
+
+    reverse = result_cache.peek(conversion_key(deezer_url, "spotify"))
+    forward = result_cache.peek(conversion_key(other_url, "deezer"))
+    assert reverse is not None and forward is not None
+    assert reverse["result"] == {"url": URL}
+    assert forward["result"] == {"url": deezer_url}
+
+
+def test_not_found_remembered():
+    """Test that items missing on the target platform are not converted again, by URL or by ISRC."""
+    other_release_url = "https://open.spotify.com/track/1111111111111111111111"
+    init_item, other_release = _item(URL), _item(other_release_url)
+    init_item.isrc = other_release.isrc = "USRC12345678"
+
+    with (
+        patch("spoteezer.convert_link.get_item", side_effect=[init_item, other_release]) as mock_get_item,
+        patch("spoteezer.convert_link.convert_item", side_effect=FileNotFoundError) as mock_convert_item,
+    ):
+        for url in (URL, URL, other_release_url):
+            with pytest.raises(FileNotFoundError):
+                convert_url(url)
+
+    assert mock_get_item.call_count == 2
+    mock_convert_item.assert_called_once()
@@ -0,0 +1,108 @@
+"""Tests for the offline catalog snapshot."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+from deezer.exceptions import DeezerErrorResponse
+
+from spoteezer.catalog import (
+    CatalogStore,
+    LocalDeezerClient,
+    LocalSpotifyClient,
+    import_catalog,
+)
+from spoteezer.convert_link import convert_url, get_item
+
+ISRC = "GBUM71029604"
+
+DEEZER_ALBUM = {"id": 302127, "title": "Discovery", "cover_big": "https://e-cdns-images.dzcdn.net/album.jpg"}
+DEEZER_ARTIST = {"id": 27, "name": "Daft Punk", "picture_big": "https://e-cdns-images.dzcdn.net/artist.jpg"}
+DEEZER_TRACK = {
+    "id": 3135556,
+    "title": "Harder, Better, Faster, Stronger",
+    "isrc": ISRC,
+    "duration": 224,
+    "rank": 800000,
+    "artist": {"id": 27, "name": "Daft Punk"},
+    "album": DEEZER_ALBUM,
+    "contributors": {"data": [{"id": 27, "name": "Daft Punk"}]},
+}
+SPOTIFY_TRACK = {
+    "id": "5W3cjX2J3tjhG8zb6u0qHn",
+    "name": "Harder, Better, Faster, Stronger",
+    "duration_ms": 224693,
+    "popularity": 80,
+    "external_ids": {"isrc": ISRC},
+    "artists": [{"id": "4tZwfgrHOc3mvqYlEYSvVi", "name": "Daft Punk"}],
+    "album": {"id": "2noRn2Aes5aoNVsU6iWThc", "name": "Discovery", "images": [{"url": "https://i.scdn.co/album.jpg"}]},
+}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """A catalog store with a track of each platform."""
+    lines = [
+        json.dumps({"platform": "deezer", "type": "track", "data": DEEZER_TRACK}),
+        json.dumps({"platform": "deezer", "type": "artist", "data": DEEZER_ARTIST}),
+        json.dumps({"platform": "spotify", "type": "track", "data": SPOTIFY_TRACK}),
+        "",
+    ]
+    path = str(tmp_path / "catalog.sqlite3")
+    assert import_catalog(lines, path) == 3
+    return CatalogStore(path)
+
+
+def test_lookups(catalog):
+    """Test that the items are found by id, ISRC, and normalized title and artist."""
+    assert catalog.get("deezer", "track", 3135556)["link"] == "https://www.deezer.com/track/3135556"
+    assert catalog.get("deezer", "track", 1) is None
+    assert [track["id"] for track in catalog.find_by_isrc("spotify", ISRC)] == [SPOTIFY_TRACK["id"]]
+    assert [track["id"] for track in catalog.top_tracks("deezer", 27)] == [3135556]
+
+    params = {"track": "harder,  better, faster, stronger", "artist": "daft punk", "dur_min": 224, "dur_max": 224}
+    assert [track["id"] for track in catalog.search("deezer", "track", params)] == [3135556]
+    assert catalog.search("deezer", "track", {**params, "artist": "justice"}) == []
+
+
+def test_local_clients(catalog):
+    """Test that the local clients answer the calls of the items as the API clients do."""
+    deezer_client, spotify_client = LocalDeezerClient(catalog), LocalSpotifyClient(catalog)
+
+    track = deezer_client.get_track(3135556)
+    assert track.isrc == ISRC
+    assert track.as_dict()["contributors"] == [{"id": 27, "name": "Daft Punk"}]
+    assert deezer_client.request("GET", f"track/isrc:{ISRC}").id == 3135556
+    assert [result.id for result in deezer_client.search('track:"harder, better, faster, stronger" dur_min:224 dur_max:224')] == [3135556]
+    assert [result.id for result in deezer_client.search_artists('artist:"daft punk"')] == [27]
+    with pytest.raises(DeezerErrorResponse):
+        deezer_client.request("GET", "playlist/1")
+
+    results = spotify_client.search(q="track:harder, better, faster, stronger artist:daft punk ", type="track")
+    assert results["tracks"]["total"] == 1
+    assert spotify_client.search(q=f"isrc:{ISRC}", type="track")["tracks"]["items"][0]["id"] == SPOTIFY_TRACK["id"]
+
+
+def test_offline_conversion(catalog):
+    """Test that a link is converted from the catalog alone, without any network call."""
+    with (
+        patch("spoteezer.items.abstract_item.CATALOG", catalog),
+        patch("spoteezer.items.deezer_item.DEEZER", LocalDeezerClient(catalog)),
+        patch("spoteezer.items.spotify_item.SPOTIFY", LocalSpotifyClient(catalog)),
+        patch("spoteezer.items.abstract_item.requests.get", side_effect=AssertionError("network call")),
+    ):
+        result = convert_url(f"https://open.spotify.com/intl-fr/track/{SPOTIFY_TRACK['id']}?si=abc")
+
+    assert result["result"]["url"] == "https://www.deezer.com/track/3135556"
+
+
+def test_offline_short_link_not_resolved(catalog):
+    """Test that short links are rejected in catalog mode rather than resolved over the network."""
+    with (
+        patch("spoteezer.items.abstract_item.CATALOG", catalog),
+        patch("socket.socket.connect", side_effect=AssertionError("network call")),
+        patch("socket.create_connection", side_effect=AssertionError("network call")),
+    ):
+        for url in ("https://link.deezer.com/s/30sQKzrTQ9bkxlkDbGbRy", "https://spotify.link/a1b2c3d4"):
+            with pytest.raises(ValueError):
+                get_item(url)
@@ -1,5 +1,8 @@
 """Simple test to ensure the Flask app works as expected."""
 
+import gzip
+import json
+import time
 import pytest
 from unittest.mock import Mock, patch
 from spoteezer.flask_app import app
@@ -17,6 +20,7 @@ def test_convert_endpoint_success(client):
     """Test that the /convert endpoint works correctly with a valid request."""
     # Mock the item objects
     mock_init_item = Mock()
+    mock_init_item.get_alternate_urls.return_value = []
     mock_init_item.web_info = {
         "url": "https://open.spotify.com/track/test123",
         "type": "track",
@@ -26,6 +30,7 @@ def test_convert_endpoint_success(client):
     }
 
     mock_result_item = Mock()
+    mock_result_item.get_alternate_urls.return_value = []
     mock_result_item.web_info = {
         "url": "https://www.deezer.com/track/test456",
         "type": "track",
@@ -36,8 +41,8 @@ def test_convert_endpoint_success(client):
 
     # Mock the conversion functions
     with (
-        patch("spoteezer.flask_app.get_item", return_value=mock_init_item),
-        patch("spoteezer.flask_app.convert_item", return_value=mock_result_item),
+        patch("spoteezer.convert_link.get_item", return_value=mock_init_item),
+        patch("spoteezer.convert_link.convert_item", return_value=mock_result_item),
     ):
         # Make a POST request to the /convert endpoint
         response = client.post(
@@ -70,7 +75,7 @@ def test_convert_endpoint_missing_url(client):
 
 def test_convert_endpoint_file_not_found(client):
     """Test that the /convert endpoint handles FileNotFoundError correctly."""
-    with patch("spoteezer.flask_app.get_item", side_effect=FileNotFoundError):
+    with patch("spoteezer.convert_link.get_item", side_effect=FileNotFoundError):
         response = client.post(
             "/convert",
             json={"initURL": "https://open.spotify.com/track/invalid"},
@@ -83,5 +88,328 @@ def test_convert_endpoint_file_not_found(client):
         assert data["result"] == {}
 
 
+def test_convert_endpoint_superseded(client):
+    """Test that a conversion is cancelled when its client sends a newer one, and that it is counted."""
+    from spoteezer.resilience import ClientRequests, Deadline
+
+    client_requests = ClientRequests()
+
+    def superseded_get_item(url, deadline):
+        # A newer request of the same client comes in while the item is being fetched
+        client_requests.start("tab", Deadline())
+        deadline.check()
+
+    with (
+        patch("spoteezer.flask_app.CLIENT_REQUESTS", client_requests),
+        patch("spoteezer.convert_link.get_item", side_effect=superseded_get_item),
+    ):
+        response = client.post(
+            "/convert",
+            json={"initURL": "https://open.spotify.com/track/superseded"},
+            headers={"X-Client-Token": "tab"},
+        )
+
+    assert response.get_json() == {"result": {}, "log": "The conversion was cancelled."}
+    counters = client.get("/metrics").get_json()["counters"]
+    assert counters["conversions_cancelled_superseded"] >= 1
+
+
+def _mock_items():
+    """Create mocked initial and result items."""
+    mock_init_item = Mock()
+    mock_init_item.get_alternate_urls.return_value = []
+    mock_init_item.web_info = {
+        "url": "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh",
+        "type": "track",
+        "id": "4iV5W9uYEdYUVa79Axb7Rh",
+        "platform": "spotify",
+        "img_url": "https://example.com/image.jpg",
+    }
+    mock_result_item = Mock()
+    mock_result_item.get_alternate_urls.return_value = []
+    mock_result_item.web_info = {
+        "url": "https://www.deezer.com/track/456",
+        "type": "track",
+        "id": 456,
+        "platform": "deezer",
+        "img_url": "https://example.com/image2.jpg",
+    }
+    return mock_init_item, mock_result_item
+
+
+def test_convert_get_cache_headers(client):
+    """Test that GET conversions carry an ETag and handle conditional requests."""
+    mock_init_item, mock_result_item = _mock_items()
+    url = "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"
+
+    with (
+        patch("spoteezer.convert_link.get_item", return_value=mock_init_item),
+        patch("spoteezer.convert_link.convert_item", return_value=mock_result_item),
+    ):
+        response = client.get("/convert", query_string={"url": url})
+
+        assert response.status_code == 200
+        assert response.get_json()["result"]["result"]["platform"] == "deezer"
+        assert response.headers["Cache-Control"] == "public, max-age=604800"
+        etag = response.headers["ETag"]
+
+        response = client.get("/convert", query_string={"url": url}, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+
+def test_convert_get_redirects_to_canonical_url(client):
+    """Test that GET conversions are redirected to the canonical source URL."""
+    response = client.get(
+        "/convert",
+        query_string={"url": "https://open.spotify.com/intl-fr/track/4iV5W9uYEdYUVa79Axb7Rh?si=abc"},
+    )
+
+    assert response.status_code == 301
+    assert response.headers["Location"] == "/convert?url=https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"
+
+
+def test_convert_batch_compressed(client):
+    """Test that batch conversions are gzip-compressed when accepted."""
+    mock_init_item, mock_result_item = _mock_items()
+
+    with (
+        patch("spoteezer.convert_link.get_item", return_value=mock_init_item),
+        patch("spoteezer.convert_link.convert_item", return_value=mock_result_item),
+        patch("spoteezer.http_cache.brotli", None),
+    ):
+        response = client.post(
+            "/convert/batch",
+            json={"initURLs": ["https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"] * 10},
+            headers={"Accept-Encoding": "gzip"},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    data = json.loads(gzip.decompress(response.data))
+    assert len(data["results"]) == 10
+    assert data["results"][0]["log"] == "Conversion successful!"
+
+
+def test_convert_image_urls_proxied(client):
+    """Test that Spotify and Deezer cover images are served through the thumbnail proxy."""
+    mock_init_item, mock_result_item = _mock_items()
+    mock_init_item.web_info["img_url"] = "https://i.scdn.co/image/cover"
+
+    with (
+        patch("spoteezer.convert_link.get_item", return_value=mock_init_item),
+        patch("spoteezer.convert_link.convert_item", return_value=mock_result_item),
+    ):
+        response = client.post("/convert", json={"initURL": "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"})
+
+    data = response.get_json()
+    assert data["result"]["init"]["img_url"] == "http://localhost/thumbnail?src=https://i.scdn.co/image/cover"
+    assert data["result"]["result"]["img_url"] == "https://example.com/image2.jpg"
+
+
+def test_convert_all_endpoint(client):
+    """Test that the /convert/all endpoint returns the converted items by platform."""
+    mock_init_item, mock_result_item = _mock_items()
+    mock_result_item.web_info["img_url"] = "https://e-cdns-images.dzcdn.net/images/cover/1"
+
+    with (
+        patch("spoteezer.convert_link.get_item", return_value=mock_init_item),
+        patch("spoteezer.convert_link.convert_item", return_value=mock_result_item),
+    ):
+        response = client.post(
+            "/convert/all", json={"initURL": "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"}
+        )
+
+    data = response.get_json()
+    assert data["log"] == "Conversion successful!"
+    assert data["result"]["init"]["platform"] == "spotify"
+    assert list(data["result"]["results"]) == ["deezer"]
+    assert data["result"]["results"]["deezer"]["img_url"].startswith("http://localhost/thumbnail?src=")
+    assert data["result"]["errors"] == {}
+
+
+def test_convert_all_unknown_target(client):
+    """Test that the /convert/all endpoint rejects unknown target platforms."""
+    response = client.post("/convert/all", json={"initURL": "https://www.deezer.com/track/1", "targets": ["napster"]})
+
+    assert response.get_json()["log"].startswith("Invalid request: targets must be among")
+
+
+def test_thumbnail_disallowed_host(client):
+    """Test that the thumbnail proxy rejects other image hosts."""
+    response = client.get("/thumbnail", query_string={"src": "https://example.com/image.jpg"})
+
+    assert response.status_code == 400
+
+
+def test_convert_stream(client):
+    """Test that stream records are converted to NDJSON results carrying their ids."""
+    mock_init_item, mock_result_item = _mock_items()
+    records = [
+        {"id": "a", "url": "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"},
+        {"url": "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"},
+        {"id": "c"},
+    ]
+    body = "\n".join(json.dumps(record) for record in records) + "\n\nnot json\n"
+
+    with (
+        patch("spoteezer.convert_link.get_item", return_value=mock_init_item),
+        patch("spoteezer.convert_link.convert_item", return_value=mock_result_item),
+    ):
+        response = client.post("/convert/stream", data=body, content_type="application/x-ndjson")
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.mimetype == "application/x-ndjson"
+    results = {line["id"]: line for line in lines}
+    assert set(results) == {"a", 2, "c", 5}
+    assert results["a"]["result"]["result"]["url"] == "https://www.deezer.com/track/456"
+    assert results[2]["log"] == "Conversion successful!"
+    assert results["c"]["log"] == results[5]["log"] == "Invalid record: missing url"
+
+
+def test_convert_stream_oversized_record(client):
+    """Test that an oversized record is rejected once, without shifting the next line numbers."""
+    mock_init_item, mock_result_item = _mock_items()
+    url = "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"
+    body = f'{{"id": "big", "url": "{url}?x={"y" * 100}"}}\n{{"url": "{url}"}}\n'
+
+    with (
+        patch("spoteezer.flask_app.STREAM_MAX_RECORD_BYTES", 80),
+        patch("spoteezer.convert_link.get_item", return_value=mock_init_item),
+        patch("spoteezer.convert_link.convert_item", return_value=mock_result_item),
+    ):
+        response = client.post("/convert/stream", data=body, content_type="application/x-ndjson")
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert {line["id"]: line["log"] for line in lines} == {
+        1: "Invalid record: too large",
+        2: "Conversion successful!",
+    }
+
+
+def test_convert_stream_bounded_by_reader(client):
+    """Test that records are not read further ahead of the results read by the client."""
+    mock_init_item, mock_result_item = _mock_items()
+    # Distinct items, as cached conversions would not be counted
+    body = "".join(json.dumps({"id": i, "url": f"https://open.spotify.com/track/{i:022d}"}) + "\n" for i in range(10))
+
+    with (
+        patch("spoteezer.flask_app.STREAM_MAX_IN_FLIGHT", 2),
+        patch("spoteezer.convert_link.get_item", return_value=mock_init_item) as mock_get_item,
+        patch("spoteezer.convert_link.convert_item", return_value=mock_result_item),
+    ):
+        response = client.post("/convert/stream", data=body, content_type="application/x-ndjson", buffered=False)
+        results = iter(response.response)
+        next(results)
+        time.sleep(0.2)
+        # Both slots are held until the client reads further
+        assert mock_get_item.call_count == 2
+
+        assert len([next(results)] + list(results)) == 9
+        assert mock_get_item.call_count == 10
+        response.close()
+
+
+def test_convert_text(client):
+    """Test that the links of a text are converted once per item, and rewritten in place."""
+    mock_init_item, mock_result_item = _mock_items()
+    text = (
+        "Listen to https://open.spotify.com/intl-fr/track/4iV5W9uYEdYUVa79Axb7Rh?si=abc, "
+        "or spotify:track:4iV5W9uYEdYUVa79Axb7Rh! See https://example.com too."
+    )
+
+    with (
+        patch("spoteezer.convert_link.get_item", return_value=mock_init_item) as mock_get_item,
+        patch("spoteezer.convert_link.convert_item", return_value=mock_result_item),
+    ):
+        data = client.post("/convert/text", json={"text": text}).get_json()
+
+    mock_get_item.assert_called_once()
+    assert data["text"] == (
+        "Listen to https://www.deezer.com/track/456, "
+        "or https://www.deezer.com/track/456! See https://example.com too."
+    )
+    assert data["links"] == [
+        {
+            "url": "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh",
+            "converted_url": "https://www.deezer.com/track/456",
+            "log": "Conversion successful!",
+        }
+    ]
+
+
+def test_convert_overloaded(client):
+    """Test that conversions beyond the limit are served from the cache, or shed with a Retry-After."""
+    from spoteezer.admission import AdmissionController
+
+    mock_init_item, mock_result_item = _mock_items()
+    url = "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"
+
+    with patch("spoteezer.flask_app.ADMISSION", AdmissionController(max_in_flight=0, max_waiting=0)):
+        response = client.post("/convert", json={"initURL": url})
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+        # Cache the conversion, then overload again
+        with (
+            patch("spoteezer.flask_app.ADMISSION", AdmissionController(max_in_flight=1, max_waiting=0)),
+            patch("spoteezer.convert_link.get_item", return_value=mock_init_item),
+            patch("spoteezer.convert_link.convert_item", return_value=mock_result_item),
+        ):
+            assert client.post("/convert", json={"initURL": url}).status_code == 200
+
+        response = client.post("/convert", json={"initURL": url})
+        assert response.status_code == 200
+        assert response.get_json()["result"]["result"]["url"] == "https://www.deezer.com/track/456"
+        assert client.get("/metrics").get_json()["counters"]["conversions_served_cache_only"] >= 1
+
+
+def test_convert_batch_overloaded(client):
+    """Test that the conversions of a batch take a conversion slot each, the cached ones being served first."""
+    from spoteezer.admission import AdmissionController
+
+    mock_init_item, mock_result_item = _mock_items()
+    cached_url = "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"
+    missed_url = "https://open.spotify.com/track/6rqhFgbbKwnb9MLmUQDhG6"
+
+    with (
+        patch("spoteezer.flask_app.ADMISSION", AdmissionController(max_in_flight=1, max_waiting=0)),
+        patch("spoteezer.convert_link.get_item", return_value=mock_init_item),
+        patch("spoteezer.convert_link.convert_item", return_value=mock_result_item),
+    ):
+        assert client.post("/convert", json={"initURL": cached_url}).status_code == 200
+
+    with (
+        patch("spoteezer.flask_app.ADMISSION", AdmissionController(max_in_flight=0, max_waiting=0)),
+        patch("spoteezer.convert_link.get_item") as mock_get_item,
+    ):
+        response = client.post("/convert/batch", json={"initURLs": [cached_url, missed_url]})
+        assert response.status_code == 200
+        assert [result["log"] for result in response.get_json()["results"]] == [
+            "Conversion successful!",
+            "Too many conversions at the moment, please try again!",
+        ]
+
+        response = client.post("/convert/batch", json={"initURLs": [missed_url]})
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert client.post("/convert/all", json={"initURL": missed_url}).status_code == 429
+
+    mock_get_item.assert_not_called()
+
+
+def test_profiled_request(client):
+    """Test that requests carrying the profiling token are answered with their collapsed stacks."""
+    with patch("spoteezer.flask_app.PROFILING_TOKEN", "secret"):
+        response = client.post("/convert", json={}, headers={"X-Profile": "secret"})
+        assert response.mimetype == "text/plain"
+        assert response.headers["X-Profiled-Status"] == "200"
+
+        assert client.post("/convert", json={}, headers={"X-Profile": "wrong"}).is_json
+        assert client.get("/admin/stages").status_code == 404
+        assert "stages" in client.get("/admin/stages", headers={"X-Profile-Token": "secret"}).get_json()
+
+    assert client.get("/admin/stages", headers={"X-Profile-Token": "secret"}).status_code == 404
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,141 @@
+"""Tests for the background conversion jobs."""
+
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from spoteezer.flask_app import app
+from spoteezer.jobs import JobQueue, JobWorkerPool
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    """Create a job queue in a temporary database."""
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def _wait_until_finished(job_queue: JobQueue, job_id: str, timeout: float = 5.0) -> dict:
+    """Wait for a job to be done or failed."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get(job_id)
+        assert job is not None
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise TimeoutError(job_id)
+
+
+def test_job_run_by_workers(job_queue):
+    """Test that the workers run the jobs and record their results in order."""
+    run_item = Mock(side_effect=lambda url, targets: {"result": {"url": url}, "log": "Conversion successful!"})
+    pool = JobWorkerPool(job_queue, run_item, workers=2, poll_interval=0.01)
+
+    job_id = job_queue.submit(["a", "b", "c"], targets=["deezer"])
+    pool.start()
+    job = _wait_until_finished(job_queue, job_id)
+    pool.stop()
+
+    assert job["status"] == "done"
+    assert job["done"] == job["total"] == 3
+    assert [result["result"]["url"] for result in job["results"]] == ["a", "b", "c"]
+    run_item.assert_called_with("c", ["deezer"])
+
+
+def test_job_failed(job_queue):
+    """Test that a job stopped by an unexpected error is marked as failed."""
+    pool = JobWorkerPool(job_queue, Mock(side_effect=RuntimeError("boom")), workers=1, poll_interval=0.01)
+
+    job_id = job_queue.submit(["a"])
+    pool.start()
+    job = _wait_until_finished(job_queue, job_id)
+    pool.stop()
+
+    assert job["status"] == "failed"
+    assert job["error"] == "boom"
+
+
+def test_workers_stopped_late(job_queue):
+    """Test that workers still running after a stop timed out exit before new ones start."""
+    release = threading.Event()
+    run_item = Mock(side_effect=lambda url, targets: release.wait() and {"result": {"url": url}})
+    pool = JobWorkerPool(job_queue, run_item, workers=1, poll_interval=0.01)
+
+    job_id = job_queue.submit(["a", "b"])
+    pool.start()
+    while run_item.call_count == 0:
+        time.sleep(0.01)
+    pool.stop(timeout=0.01)
+    late_workers = list(pool._threads)
+    pool.start()
+
+    assert len(late_workers) == 1
+    assert pool._threads == late_workers
+
+    release.set()
+    late_workers[0].join(1)
+    pool.start()
+    job = _wait_until_finished(job_queue, job_id)
+    pool.stop()
+
+    assert not late_workers[0].is_alive()
+    assert job["status"] == "done"
+    assert run_item.call_count == 2
+
+
+def test_stale_job_resumed(job_queue):
+    """Test that a job whose worker died is claimed again, and resumes where it stopped."""
+    job_queue.stale_after = 0
+    job_id = job_queue.submit(["a", "b"])
+
+    job = job_queue.claim()
+    job_queue.record_result(job["id"], {"result": "a"})
+    time.sleep(0.01)
+
+    resumed = job_queue.claim()
+    assert resumed["id"] == job_id
+    assert resumed["urls"][resumed["done"]:] == ["b"]
+
+
+def test_claimed_once(job_queue):
+    """Test that a job is only claimed by a single worker."""
+    job_queue.submit(["a"])
+
+    assert job_queue.claim() is not None
+    assert job_queue.claim() is None
+
+
+def test_job_endpoints(job_queue):
+    """Test submitting a job, then polling its progress and fetching its results."""
+    app.config["TESTING"] = True
+    with (
+        app.test_client() as client,
+        patch("spoteezer.flask_app.JOB_QUEUE", job_queue),
+    ):
+        response = client.post("/jobs", json={"initURLs": ["https://www.deezer.com/track/1"]})
+        assert response.status_code == 202
+        job_id = response.get_json()["job_id"]
+
+        assert client.get(f"/jobs/{job_id}").get_json()["status"] == "queued"
+
+        job = job_queue.claim()
+        job_queue.record_result(job["id"], {"result": {}, "log": "Could not find track..."})
+        job_queue.finish(job["id"])
+
+        results = client.get(f"/jobs/{job_id}/results").get_json()
+        assert client.get(f"/jobs/{job_id}/results?offset=1").get_json()["results"] == []
+        assert client.get(f"/jobs/{job_id}/results?offset=-1").status_code == 400
+        assert client.get(f"/jobs/{job_id}/results?offset=first").status_code == 400
+        events = client.get(f"/jobs/{job_id}/events").get_data(as_text=True)
+
+    assert results["status"] == "done"
+    assert results["results"] == [{"result": {}, "log": "Could not find track..."}]
+    assert events.startswith("data: ") and '"status": "done"' in events
+
+
+def test_job_not_found():
+    """Test that unknown jobs are not found."""
+    with app.test_client() as client:
+        assert client.get("/jobs/unknown").status_code == 404
@@ -0,0 +1,53 @@
+"""Tests for the link scanner of free text."""
+
+from spoteezer.links import find_links, rewrite_links
+
+
+def test_find_links():
+    """Test that links are found with or without scheme, without their trailing punctuation."""
+    text = (
+        "Listen: https://open.spotify.com/intl-fr/track/4iV5W9uYEdYUVa79Axb7Rh?si=x, deezer.com/fr/track/3135556. "
+        "(https://deezer.page.link/abc) spotify:album:4aawyAB9vmqN3uQ7FjRGTy!"
+    )
+
+    links = find_links(text)
+
+    assert [text[link.start : link.end] for link in links] == [
+        "https://open.spotify.com/intl-fr/track/4iV5W9uYEdYUVa79Axb7Rh?si=x",
+        "deezer.com/fr/track/3135556",
+        "https://deezer.page.link/abc",
+        "spotify:album:4aawyAB9vmqN3uQ7FjRGTy",
+    ]
+    assert [link.canonical_url for link in links] == [
+        "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh",
+        "https://www.deezer.com/track/3135556",
+        "https://deezer.page.link/abc",
+        "https://open.spotify.com/album/4aawyAB9vmqN3uQ7FjRGTy",
+    ]
+
+
+def test_find_links_ignores_lookalikes():
+    """Test that home pages, other hosts, and platform names inside other URLs are not links."""
+    text = "https://www.deezer.com notdeezer.com/track/1 https://example.com/deezer.com/track/2 spotify:user:abc"
+
+    assert find_links(text) == []
+
+
+def test_find_links_ignores_other_pages():
+    """Test that the platform pages which are not items, e.g home pages or playlists, are not links."""
+    text = (
+        "Get https://www.spotify.com/us/premium/ and https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M "
+        "or deezer.com/fr/playlist/1109890291, then https://link.deezer.com/s/30sQKzrTQ9bkxlkDbGbRy"
+    )
+
+    assert [link.url for link in find_links(text)] == ["https://link.deezer.com/s/30sQKzrTQ9bkxlkDbGbRy"]
+
+
+def test_rewrite_links():
+    """Test that only the converted links are rewritten."""
+    text = "a https://www.deezer.com/track/1 b deezer.com/track/2 c"
+    links = find_links(text)
+
+    rewritten = rewrite_links(text, links, {"https://www.deezer.com/track/2": "https://open.spotify.com/track/x"})
+
+    assert rewritten == "a https://www.deezer.com/track/1 b https://open.spotify.com/track/x c"
@@ -0,0 +1,52 @@
+"""Tests for the vectorized track matcher."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from spoteezer import matching
+from spoteezer.matching import best_matches, encode_strings, score_matrix, similarities
+
+CANDIDATES = [
+    {"track": "Around the World", "artist": "Daft Punk", "duration_sec": 429},
+    {"track": "One More Time", "artist": "Daft Punk", "duration_sec": 320},
+    {"track": "One More Time", "artist": "Some Cover Band", "duration_sec": 250},
+]
+
+
+def test_similarities_bounds():
+    """Test that identical strings are fully similar, and unrelated ones barely."""
+    features = encode_strings(["one more time", "One More Time", "zzz", None])
+
+    cosine = similarities(features, features)
+    assert cosine[0, 1] == pytest.approx(1.0)
+    assert cosine[0, 2] < 0.2
+    assert cosine[3].sum() == 0
+
+    binary = encode_strings(["one more time", "one more time!"], binary=True)
+    jaccard = similarities(binary, binary, metric="jaccard")
+    assert 0.7 < jaccard[0, 1] < 1.0
+
+
+def test_best_matches():
+    """Test that each source gets its best candidate, and that unmatched sources get None."""
+    sources = [
+        {"track": "one more time", "artist": "daft punk", "duration_sec": 321},
+        {"track": "Around The World (Radio Edit)", "artist": "Daft Punk", "duration_sec": None},
+        {"track": "Bohemian Rhapsody", "artist": "Queen", "duration_sec": 354},
+    ]
+
+    first, second, third = best_matches(sources, CANDIDATES)
+
+    assert first is not None and first[0] == 1 and first[1] > 0.9
+    assert second is not None and second[0] == 0
+    assert third is None
+
+
+def test_chunked_scoring(monkeypatch):
+    """Test that scoring the sources by chunks gives the same matches."""
+    monkeypatch.setattr(matching, "SOURCE_CHUNK_SIZE", 2)
+    sources = [CANDIDATES[i % 3] for i in range(7)]
+
+    assert [match and match[0] for match in best_matches(sources, CANDIDATES)] == [i % 3 for i in range(7)]
+    assert score_matrix(sources, CANDIDATES).shape == (7, 3)
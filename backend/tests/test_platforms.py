@@ -0,0 +1,92 @@
+"""Tests for the platform registry and the multi-platform fan-out."""
+
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from spoteezer.cache import LocalCache, RefreshQueue, ResultCache
+from spoteezer.convert_link import convert_url_to_all
+from spoteezer.items.deezer_item import DeezerItem
+from spoteezer.items.spotify_item import SpotifyItem
+from spoteezer.platforms import (
+    PLATFORMS,
+    get_default_target,
+    get_platform_from_url,
+    register_platform,
+)
+from spoteezer.resilience import BREAKERS
+
+URL = "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh"
+
+
+@pytest.mark.parametrize(
+    "url, item_class",
+    [
+        ("https://www.deezer.com/fr/track/3135556", DeezerItem),
+        ("https://deezer.page.link/abc", DeezerItem),
+        ("https://link.deezer.com/s/abc", DeezerItem),
+        (URL, SpotifyItem),
+        ("spotify:album:4aawyAB9vmqN3uQ7FjRGTy", SpotifyItem),
+        ("https://spotify.link/abc", SpotifyItem),
+    ],
+)
+def test_platform_from_url(url, item_class):
+    """Test that links, short links included, are routed to their platform."""
+    assert get_platform_from_url(url) is item_class
+
+
+def test_unknown_platform():
+    """Test that links of unknown platforms, or merely mentioning one, are rejected."""
+    with pytest.raises(ValueError):
+        get_platform_from_url("https://example.com/deezer/track/1")
+
+
+def test_default_target():
+    """Test that Deezer and Spotify convert to each other by default."""
+    assert get_default_target("deezer") == "spotify"
+    assert get_default_target("spotify") == "deezer"
+
+
+@pytest.fixture
+def tidal():
+    """Register a third, mocked platform."""
+    item_class = Mock(PLATFORM="tidal")
+    register_platform(item_class)
+    yield item_class
+    del PLATFORMS["tidal"]
+    del BREAKERS["tidal"]
+
+
+def _item(url: str, platform: str) -> Mock:
+    """Create a mocked item with the given URL."""
+    item = Mock(PLATFORM=platform)
+    item.web_info = {"url": url, "platform": platform}
+    item.get_alternate_urls.return_value = []
+    return item
+
+
+def test_fan_out_concurrent(tidal):
+    """Test that all the targets are converted concurrently from a single source item."""
+    init_item = _item(URL, "spotify")
+    barrier = threading.Barrier(2, timeout=5)
+
+    def convert(item, target, deadline):
+        barrier.wait()
+        if target == "tidal":
+            raise FileNotFoundError
+        return _item("https://www.deezer.com/track/1", target)
+
+    with (
+        patch("spoteezer.convert_link.RESULT_CACHE", ResultCache(LocalCache(), RefreshQueue())),
+        patch("spoteezer.convert_link.get_item", return_value=init_item) as mock_get_item,
+        patch("spoteezer.convert_link.convert_item", side_effect=convert),
+    ):
+        result = convert_url_to_all(URL)
+        cached = convert_url_to_all(URL, targets=["deezer"])
+
+    mock_get_item.assert_called_once()
+    assert result["init"] == init_item.web_info
+    assert result["results"] == {"deezer": {"url": "https://www.deezer.com/track/1", "platform": "deezer"}}
+    assert result["errors"] == {"tidal": "Could not find item on Tidal..."}
+    assert cached["results"] == result["results"]
@@ -0,0 +1,46 @@
+"""Tests for the sampling profiler and the stage times."""
+
+import threading
+import time
+
+from spoteezer.profiling import SamplingProfiler, StageTimes
+
+
+def busy_loop(seconds):
+    started_at = time.perf_counter()
+    while time.perf_counter() - started_at < seconds:
+        sum(range(100))
+
+
+def test_sampling_profiler_collapsed_stacks():
+    """Test that the stacks of the profiled thread are sampled, in the collapsed format."""
+    thread = threading.Thread(target=busy_loop, args=(0.3,))
+    thread.start()
+    assert thread.ident is not None
+    profiler = SamplingProfiler(thread_ids={thread.ident}, interval=0.001).start()
+    thread.join()
+
+    lines = profiler.stop().splitlines()
+
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "busy_loop (test_profiling.py:" in stack
+    assert stack.index("run (threading.py:") < stack.index("busy_loop")
+
+
+def test_stage_times():
+    """Test that the stage times are only recorded when enabled."""
+    stage_times = StageTimes()
+    timed_loop = stage_times.timed("loop")(busy_loop)
+
+    timed_loop(0.01)
+    assert stage_times.report() == {}
+
+    stage_times.enabled = True
+    timed_loop(0.05)
+    timed_loop(0.05)
+    report = stage_times.report()["loop"]
+    assert report["calls"] == 2
+    assert report["wall_ms"] >= 100
+    assert 0 < report["cpu_ms"] <= report["wall_ms"] * 1.5
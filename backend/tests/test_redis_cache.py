@@ -0,0 +1,109 @@
+"""Tests for the shared cache, against a locally launched Redis-compatible stand-in server."""
+
+import fnmatch
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("redis")
+
+from spoteezer.cache import LocalCache, RedisCache
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """Threaded server holding the stored (value, expiry) pairs by key."""
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.store: dict[bytes, tuple[bytes, float]] = {}
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """Minimal Redis protocol (RESP2) server, supporting the commands used by RedisCache."""
+
+    def read_command(self) -> list[bytes] | None:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        assert isinstance(self.server, RespServer)
+        store = self.server.store
+        null = b"$-1\r\n"
+        while (args := self.read_command()) is not None:
+            command = args[0].upper()
+            if command == b"HELLO":
+                protocol = int(args[1]) if len(args) > 1 else 2
+                null = b"_\r\n" if protocol == 3 else null
+                self.wfile.write(b"%%1\r\n$5\r\nproto\r\n:%d\r\n" % protocol)
+            elif command == b"GET":
+                value = store.get(args[1])
+                if value is None or value[1] <= time.time():
+                    self.wfile.write(null)
+                else:
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(value[0]), value[0]))
+            elif command == b"SET":
+                ttl = int(args[4]) / 1000 if len(args) > 4 else 3600
+                store[args[1]] = (args[2], time.time() + ttl)
+                self.wfile.write(b"+OK\r\n")
+            elif command == b"DEL":
+                deleted = sum(store.pop(key, None) is not None for key in args[1:])
+                self.wfile.write(b":%d\r\n" % deleted)
+            elif command == b"SCAN":
+                pattern = args[args.index(b"MATCH") + 1].decode() if b"MATCH" in args else "*"
+                keys = [key for key in store if fnmatch.fnmatch(key.decode(), pattern)]
+                self.wfile.write(b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys))
+                for key in keys:
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(key), key))
+            else:
+                self.wfile.write(b"+OK\r\n")
+
+
+@pytest.fixture
+def resp_server():
+    """Launch a local Redis-compatible server."""
+    server = RespServer(("127.0.0.1", 0), RespHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_shared_between_nodes(resp_server):
+    """Test that values set by one node are seen by another."""
+    url = f"redis://127.0.0.1:{resp_server.server_address[1]}/0"
+    first_node = RedisCache(url, fallback=LocalCache())
+    second_node = RedisCache(url, fallback=LocalCache())
+
+    first_node.set("result:a", {"init": {"id": 1}}, ttl=60)
+    first_node.set("result:b", "b", ttl=60)
+
+    assert second_node.get("result:a") == {"init": {"id": 1}}
+    assert second_node.get_many(["result:a", "missing", "result:b"]) == [{"init": {"id": 1}}, None, "b"]
+
+    second_node.delete("result:a")
+    assert first_node.get("result:a") is None
+
+
+def test_fallback_when_unreachable():
+    """Test that the local cache is used while the server is unreachable."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    cache = RedisCache(f"redis://127.0.0.1:{port}/0", fallback=LocalCache(), retry_after=60)
+    cache.set("key", "value", ttl=60)
+
+    assert cache.available is False
+    assert cache.get("key") == "value"
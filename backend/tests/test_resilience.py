@@ -0,0 +1,201 @@
+"""Tests for the upstream call deadlines and circuit breakers."""
+
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from spoteezer.metrics import METRICS
+from spoteezer.resilience import (
+    HEDGE_DEFAULT_DELAY_SEC,
+    UPSTREAM_TIMEOUT_SEC,
+    CircuitBreaker,
+    CircuitOpenError,
+    ClientRequests,
+    ConversionCancelled,
+    Deadline,
+    DeadlineExceeded,
+    DeadlineSpotify,
+    HedgePolicy,
+    call_upstream,
+    upstream_timeout,
+)
+
+
+def test_deadline_exceeded():
+    """Test that no upstream call is made once the deadline has passed."""
+    func = Mock()
+
+    with pytest.raises(DeadlineExceeded):
+        call_upstream("deezer", func, deadline=Deadline(timeout=0))
+    func.assert_not_called()
+
+
+def test_deadline_timeout_capped():
+    """Test that upstream timeouts are bounded by the remaining budget."""
+    assert Deadline(timeout=60).timeout(cap=5) == 5
+    assert Deadline(timeout=2).timeout(cap=5) <= 2
+
+
+def test_cancelled_deadline():
+    """Test that no upstream call is made once the request was cancelled, and that the spared call is counted."""
+    func = Mock()
+    deadline = Deadline(timeout=60)
+    deadline.cancel("superseded")
+    spared_calls = METRICS.get("upstream_calls_cancelled")
+
+    with pytest.raises(ConversionCancelled, match="superseded"):
+        call_upstream("deezer", func, deadline=deadline)
+    func.assert_not_called()
+    assert METRICS.get("upstream_calls_cancelled") == spared_calls + 1
+
+
+def test_disconnected_client_cancels():
+    """Test that the deadline is cancelled once its client disconnected."""
+    is_disconnected = Mock(side_effect=[False, True])
+    deadline = Deadline(timeout=60, is_disconnected=is_disconnected)
+
+    deadline.check()
+    with pytest.raises(ConversionCancelled):
+        deadline.check()
+    assert deadline.cancel_reason == "disconnected"
+
+
+def test_newer_client_request_supersedes():
+    """Test that a newer request of a client cancels its previous one, and only it."""
+    client_requests = ClientRequests()
+    first, second, other = Deadline(), Deadline(), Deadline()
+    client_requests.start("tab-1", first)
+    client_requests.start("tab-2", other)
+    client_requests.start("tab-1", second)
+
+    assert first.cancel_reason == "superseded"
+    assert second.cancel_reason is None and other.cancel_reason is None
+
+    # A superseded request finishing does not unregister the newer one
+    client_requests.finish("tab-1", first)
+    client_requests.start("tab-1", Deadline())
+    assert second.cancel_reason == "superseded"
+
+
+def test_circuit_opens_on_failures():
+    """Test that the breaker opens when the error rate spikes, then fails fast."""
+    breaker = CircuitBreaker("deezer", window=10, min_calls=4, failure_rate=0.5, cooldown=60)
+    failing_call = Mock(side_effect=requests.ConnectionError("down"))
+
+    with patch.dict("spoteezer.resilience.BREAKERS", {"deezer": breaker}):
+        for _ in range(4):
+            with pytest.raises(requests.ConnectionError):
+                call_upstream("deezer", failing_call)
+
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            call_upstream("deezer", failing_call)
+        assert failing_call.call_count == 4
+
+
+def test_circuit_ignores_functional_errors():
+    """Test that errors unrelated to the platform health do not open the breaker."""
+    breaker = CircuitBreaker("deezer", window=10, min_calls=2)
+
+    with patch.dict("spoteezer.resilience.BREAKERS", {"deezer": breaker}):
+        for _ in range(5):
+            with pytest.raises(ValueError):
+                call_upstream("deezer", Mock(side_effect=ValueError("bad item")))
+
+    assert breaker.state == "closed"
+
+
+def test_upstream_timeout_bounded_by_call_deadline():
+    """Test that the clients time the calls out with the deadline of their request."""
+    spotify = DeadlineSpotify(requests_timeout=UPSTREAM_TIMEOUT_SEC)
+
+    assert upstream_timeout() == UPSTREAM_TIMEOUT_SEC
+    assert spotify.requests_timeout == UPSTREAM_TIMEOUT_SEC
+    assert call_upstream("deezer", upstream_timeout, deadline=Deadline(timeout=2)) <= 2
+    assert call_upstream("spotify", lambda: spotify.requests_timeout, deadline=Deadline(timeout=2)) <= 2
+    assert call_upstream("spotify", lambda: spotify.requests_timeout) == UPSTREAM_TIMEOUT_SEC
+
+
+def test_circuit_late_failures_keep_cooldown():
+    """Test that failures of calls admitted before the circuit opened do not push the trial call back."""
+    breaker = CircuitBreaker("deezer", window=4, min_calls=2, cooldown=0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert breaker.state == "half-open"
+
+
+def test_circuit_half_open_trial():
+    """Test that a successful trial call after the cooldown closes the breaker."""
+    breaker = CircuitBreaker("spotify", window=4, min_calls=2, cooldown=0)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "half-open"
+
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def _slow_first_call(results):
+    """Create a call whose first attempt is slow, and whose next attempts answer at once."""
+    calls = []
+
+    def call():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(0.3)
+        return results[len(calls) - 1]
+
+    return call
+
+
+def test_slow_call_hedged():
+    """Test that a slow idempotent call is duplicated, and that the first answer wins."""
+    won_hedges = METRICS.get("hedges_won_deezer")
+
+    with (
+        patch("spoteezer.resilience.HEDGING", HedgePolicy()),
+        patch("spoteezer.resilience.HEDGE_DEFAULT_DELAY_SEC", 0.01),
+    ):
+        assert call_upstream("deezer", _slow_first_call(["primary", "hedge"]), hedge=True) == "hedge"
+        assert call_upstream("deezer", _slow_first_call(["primary", "hedge"])) == "primary"
+
+    assert METRICS.get("hedges_won_deezer") == won_hedges + 1
+
+
+def test_hedges_bounded_by_budget():
+    """Test that slow calls are not hedged once the hedging budget is exhausted."""
+    with (
+        patch("spoteezer.resilience.HEDGING", HedgePolicy(budget_burst=0)),
+        patch("spoteezer.resilience.HEDGE_DEFAULT_DELAY_SEC", 0.01),
+    ):
+        assert call_upstream("deezer", _slow_first_call(["primary", "hedge"]), hedge=True) == "primary"
+        assert call_upstream("deezer", threading.current_thread, hedge=True) is threading.current_thread()
+
+
+def test_hedged_call_without_idle_worker():
+    """Test that hedgeable calls run on the caller's thread rather than wait for a busy pool."""
+    with (
+        patch("spoteezer.resilience.HEDGING", HedgePolicy()),
+        patch("spoteezer.resilience._HEDGE_SLOTS", threading.BoundedSemaphore(0)),
+    ):
+        assert call_upstream("deezer", threading.current_thread, hedge=True) is threading.current_thread()
+
+
+def test_hedge_delay_from_latencies():
+    """Test that calls are hedged after the given percentile of the recent latencies."""
+    policy = HedgePolicy(percentile=0.9)
+    assert policy.delay("spotify") == HEDGE_DEFAULT_DELAY_SEC
+
+    for i in range(100):
+        policy.record_latency("spotify", i / 100)
+    assert policy.delay("spotify") == 0.9
+    assert policy.delay("deezer") == HEDGE_DEFAULT_DELAY_SEC
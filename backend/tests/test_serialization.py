@@ -0,0 +1,51 @@
+"""Tests for the pre-serialized JSON fragments of the conversion responses."""
+
+import json
+from unittest.mock import patch
+
+from spoteezer.flask_app import app, with_thumbnails
+from spoteezer.serialization import (
+    conversion_fragment,
+    render_fragment,
+    web_info_fragment,
+)
+
+INIT = {
+    "url": "https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh",
+    "type": "track",
+    "id": "4iV5W9uYEdYUVa79Axb7Rh",
+    "platform": "spotify",
+    "img_url": "https://i.scdn.co/image/ab67616d0000b273",
+}
+RESULT = {
+    "url": "https://www.deezer.com/track/3135556",
+    "type": "track",
+    "id": 3135556,
+    "platform": "deezer",
+    "img_url": "https://example.com/cover.jpg",
+}
+
+
+def test_fragments_match_encoded_response():
+    """Test that the assembled fragments render the same response as encoding it, thumbnails included."""
+    result = {
+        "init": INIT,
+        "result": RESULT,
+        "fragments": {"init": web_info_fragment(INIT), "result": web_info_fragment(RESULT)},
+    }
+
+    with app.test_request_context(base_url="https://api.example.com/"):
+        expected = with_thumbnails({"result": {"init": INIT, "result": RESULT}, "log": "Conversion successful!"})
+        body = render_fragment(conversion_fragment(result, "Conversion successful!"), "https://api.example.com/")
+
+    assert json.loads(body) == expected
+    assert expected["result"]["init"]["img_url"].startswith("https://api.example.com/thumbnail?src=")
+
+
+def test_fragments_without_orjson():
+    """Test that the fragments are the same with the standard json module."""
+    with patch("spoteezer.serialization.orjson", None):
+        fragment = web_info_fragment(RESULT)
+
+    assert fragment == web_info_fragment(RESULT)
+    assert json.loads(fragment) == RESULT
@@ -0,0 +1,40 @@
+"""Tests for the production server entry point."""
+
+import os
+from unittest.mock import patch
+
+from spoteezer.server import SpoteezerServer, default_workers, parse_args, run
+
+
+def test_parse_args_defaults():
+    """Test the default production server options."""
+    args = parse_args([])
+
+    assert args.bind == "127.0.0.1:5000"
+    assert args.workers == default_workers()
+    assert args.preload is True
+    assert args.max_requests > 0
+
+
+def test_server_config():
+    """Test that the options are forwarded to gunicorn."""
+    server = SpoteezerServer({"bind": "0.0.0.0:8000", "workers": 3, "threads": 2, "preload_app": True})
+
+    assert server.cfg is not None
+
+    assert server.cfg.bind == ["0.0.0.0:8000"]
+    assert server.cfg.workers == 3
+    assert server.cfg.threads == 2
+    assert server.cfg.preload_app is True
+
+
+def test_run_exports_threads(monkeypatch):
+    """Test that the thread count is exported to the configuration of the app before it is imported."""
+    # Restored after the test
+    monkeypatch.setenv("SPOTEEZER_THREADS", "4")
+
+    with patch("spoteezer.server.SpoteezerServer") as mock_server:
+        run(["--threads", "16"])
+
+    assert mock_server.call_args.args[0]["threads"] == 16
+    assert os.environ["SPOTEEZER_THREADS"] == "16"
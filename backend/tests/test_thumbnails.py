@@ -0,0 +1,69 @@
+"""Tests for the thumbnail cache."""
+
+import io
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+
+from spoteezer.thumbnails import ThumbnailCache
+
+SRC = "https://i.scdn.co/image/cover"
+
+
+def _image_response(size: int = 640) -> Mock:
+    """Create a mocked response holding a JPEG image."""
+    image_module = pytest.importorskip("PIL.Image")
+    output = io.BytesIO()
+    image_module.new("RGB", (size, size), "red").save(output, format="JPEG")
+    response = Mock()
+    response.content = output.getvalue()
+    return response
+
+
+def test_is_allowed():
+    """Test that only Spotify and Deezer image hosts are proxied."""
+    assert ThumbnailCache.is_allowed("https://i.scdn.co/image/abc")
+    assert ThumbnailCache.is_allowed("https://e-cdns-images.dzcdn.net/images/cover/abc/500x500.jpg")
+    assert not ThumbnailCache.is_allowed("https://example.com/image.jpg")
+    assert not ThumbnailCache.is_allowed("http://i.scdn.co/image/abc")
+
+
+@patch("spoteezer.thumbnails.requests.get")
+def test_thumbnail_downsized_and_cached(mock_get, tmp_path):
+    """Test that images are downsized once, then served from disk."""
+    image_module = pytest.importorskip("PIL.Image")
+    mock_get.return_value = _image_response()
+    cache = ThumbnailCache(str(tmp_path), max_bytes=1024 * 1024, size=120)
+
+    path = cache.get_path(SRC)
+    assert cache.get_path(SRC) == path
+    mock_get.assert_called_once()
+
+    with image_module.open(path) as image:
+        assert image.size == (120, 120)
+
+
+@patch("spoteezer.thumbnails.requests.get")
+def test_least_recently_used_evicted(mock_get, tmp_path):
+    """Test that the least recently used thumbnails are evicted over the size cap."""
+    mock_get.return_value = _image_response()
+    cache = ThumbnailCache(str(tmp_path), max_bytes=1024 * 1024, size=120)
+
+    first_path = cache.get_path(f"{SRC}/1")
+    os.utime(first_path, (0, 0))
+    second_path = cache.get_path(f"{SRC}/2")
+
+    cache.max_bytes = 2 * os.path.getsize(second_path) - 1
+    cache.evict()
+
+    assert not os.path.exists(first_path)
+    assert os.path.exists(second_path)
+
+
+def test_disallowed_host_rejected(tmp_path):
+    """Test that images from other hosts are not fetched."""
+    cache = ThumbnailCache(str(tmp_path), max_bytes=1024)
+
+    with pytest.raises(ValueError, match="not allowed"):
+        cache.get_path("https://example.com/image.jpg")
@@ -0,0 +1,51 @@
+"""Tests for the shared Spotify token cache."""
+
+import time
+from unittest.mock import Mock
+
+from spoteezer.token_cache import SharedTokenCacheHandler, TokenRefresher
+
+
+def _token(expires_in: int) -> dict:
+    return {"access_token": "token", "expires_at": int(time.time()) + expires_in}
+
+
+def test_token_shared_between_handlers(tmp_path):
+    """Test that a token saved by one process is seen by another."""
+    path = str(tmp_path / "token.json")
+    writer = SharedTokenCacheHandler(path)
+    reader = SharedTokenCacheHandler(path)
+
+    assert reader.get_cached_token() is None
+    writer.save_token_to_cache(_token(3600))
+    token = reader.get_cached_token()
+    assert token is not None
+    assert token["access_token"] == "token"
+
+
+def test_refresh_skipped_when_token_fresh(tmp_path):
+    """Test that a fresh shared token does not trigger a token request."""
+    handler = SharedTokenCacheHandler(str(tmp_path / "token.json"))
+    handler.save_token_to_cache(_token(3600))
+    credentials = Mock()
+
+    refresher = TokenRefresher(credentials, handler)
+
+    assert refresher.refresh_if_needed() is False
+    credentials.get_access_token.assert_not_called()
+
+
+def test_refresh_before_expiry(tmp_path):
+    """Test that a token close to expiry is refreshed ahead of time."""
+    handler = SharedTokenCacheHandler(str(tmp_path / "token.json"))
+    handler.save_token_to_cache(_token(120))
+    credentials = Mock()
+    credentials.get_access_token.side_effect = lambda **kwargs: handler.save_token_to_cache(_token(3600))
+
+    refresher = TokenRefresher(credentials, handler, margin=300)
+
+    assert refresher.refresh_if_needed() is True
+    credentials.get_access_token.assert_called_once_with(as_dict=False, check_cache=False)
+    token = handler.get_cached_token()
+    assert token is not None
+    assert token["expires_at"] > time.time() + 300